@@ -0,0 +1,128 @@
+"""
+asyncio facade for the main module operations
+
+make_api() returns a namespace with the same operations as main, as
+coroutines. Searches run on a pool of reader threads. Adds, updates and
+deletes are queued and run by a single writer thread, which merges all
+writes waiting at that moment into one shared transaction, so many
+in-flight coroutines pay for a single commit.
+"""
+# pylint: disable=W0718
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+from types import SimpleNamespace
+
+import main
+import sharding
+import socialnetwork_model
+import storage
+
+READ_OPERATIONS = ('search_user', 'search_status')
+WRITE_OPERATIONS = ('add_user', 'update_user', 'delete_user',
+                    'add_status', 'update_status', 'delete_status')
+LOAD_OPERATIONS = ('load_users', 'load_status_updates')
+
+
+def make_api(max_workers=8, max_concurrency=64, max_batch=100):
+    """
+    Returns the async API as a namespace of coroutine functions named
+    after the main operations, plus close() and stats().
+
+    - max_workers: number of threads serving searches.
+    - max_concurrency: maximum number of operations in flight at once;
+    callers over the limit wait for a slot.
+    - max_batch: maximum number of writes merged into one transaction.
+
+    Every call on the executor threads gives its pooled connections back
+    when it is done (see sharding.release_connections), so with a
+    connection pool smaller than max_workers + 1 the threads wait for a
+    free connection instead of failing.
+
+    An API object belongs to the event loop that first uses it.
+    Cancelling a coroutine before its write has been picked up by the
+    writer removes the write from the queue; once picked up, the write
+    completes and its result is discarded.
+    """
+    read_pool = ThreadPoolExecutor(max_workers, thread_name_prefix='socialnetwork-read')
+    write_pool = ThreadPoolExecutor(1, thread_name_prefix='socialnetwork-write')
+    slots = asyncio.Semaphore(max_concurrency)
+    state = {'pending': [], 'flusher': None}
+    counters = {'reads': 0, 'writes': 0, 'batches': 0, 'cancelled': 0}
+
+    async def _flush():
+        loop = asyncio.get_running_loop()
+        try:
+            while state['pending']:
+                batch = state['pending'][:max_batch]
+                del state['pending'][:max_batch]
+                live = [(future, call) for future, call in batch if not future.done()]
+                counters['cancelled'] += len(batch) - len(live)
+                if not live:
+                    continue
+                counters['batches'] += 1
+                try:
+                    batch_run = partial(socialnetwork_model.run_batch,
+                                        [call for _, call in live], storage.write_transaction)
+                    outcomes = await loop.run_in_executor(write_pool, sharding.released,
+                                                          batch_run)
+                except Exception as error:
+                    outcomes = [(False, error)] * len(live)
+                for (future, _), (succeeded, value) in zip(live, outcomes):
+                    if future.done():
+                        continue
+                    if succeeded:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(value)
+        finally:
+            state['flusher'] = None
+
+    def _reader(func):
+        @wraps(func)
+        async def read(*args, **kwargs):
+            async with slots:
+                counters['reads'] += 1
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(read_pool, sharding.released,
+                                                  partial(func, *args, **kwargs))
+        return read
+
+    def _writer(func):
+        @wraps(func)
+        async def write(*args, **kwargs):
+            async with slots:
+                counters['writes'] += 1
+                loop = asyncio.get_running_loop()
+                future = loop.create_future()
+                state['pending'].append((future, partial(func, *args, **kwargs)))
+                if state['flusher'] is None:
+                    state['flusher'] = loop.create_task(_flush())
+                return await future
+        return write
+
+    def _loader(func):
+        # Loads manage their own transactions; they only share the writer
+        @wraps(func)
+        async def load(*args, **kwargs):
+            async with slots:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(write_pool, sharding.released,
+                                                  partial(func, *args, **kwargs))
+        return load
+
+    async def close():
+        # Waits for queued writes, then stops the threads
+        if state['flusher'] is not None:
+            await state['flusher']
+        read_pool.shutdown(wait=True)
+        write_pool.shutdown(wait=True)
+
+    def stats():
+        return dict(counters, pending=len(state['pending']))
+
+    api = {name: _reader(getattr(main, name)) for name in READ_OPERATIONS}
+    api.update({name: _writer(getattr(main, name)) for name in WRITE_OPERATIONS})
+    api.update({name: _loader(getattr(main, name)) for name in LOAD_OPERATIONS})
+    return SimpleNamespace(close=close, stats=stats, **api)
@@ -0,0 +1,283 @@
+"""
+Benchmark suite for the main operations
+
+Generates seeded user and status CSV files of the requested sizes, then
+times load_users, load_status_updates, search_*, update_* and cascade
+delete_user against a temporary database. Results are written as JSON so
+that runs can be compared:
+
+    python benchmark.py --sizes 10000 1000000 --output bench.json
+    python benchmark.py --sizes 10000 --output new.json --compare bench.json
+
+--overhead instead times the single-row table operations through
+DataSet and through the compiled SQL of storage.CompiledTable, printing
+the microseconds per call each path takes:
+
+    python benchmark.py --overhead --samples 5000
+"""
+# pylint: disable=R0914
+
+import argparse
+import csv
+from datetime import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from playhouse.dataset import DataSet
+
+import main
+import parallel_loader
+import socialnetwork_model
+import storage
+
+FIRST_NAMES = ('Eve', 'David', 'Alvaro', 'Maria', 'Wei', 'Priya', 'John', 'Aiko',
+               'Omar', 'Lena', 'Carlos', 'Fatima', 'Noah', 'Sofia', 'Ivan', 'Zoe')
+LAST_NAMES = ('Miles', 'Yuen', 'Conejo', 'Garcia', 'Chen', 'Patel', 'Smith', 'Sato',
+              'Haddad', 'Novak', 'Silva', 'Khan', 'Brown', 'Rossi', 'Petrov', 'Lee')
+DOMAINS = ('uw.edu', 'gmail.com', 'example.com', 'outlook.com')
+WORDS = ('sunny', 'in', 'Seattle', 'this', 'morning', 'code', 'is', 'finally',
+         'compiling', 'my', 'second', 'post', 'coffee', 'time', 'rain', 'again',
+         'great', 'day', 'at', 'the', 'lake', 'new', 'project', 'launch')
+
+# Number of calls timed for each single-row operation
+DEFAULT_SAMPLES = 1000
+
+
+def user_id_for(index):
+    """
+    Returns the user_id the generators use for the index-th user.
+    """
+    return f'user{index:08}'
+
+
+def generate_users_csv(path, rows, seed=0):
+    """
+    Writes a users CSV file with rows users in the load_users layout.
+    The same seed always produces the same file.
+    """
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='UTF-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(('USER_ID', 'EMAIL', 'NAME', 'LASTNAME'))
+        for index in range(rows):
+            name = rng.choice(FIRST_NAMES)
+            last_name = rng.choice(LAST_NAMES)
+            email = f'{name.lower()}.{last_name.lower()}{index}@{rng.choice(DOMAINS)}'
+            writer.writerow((user_id_for(index), email, name, last_name))
+
+
+def generate_status_csv(path, rows, user_count, seed=0):
+    """
+    Writes a status CSV file with rows statuses in the
+    load_status_updates layout, spread over user_count users with a
+    skewed distribution (a few users post most statuses).
+    """
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='UTF-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(('STATUS_ID', 'USER_ID', 'STATUS_TEXT'))
+        for index in range(rows):
+            user_index = min(int(rng.paretovariate(1.2)) - 1, user_count - 1)
+            user_index = (user_index * 7919 + rng.randrange(2)) % user_count
+            text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 12)))
+            writer.writerow((f'{user_id_for(user_index)}_{index:08}',
+                             user_id_for(user_index), text))
+
+
+def _time_calls(func, arguments):
+    start = time.perf_counter()
+    for args in arguments:
+        func(*args)
+    return time.perf_counter() - start
+
+
+def _result(size, operation, seconds, count):
+    return {'size': size, 'operation': operation, 'seconds': round(seconds, 6),
+            'count': count, 'ops_per_sec': round(count / seconds, 1) if seconds else None}
+
+
+def run_size(size, directory, samples=DEFAULT_SAMPLES, seed=0, chunk_size=1000):
+    """
+    Runs every benchmark for size users and size statuses in a fresh
+    database inside directory. Returns a list of result dicts.
+    """
+    users_file = os.path.join(directory, f'users_{size}.csv')
+    status_file = os.path.join(directory, f'status_{size}.csv')
+    generate_users_csv(users_file, size, seed)
+    generate_status_csv(status_file, size, size, seed)
+
+    results = []
+    socialnetwork_model.configure(path=os.path.join(directory, f'bench_{size}.db'))
+    main.clear_caches()
+    try:
+        start = time.perf_counter()
+        main.load_users(users_file, chunk_size=chunk_size)
+        results.append(_result(size, 'load_users', time.perf_counter() - start, size))
+        start = time.perf_counter()
+        main.load_status_updates(status_file, chunk_size=chunk_size)
+        results.append(_result(size, 'load_status_updates',
+                               time.perf_counter() - start, size))
+
+        rng = random.Random(seed)
+        picked = [rng.randrange(size) for _ in range(min(samples, size))]
+        user_ids = [user_id_for(index) for index in picked]
+        status_ids = [row['status_id'] for row in
+                      socialnetwork_model.Status.find().limit(len(picked))]
+        main.clear_caches()
+        operations = (
+            ('search_user', main.search_user, [(user_id,) for user_id in user_ids]),
+            ('search_user_cached', main.search_user, [(user_id,) for user_id in user_ids]),
+            ('search_status', main.search_status, [(status_id,) for status_id in status_ids]),
+            ('update_user', main.update_user,
+             [(user_id, 'bench@uw.edu', 'Bench', 'Mark') for user_id in user_ids]),
+            ('update_status', main.update_status,
+             [(status_id, status_id.rsplit('_', 1)[0], 'benchmark update')
+              for status_id in status_ids]),
+            ('delete_user', main.delete_user,
+             [(user_id,) for user_id in dict.fromkeys(user_ids)]),
+        )
+        for operation, func, arguments in operations:
+            results.append(_result(size, operation, _time_calls(func, arguments),
+                                   len(arguments)))
+    finally:
+        main.clear_caches()
+    return results
+
+
+def run(sizes, output, samples=DEFAULT_SAMPLES, seed=0, chunk_size=1000):
+    """
+    Runs the benchmarks for every size and writes the results as JSON to
+    output. Returns the report dict.
+    """
+    original = dict(socialnetwork_model.DB_SETTINGS)
+    results = []
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as directory:
+                results.extend(run_size(size, directory, samples, seed, chunk_size))
+                socialnetwork_model.close()
+    finally:
+        socialnetwork_model.configure(**original)
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'seed': seed,
+        'results': results,
+    }
+    with open(output, 'w', encoding='UTF-8') as file:
+        json.dump(report, file, indent=2)
+    return report
+
+
+def _crud_operations(table):
+    # (operation, call taking a user_id) for crud_overhead
+    return (
+        ('insert', lambda user_id: table.insert(user_id=user_id, email='bench@uw.edu',
+                                                user_name='Bench', user_last_name='Mark')),
+        ('find_one', lambda user_id: table.find_one(user_id=user_id)),
+        ('exists', lambda user_id: table.exists('user_id', user_id)),
+        ('update', lambda user_id: table.update(columns=['user_id'], user_id=user_id,
+                                                email='new@uw.edu')),
+        ('delete', lambda user_id: table.delete(user_id=user_id)),
+    )
+
+
+def crud_overhead(directory, samples=DEFAULT_SAMPLES):
+    """
+    Micro-benchmark of the per-call cost of insert, find_one, exists,
+    update and delete on the Users table of a fresh database inside
+    directory, through DataSet (storage.SqliteTable) and through
+    compiled SQL (storage.CompiledTable). Each operation runs samples
+    times in one transaction, so commits do not hide the difference.
+    Returns a dict per operation with the microseconds per call of
+    'dataset' and 'compiled' and the microseconds 'saved'.
+    """
+    database = socialnetwork_model.make_database(os.path.join(directory, 'overhead.db'))
+    timings = {}
+    try:
+        socialnetwork_model.ensure_schema(database)
+        users_table = DataSet(database)['Users']
+        for path, wrapper in (('dataset', storage.SqliteTable),
+                              ('compiled', storage.CompiledTable)):
+            table = wrapper(users_table)
+            arguments = [(f'{path}{index:08}',) for index in range(samples)]
+            for operation, func in _crud_operations(table):
+                with database.atomic():
+                    seconds = _time_calls(func, arguments)
+                timings.setdefault(operation, {})[path] = seconds / samples * 1e6
+    finally:
+        database.close()
+    return [{'operation': operation, 'dataset': round(micros['dataset'], 2),
+             'compiled': round(micros['compiled'], 2),
+             'saved': round(micros['dataset'] - micros['compiled'], 2)}
+            for operation, micros in timings.items()]
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Compares two benchmark reports (dicts or JSON file paths). Returns a
+    list of (size, operation, baseline seconds, current seconds, change)
+    for every operation that got slower by more than threshold.
+    """
+    reports = []
+    for report in (baseline, current):
+        if isinstance(report, str):
+            with open(report, encoding='UTF-8') as file:
+                report = json.load(file)
+        reports.append({(row['size'], row['operation']): row['seconds']
+                        for row in report['results']})
+    regressions = []
+    for key, seconds in sorted(reports[1].items()):
+        before = reports[0].get(key)
+        if before and (seconds - before) / before > threshold:
+            regressions.append((key[0], key[1], before, seconds, (seconds - before) / before))
+    return regressions
+
+
+def cli(argv=None):
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000])
+    parser.add_argument('--output', default='bench_output.json')
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--compare', help='baseline JSON report to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.10)
+    parser.add_argument('--reader', choices=('csv', 'mmap'), default='csv',
+                        help='CSV reader backend used by the bulk loaders')
+    parser.add_argument('--overhead', action='store_true',
+                        help='time the table operations through DataSet and compiled SQL')
+    options = parser.parse_args(argv)
+    if options.overhead:
+        with tempfile.TemporaryDirectory() as directory:
+            for row in crud_overhead(directory, options.samples):
+                print(f"{row['operation']:<10} dataset {row['dataset']:>8.2f}us "
+                      f"compiled {row['compiled']:>8.2f}us saved {row['saved']:>8.2f}us")
+        return 0
+    parallel_loader.configure_reader(options.reader)
+    report = run(options.sizes, options.output, options.samples,
+                 options.seed, options.chunk_size)
+    for row in report['results']:
+        print(f"{row['size']:>10} {row['operation']:<22} {row['seconds']:>10.3f}s "
+              f"{row['ops_per_sec'] or 0:>12.1f} ops/s")
+    regressions = []
+    if options.compare:
+        regressions = compare(options.compare, report, options.threshold)
+        for size, operation, before, after, change in regressions:
+            print(f'REGRESSION {size} {operation}: {before:.3f}s -> {after:.3f}s '
+                  f'(+{change:.0%})')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(cli())
@@ -0,0 +1,136 @@
+"""
+In-process caches used in front of the social network database
+"""
+# pylint: disable=C0116
+# pylint: disable=R0914
+# pylint: disable=R0915
+
+from collections import OrderedDict
+import threading
+import time
+from types import SimpleNamespace
+
+_MISSING = object()
+
+
+def make_lru(maxsize=1024, ttl=None):
+    """
+    Returns a bounded least-recently-used cache as a namespace of
+    closures sharing one OrderedDict: get, put, generation, contains,
+    discard, discard_where, clear, size, configure and stats. Once
+    maxsize keys are stored, adding a new key evicts the least recently
+    used one. If ttl (seconds) is set, entries older than ttl are
+    treated as missing. Hit, miss, eviction and expiration counters are
+    kept and returned by stats().
+
+    To fill the cache from a read that may race with a write, take
+    generation() before the read and pass it to put(): the value is
+    dropped if the key was discarded (or the cache cleared) since, so a
+    read that started before a write cannot put back what it replaced.
+    """
+    entries = OrderedDict()
+    lock = threading.Lock()
+    settings = {'maxsize': maxsize, 'ttl': ttl}
+    counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'stale': 0}
+    # Generation of the last discard of each recently discarded key; floor
+    # is at least the generation of every discard no longer in discards
+    discards = OrderedDict()
+    generations = {'current': 0, 'floor': 0}
+
+    def _invalidate(key=_MISSING):
+        # Must be called with the lock held; no key invalidates every key
+        generations['current'] += 1
+        if key is _MISSING:
+            generations['floor'] = generations['current']
+            discards.clear()
+            return
+        discards[key] = generations['current']
+        discards.move_to_end(key)
+        while len(discards) > settings['maxsize']:
+            _, generation_of = discards.popitem(last=False)
+            generations['floor'] = max(generations['floor'], generation_of)
+
+    def _lookup(key):
+        # Must be called with the lock held
+        entry = entries.get(key, _MISSING)
+        if entry is _MISSING:
+            counters['misses'] += 1
+            return _MISSING
+        value, expires = entry
+        if expires is not None and expires <= time.monotonic():
+            del entries[key]
+            counters['expirations'] += 1
+            counters['misses'] += 1
+            return _MISSING
+        entries.move_to_end(key)
+        counters['hits'] += 1
+        return value
+
+    def get(key, default=None):
+        with lock:
+            value = _lookup(key)
+        return default if value is _MISSING else value
+
+    def generation():
+        with lock:
+            return generations['current']
+
+    def put(key, value=True, since=None):
+        # since: a generation() taken before value was read; returns False
+        # (storing nothing) if key was discarded after it
+        with lock:
+            if since is not None and since < discards.get(key, generations['floor']):
+                counters['stale'] += 1
+                return False
+            expires = None
+            if settings['ttl'] is not None:
+                expires = time.monotonic() + settings['ttl']
+            entries[key] = (value, expires)
+            entries.move_to_end(key)
+            while len(entries) > settings['maxsize']:
+                entries.popitem(last=False)
+                counters['evictions'] += 1
+            return True
+
+    def contains(key):
+        with lock:
+            return _lookup(key) is not _MISSING
+
+    def discard(key):
+        with lock:
+            entries.pop(key, None)
+            _invalidate(key)
+
+    def discard_where(predicate):
+        # Drops every entry whose value matches predicate; a read in
+        # flight may match it too, so no fill from before is accepted
+        with lock:
+            for key in [key for key, (value, _) in entries.items() if predicate(value)]:
+                del entries[key]
+            _invalidate()
+
+    def clear():
+        with lock:
+            entries.clear()
+            _invalidate()
+
+    def size():
+        return len(entries)
+
+    def configure(maxsize=None, ttl=None):
+        # Changes the size and TTL; existing entries are dropped
+        with lock:
+            if maxsize is not None:
+                settings['maxsize'] = maxsize
+            settings['ttl'] = ttl
+            entries.clear()
+            _invalidate()
+
+    def stats():
+        with lock:
+            return dict(counters, size=len(entries), **settings)
+
+    return SimpleNamespace(get=get, put=put, generation=generation, contains=contains,
+                           discard=discard,
+                           discard_where=discard_where, clear=clear, size=size,
+                           configure=configure, stats=stats)
@@ -0,0 +1,89 @@
+"""
+Checkpoints for resumable loads of large CSV files
+
+A checkpoint records, for one kind of load ('statuses') of one file,
+the byte offset up to which rows have been committed and how many rows
+that was. The loader saves it inside the transaction that writes each
+batch, so the checkpoint and the rows it covers are committed together.
+A checkpoint also stores the size of the file and a hash of its
+modification time and of HASH_SAMPLES blocks spread evenly over it (the
+whole file, if it is small); load() ignores it once the file has
+changed. Sampling keeps the cost of a fingerprint the same however large
+the file is.
+"""
+
+from datetime import datetime
+import hashlib
+import os
+
+import socialnetwork_model
+
+# Blocks hashed per file, and bytes per block
+HASH_SAMPLES = 64
+HASH_BYTES = 1 << 16
+
+
+def fingerprint(filename):
+    """
+    Returns (size, digest) for filename: its size in bytes and a hash
+    of its size, modification time and HASH_SAMPLES blocks of
+    HASH_BYTES bytes, the first at the start of the file and the last
+    at its end.
+    """
+    stat = os.stat(filename)
+    size = stat.st_size
+    digest = hashlib.blake2b(f'{size}:{stat.st_mtime_ns}'.encode(), digest_size=16)
+    with open(filename, 'rb') as file:
+        if size <= HASH_SAMPLES * HASH_BYTES:
+            digest.update(file.read())
+        else:
+            step = (size - HASH_BYTES) / (HASH_SAMPLES - 1)
+            for index in range(HASH_SAMPLES):
+                file.seek(round(index * step))
+                digest.update(file.read(HASH_BYTES))
+    return size, digest.hexdigest()
+
+
+def _key(kind, filename):
+    return kind, os.path.abspath(filename)
+
+
+def load(kind, filename, file_print=None):
+    """
+    Returns the checkpoint of the kind load of filename as an
+    (offset, rows) pair, or None if there is none or the file no longer
+    matches it. file_print is fingerprint(filename), computed if None.
+    """
+    cursor = socialnetwork_model.init().query(
+        'SELECT "size", "digest", "offset", "rows" FROM "load_checkpoint" '
+        'WHERE "kind" = ? AND "filename" = ?', _key(kind, filename))
+    row = cursor.fetchone()
+    if row is None or tuple(row[:2]) != tuple(file_print or fingerprint(filename)):
+        return None
+    return row[2], row[3]
+
+
+def save(kind, filename, file_print, offset, rows):
+    """
+    Records that the first rows rows of filename, up to byte offset,
+    are committed. Call it inside the write transaction of the batch.
+    """
+    size, digest = file_print
+    socialnetwork_model.init().query(
+        'INSERT INTO "load_checkpoint" ("kind", "filename", "size", "digest", "offset", '
+        '"rows", "updated") VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT ("kind", "filename") '
+        'DO UPDATE SET "size" = excluded."size", "digest" = excluded."digest", '
+        '"offset" = excluded."offset", "rows" = excluded."rows", '
+        '"updated" = excluded."updated"',
+        _key(kind, filename) + (size, digest, offset, rows,
+                                datetime.now().isoformat(timespec='seconds')))
+
+
+def clear(kind, filename):
+    """
+    Forgets the checkpoint of the kind load of filename.
+    """
+    with socialnetwork_model.write_transaction():
+        socialnetwork_model.init().query(
+            'DELETE FROM "load_checkpoint" WHERE "kind" = ? AND "filename" = ?',
+            _key(kind, filename))
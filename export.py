@@ -0,0 +1,164 @@
+"""
+Streaming export of the Users and Status tables
+
+Rows are read from a cursor a block at a time and written through a
+large output buffer, so memory use stays flat however big the tables
+are. CSV output uses the same header and column order as load_users and
+load_status_updates, so an export can be loaded back as it is. JSONL
+output writes one object per row with the same keys. Paths ending in
+.gz are gzip compressed. With several shards (see sharding), the rows
+of each shard are written in turn; with the memory storage engine, the
+rows of the memory store.
+
+    python export.py users users.csv
+    python export.py statuses statuses.jsonl.gz --user-id evmiles97
+"""
+
+import argparse
+from contextlib import ExitStack
+import csv
+import gzip
+import io
+import json
+import sys
+
+from peewee import chunked
+
+import sharding
+import storage
+
+# (CSV header, column) pairs in the layout the loaders read
+USER_COLUMNS = (('USER_ID', 'user_id'), ('EMAIL', 'email'), ('NAME', 'user_name'),
+                ('LASTNAME', 'user_last_name'))
+STATUS_COLUMNS = (('STATUS_ID', 'status_id'), ('USER_ID', 'user_id'),
+                  ('STATUS_TEXT', 'status_text'))
+TABLES = {'users': ('Users', USER_COLUMNS), 'statuses': ('Status', STATUS_COLUMNS)}
+FORMATS = ('csv', 'jsonl')
+
+# Rows fetched from the cursor per step, and bytes buffered per write
+FETCH_SIZE = 5000
+BUFFER_SIZE = 1 << 20
+
+
+def _open_output(path, compress):
+    # Text is encoded and, if compressing, gzipped BUFFER_SIZE bytes at a time
+    if compress:
+        raw = io.BufferedWriter(gzip.open(path, 'wb'), BUFFER_SIZE)
+    else:
+        raw = open(path, 'wb', buffering=BUFFER_SIZE)  # pylint: disable=R1732
+    return io.TextIOWrapper(raw, encoding='UTF-8', newline='')
+
+
+def _rows(databases, table, columns, user_id):
+    # Streams the rows of table in every database from a cursor,
+    # FETCH_SIZE at a time
+    for database in databases:
+        if isinstance(database, storage.MemoryStore):
+            names = [column for _, column in columns]
+            yield from chunked(database.rows(table, names, user_id), FETCH_SIZE)
+        else:
+            yield from _database_rows(database, table, columns, user_id)
+
+
+def _database_rows(database, table, columns, user_id):
+    names = ', '.join(f'"{column}"' for _, column in columns)
+    sql = f'SELECT {names} FROM "{table}"'
+    params = ()
+    if user_id is not None:
+        sql += ' WHERE "user_id" = ?'
+        params = (user_id,)
+    cursor = database.execute_sql(sql + ' ORDER BY "id"', params)
+    try:
+        while True:
+            block = cursor.fetchmany(FETCH_SIZE)
+            if not block:
+                return
+            yield block
+    finally:
+        cursor.close()
+
+
+def _open_snapshot(transactions, user_id):
+    # The shard databases to export from (only the user's shard when
+    # exporting one user), each with a read transaction entered on the
+    # transactions ExitStack. The memory store is its own source.
+    if storage.STORAGE['engine'] == 'memory':
+        return [storage.memory_store()]
+    databases = sharding.databases()
+    if user_id is not None:
+        databases = [databases[sharding.shard_index(user_id, len(databases))]]
+    for database in databases:
+        transactions.enter_context(database.atomic())
+    return databases
+
+
+def export_table(kind, path, output_format=None, user_id=None, compress=None):
+    """
+    Writes the rows of kind ('users' or 'statuses') to path and returns
+    the number of rows written.
+
+    - output_format: 'csv' or 'jsonl'; taken from the file name if None.
+    - user_id: only export that user (or that user's statuses).
+    - compress: gzip the output; True for names ending in .gz if None.
+    The rows come from one read transaction per shard, so the export is
+    a consistent snapshot of each shard even while other threads write.
+    """
+    table, columns = TABLES[kind]
+    name = path[:-3] if path.endswith('.gz') else path
+    if compress is None:
+        compress = path.endswith('.gz')
+    if output_format is None:
+        output_format = 'jsonl' if name.endswith(('.jsonl', '.json')) else 'csv'
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown export format: {output_format}")
+    headers = [header for header, _ in columns]
+    count = 0
+    with _open_output(path, compress) as file, ExitStack() as transactions:
+        databases = _open_snapshot(transactions, user_id)
+        if output_format == 'csv':
+            writer = csv.writer(file)
+            writer.writerow(headers)
+            for block in _rows(databases, table, columns, user_id):
+                writer.writerows(block)
+                count += len(block)
+        else:
+            for block in _rows(databases, table, columns, user_id):
+                file.write(''.join(json.dumps(dict(zip(headers, row))) + '\n'
+                                   for row in block))
+                count += len(block)
+    return count
+
+
+def export_users(path, output_format=None, user_id=None, compress=None):
+    """
+    Exports the Users table to path; see export_table.
+    """
+    return export_table('users', path, output_format, user_id, compress)
+
+
+def export_statuses(path, output_format=None, user_id=None, compress=None):
+    """
+    Exports the Status table to path; see export_table.
+    """
+    return export_table('statuses', path, output_format, user_id, compress)
+
+
+def cli(argv=None):
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('table', choices=sorted(TABLES))
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=FORMATS, dest='output_format')
+    parser.add_argument('--user-id')
+    parser.add_argument('--gzip', action='store_true', default=None)
+    options = parser.parse_args(argv)
+    count = export_table(options.table, options.path, options.output_format,
+                         options.user_id, options.gzip)
+    print(f'Exported {count} {options.table} to {options.path}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(cli())
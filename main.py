@@ -4,16 +4,33 @@ main driver for a simple social network project
 # pylint: disable=C0200
 # pylint: disable=R0912
 # pylint: disable=R1710
+# pylint: disable=R0913
+# pylint: disable=R0914
+# pylint: disable=C0302
 
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import csv
 from datetime import datetime
+import atexit
 import logging
+from logging.handlers import QueueHandler, QueueListener
+from operator import itemgetter
+import queue
+import re
+import time
 
-from peewee import IntegrityError
+from peewee import IntegrityError, OperationalError
 
+import cache
+import checkpoint
+import parallel_loader
+import sharding
+import snapshot
+import storage
 import users
 import user_status
-from socialnetwork_model import Users, Status
+import socialnetwork_model as model
 
 # Setting Up Logger
 logger = logging.getLogger(__name__)
@@ -33,8 +50,157 @@ file_handler.setFormatter(formatter)
 # Add file_handler to our logger
 logger.addHandler(file_handler)
 
+# Asynchronous logging: the queue handler and the listener thread that
+# does the file writes while it is on
+_async_logging = {'handler': None, 'listener': None}
 
-def load_users(filename):
+# Bulk-load logging: 'row' logs a line for every row (every batch in the
+# bulk loaders), 'summary' only logs aggregate counts per load with a few
+# sample ids for each kind of rejected row
+LOAD_LOGGING = {'mode': 'row', 'samples': 5}
+LOAD_OUTCOMES = ('loaded', 'updated', 'duplicate', 'invalid', 'missing_user')
+
+
+def enable_async_logging():
+    """
+    Moves log file writes off the calling threads: records go through an
+    in-memory queue and a listener thread writes them to the log file.
+    """
+    if _async_logging['listener'] is not None:
+        return
+    log_queue = queue.SimpleQueue()
+    handler = QueueHandler(log_queue)
+    listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    logger.addHandler(handler)
+    logger.removeHandler(file_handler)
+    _async_logging.update(handler=handler, listener=listener)
+    atexit.register(disable_async_logging)
+
+
+def disable_async_logging():
+    """
+    Writes out every queued record and goes back to writing the log file
+    directly.
+    """
+    if _async_logging['listener'] is None:
+        return
+    logger.addHandler(file_handler)
+    logger.removeHandler(_async_logging['handler'])
+    _async_logging['listener'].stop()
+    _async_logging.update(handler=None, listener=None)
+    atexit.unregister(disable_async_logging)
+
+
+def configure_load_logging(mode='row', samples=5):
+    """
+    Sets how the loaders log: 'row' for one line per row (or batch), or
+    'summary' for one summary per load with up to samples example ids
+    of each kind of rejected row.
+    """
+    if mode not in ('row', 'summary'):
+        raise ValueError(f"Unknown load logging mode: {mode}")
+    LOAD_LOGGING.update(mode=mode, samples=samples)
+
+
+def _row_logging():
+    return LOAD_LOGGING['mode'] == 'row'
+
+
+def _new_load_report():
+    report = dict.fromkeys(LOAD_OUTCOMES, 0)
+    report.update(samples={}, start=time.perf_counter())
+    return report
+
+
+# Users table columns, in the order of parallel_loader.USER_FIELDS
+USER_COLUMNS = ('user_id', 'email', 'user_name', 'user_last_name')
+
+# Load report outcome for each upsert_rows outcome
+_UPSERT_OUTCOMES = {'inserted': 'loaded', 'updated': 'updated', 'skipped': 'duplicate'}
+
+
+def _tally(report, outcome, row_id):
+    report[outcome] += 1
+    if outcome != 'loaded':
+        samples = report['samples'].setdefault(outcome, [])
+        if len(samples) < LOAD_LOGGING['samples']:
+            samples.append(row_id)
+
+
+def _log_load_summary(report, kind, filename):
+    elapsed = time.perf_counter() - report['start']
+    rows = sum(report[outcome] for outcome in LOAD_OUTCOMES)
+    logger.info("Loaded %s from %s: %d loaded, %d updated, %d duplicate, %d invalid, "
+                "%d missing user in %.2fs (%.0f rows/sec)", kind, filename,
+                report['loaded'], report['updated'], report['duplicate'], report['invalid'],
+                report['missing_user'], elapsed, rows / elapsed if elapsed else 0)
+    for outcome, samples in report['samples'].items():
+        logger.info("Sample %s %s: %s", outcome.replace('_', ' '), kind, ', '.join(
+            str(sample) for sample in samples))
+
+# Bounded set of user_ids known to exist, kept correct by add_user and
+# delete_user so that status writes don't need to probe the Users table
+KNOWN_USERS_SIZE = 10000
+known_users = cache.make_lru(KNOWN_USERS_SIZE)
+
+# Read-through caches for search_user and search_status, invalidated by
+# the update_* and delete_* functions
+SEARCH_CACHE_SIZE = 1024
+user_cache = cache.make_lru(SEARCH_CACHE_SIZE)
+status_cache = cache.make_lru(SEARCH_CACHE_SIZE)
+
+# Rows fetched per query by list_statuses
+LIST_PAGE_SIZE = 100
+
+
+def configure_search_cache(maxsize=SEARCH_CACHE_SIZE, ttl=None):
+    """
+    Sets the size and the optional TTL (in seconds) of the search
+    caches. A maxsize of 0 turns the caches off.
+    """
+    user_cache.configure(maxsize, ttl)
+    status_cache.configure(maxsize, ttl)
+
+
+def search_cache_stats():
+    """
+    Returns the hit, miss, eviction and expiration counters of the
+    search caches.
+    """
+    return {'user': user_cache.stats(), 'status': status_cache.stats()}
+
+
+def clear_caches():
+    """
+    Empties every in-process cache, for when the tables are changed
+    behind main's back (such as when the database is dropped).
+    """
+    known_users.clear()
+    user_cache.clear()
+    status_cache.clear()
+
+
+def user_exists(user_id):
+    """
+    Checks if a user_id exists, first in the known_users cache and
+    then with an indexed lookup on the Users table (no writes).
+
+    Requirements:
+    - Returns True if the user exists.
+    - Otherwise, it returns False.
+    """
+    if known_users.contains(user_id):
+        return True
+    since = known_users.generation()
+    user_probe = users.exists_user_table(sharding.tables_for(user_id)[0])
+    if user_probe(user_id):
+        known_users.put(user_id, since=since)
+        return True
+    return False
+
+
+def load_users(filename, chunk_size=None, on_conflict='skip'):
     """
     Opens a CSV file with user data and
     adds it to an existing instance of
@@ -47,12 +213,20 @@ def load_users(filename):
     - Returns False if there are any errors
     (such as empty fields in the source CSV file)
     - Otherwise, it returns True.
+    - If chunk_size is given, rows are written chunk_size at a time
+    with one multi-row insert per chunk (see load_users_bulk).
+    - on_conflict other than 'skip' ('overwrite' or 'fail') loads in
+    chunks as well, with that policy for existing user_ids.
     """
+    if chunk_size or on_conflict != 'skip':
+        return load_users_bulk(filename, chunk_size or 1000, on_conflict=on_conflict)
+    report = _new_load_report()
     try:
         with open(filename, 'r', encoding='UTF-8') as file:
             reader = csv.DictReader(file)
             for row in reader:
                 if "" in row.values():
+                    _tally(report, 'invalid', row.get('USER_ID'))
                     fin_bool = False
                     break
 
@@ -61,98 +235,199 @@ def load_users(filename):
                     email = row['EMAIL']
                     user_name = row['NAME']
                     user_last_name = row['LASTNAME']
-                    try:
-                        user_insert = users.add_user_table(Users)
-                        user_insert(user_id=user_id, email=email,
-                                    user_name=user_name, user_last_name=user_last_name)
-                        fin_bool = True
-                        logger.info("New user with id %s was loaded successfully ", user_id)
-                    except IntegrityError:
-                        fin_bool = False
-                        logger.error("Failed to load user with id %s", user_id)
+                    user_insert = users.add_users_table(sharding.tables_for(user_id)[0])
+                    fin_bool = user_insert([{'user_id': user_id, 'email': email,
+                                             'user_name': user_name,
+                                             'user_last_name': user_last_name}])[0]
+                    if fin_bool:
+                        _tally(report, 'loaded', user_id)
+                        if _row_logging():
+                            logger.info("New user with id %s was loaded successfully ",
+                                        user_id)
+                    else:
+                        _tally(report, 'duplicate', user_id)
+                        if _row_logging():
+                            logger.error("Failed to load user with id %s", user_id)
                 except KeyError:
                     print('Parameter omitted in csv file!')
+                    _log_load_summary(report, 'users', filename)
                     return False
+        _log_load_summary(report, 'users', filename)
         return fin_bool
     except FileNotFoundError:
         print('File Not Found')
         return False
 
 
+def _user_batches(filename, chunk_size):
+    """
+    Yields (batch, error) pairs of user dicts from the users CSV file,
+    as parallel_loader.iter_row_batches does, read with the configured
+    parallel_loader reader backend.
+    """
+    if parallel_loader.READER['backend'] == 'mmap':
+        header, offset = parallel_loader.read_header(filename)
+        for batch, error in parallel_loader.iter_file_batches(
+                filename, offset, header, chunk_size, parallel_loader.USER_FIELDS):
+            yield [dict(zip(USER_COLUMNS, row)) for row in batch], error
+        return
+    with open(filename, 'r', encoding='UTF-8') as file:
+        batch = []
+        for row in csv.DictReader(file):
+            if "" in row.values():
+                yield batch, 'empty'
+                return
+            try:
+                batch.append({'user_id': row['USER_ID'], 'email': row['EMAIL'],
+                              'user_name': row['NAME'], 'user_last_name': row['LASTNAME']})
+            except KeyError:
+                yield batch, 'missing'
+                return
+            if len(batch) >= chunk_size:
+                yield batch, None
+                batch = []
+        if batch:
+            yield batch, None
+
+
+def load_users_bulk(filename, chunk_size=1000, validate=False, on_conflict='skip'):
+    """
+    Bulk version of load_users: reads the CSV file in chunks of
+    chunk_size rows and writes every chunk with a single multi-row
+    insert inside one transaction.
+
+    Requirements:
+    - Same duplicate-skip and empty-field rules as load_users, and
+    the same True/False result (the outcome of the last row read).
+    - If validate is True, rows failing validate_columns are skipped.
+    - on_conflict sets what happens to rows whose user_id exists:
+    'skip' leaves the stored user, 'overwrite' replaces it, and 'fail'
+    stops the load (returning False) without writing that chunk.
+    - Logs the number of rows loaded and the rows/sec rate.
+    """
+    fin_bool = False
+    report = _new_load_report()
+
+    def upsert(tables, rows):
+        return users.upsert_users_table(tables[0])(rows, on_conflict)
+
+    def flush(batch):
+        mask = [True] * len(batch)
+        if validate:
+            mask = validate_columns({field: [row[field] for row in batch]
+                                     for field in batch[0]})
+        written = iter(sharding.scatter([row for row, valid in zip(batch, mask) if valid],
+                                        itemgetter('user_id'), upsert))
+        outcomes = [next(written) if valid else 'invalid' for valid in mask]
+        for row, outcome in zip(batch, outcomes):
+            _tally(report, _UPSERT_OUTCOMES.get(outcome, outcome), row['user_id'])
+            if outcome == 'updated':
+                user_cache.discard(row['user_id'])
+        if _row_logging():
+            logger.info("Loaded chunk of %d users (%d updated, %d skipped)",
+                        outcomes.count('inserted'), outcomes.count('updated'),
+                        len(outcomes) - outcomes.count('inserted') - outcomes.count('updated'))
+        return outcomes[-1] in ('inserted', 'updated')
+
+    completed = True
+    try:
+        for batch, error in _user_batches(filename, chunk_size):
+            if batch:
+                fin_bool = flush(batch)
+            if error == 'missing':
+                print('Parameter omitted in csv file!')
+            elif error:
+                _tally(report, 'invalid', None)
+            completed = completed and not error
+    except FileNotFoundError:
+        print('File Not Found')
+        return False
+    except IntegrityError as error:
+        logger.error("Stopped loading users from %s: %s", filename, error)
+        fin_bool = False
+
+    _log_load_summary(report, 'users', filename)
+    return fin_bool and completed
+
+
+def _make_validator(field, separators, max_length=None, email_separators=None):
+    """
+    Builds the validator for one field: after stripping the value and
+    removing the separator characters, it must be alphanumeric and, if
+    max_length is set, no longer than max_length. Email addresses that
+    contain '@' use email_separators instead.
+    """
+    def validate(value):
+        if not isinstance(value, str):
+            return False
+        check = value.strip()
+        if email_separators is not None and '@' in check:
+            check = email_separators.sub('', check)
+        else:
+            check = separators.sub('', check)
+        if max_length is not None and len(check) > max_length:
+            logger.error("Length constraint violated for %s", field)
+            return False
+        return check.isalnum()
+
+    return validate
+
+
+_SEPARATORS = re.compile(r'[ \-_]')
+_ID_SEPARATORS = re.compile(r'[ \-_.]')
+_EMAIL_SEPARATORS = re.compile(r'[ \-_.@]')
+
+# Per-field validators, built once at import
+FIELD_VALIDATORS = {
+    'user_id': _make_validator('user_id', _ID_SEPARATORS, max_length=30),
+    'status_id': _make_validator('status_id', _ID_SEPARATORS),
+    'user_name': _make_validator('user_name', _SEPARATORS, max_length=30),
+    'user_last_name': _make_validator('user_last_name', _SEPARATORS, max_length=100),
+    'status_text': _make_validator('status_text', _SEPARATORS),
+    'email': _make_validator('email', _SEPARATORS, email_separators=_EMAIL_SEPARATORS),
+}
+
+
 def validate_parameters(parameter, parameter_option):
     """
     validates user_id, email, user_name and user_last_name
+
+    parameter and parameter_option are either a single value and its
+    field name or two lists of values and field names. Field names that
+    have no validator make a single value invalid and are ignored in
+    lists.
     """
     if isinstance(parameter, str) and isinstance(parameter_option, str):
-        if parameter_option.lower().strip() in ['user_id', 'user_name',
-                                                'status_id', 'status_text', 'email']:
-            param_check = parameter.strip().replace(' ', '')
-            if '-' in parameter:
-                param_check = param_check.replace('-', '')
-
-            if '_' in parameter:
-                param_check = param_check.replace('_', '')
-
-            if (parameter_option.lower().strip() == 'user_id'
-                    or parameter_option.lower().strip() == 'status_id'
-                    and '.' in param_check):
-                param_check = param_check.replace('.', '')
-
-            if parameter_option.lower().strip() == 'email' and '@' in param_check:
-                if '.' in param_check:
-                    param_check = param_check.replace('.', '')
-                param_check = param_check.replace('@', '')
-
-            if (parameter_option.lower().strip() in ['user_id', 'user_name'] and
-                    len(param_check) > 30 or
-                    parameter_option.lower().strip() == 'user_last_name' and
-                    len(param_check) > 100):
-                logger.error("Length constraint violated for %s", parameter_option.lower().strip())
-                return False
-            if param_check.isalnum():
-                return True
-
-        return False
+        validator = FIELD_VALIDATORS.get(parameter_option.lower().strip())
+        return validator is not None and validator(parameter)
 
     if isinstance(parameter, list) and isinstance(parameter_option, list):
-        out = []
-        for index in range(len(parameter)):
-            if parameter_option[index].lower().strip() in ['user_id', 'user_name',
-                                                           'status_id', 'status_text',
-                                                           'email', 'user_last_name']:
-                param_check = parameter[index].strip().replace(' ', '')
-                if '-' in param_check:
-                    param_check = param_check.replace('-', '')
-
-                if '_' in param_check:
-                    param_check = param_check.replace('_', '')
-
-                if (parameter_option[index].lower().strip() == 'user_id' or
-                        parameter_option[index].lower().strip() == 'status_id'
-                        and '.' in param_check):
-                    param_check = param_check.replace('.', '')
-
-                if parameter_option[index].lower().strip() == 'email' and '@' in param_check:
-                    if '.' in param_check:
-                        param_check = param_check.replace('.', '')
-                    param_check = param_check.replace('@', '')
-                if (parameter_option[index].lower().strip() in ['user_id', 'user_name'] and
-                        len(param_check) > 30 or
-                        parameter_option[index].lower().strip() == 'user_last_name' and
-                        len(param_check) > 100):
-                    logger.error("Length constraint violated for %s",
-                                 parameter_option[index].lower().strip())
-                    out.append(False)
-                if param_check.isalnum():
-                    out.append(True)
-                else:
-                    out.append(False)
-        if all(out):
-            return True
-        return False
+        validators = [(FIELD_VALIDATORS.get(option.lower().strip()), value)
+                      for value, option in zip(parameter, parameter_option)]
+        return all(validator(value) for validator, value in validators if validator)
+    return False
 
 
-def load_status_updates(filename):
+def validate_columns(columns):
+    """
+    Validates a chunk of rows given as columns, a dict mapping each
+    field name to the list of that field's values.
+
+    Requirements:
+    - Returns a list with one bool per row, True if every field with a
+    validator is valid for that row.
+    """
+    row_count = len(next(iter(columns.values()), []))
+    mask = [True] * row_count
+    for option, values in columns.items():
+        validator = FIELD_VALIDATORS.get(option.lower().strip())
+        if validator is not None:
+            mask = [valid and validator(value) for valid, value in zip(mask, values)]
+    return mask
+
+
+def load_status_updates(filename, chunk_size=None, workers=None, on_conflict='skip',
+                        resume=False):
     """
     Opens a CSV file with status data and adds it to an existing
     instance of UserStatusCollection
@@ -163,12 +438,23 @@ def load_status_updates(filename):
     - Returns False if there are any errors(such as empty fields in the
       source CSV file)
     - Otherwise, it returns True.
+    - If chunk_size or workers is given, rows are written in batches
+    (see load_status_updates_bulk).
+    - on_conflict other than 'skip' ('overwrite' or 'fail') loads in
+    batches as well, with that policy for existing status_ids.
+    - resume=True loads in batches from the last checkpoint of an
+    interrupted load of the same file (see load_status_updates_bulk).
     """
+    if chunk_size or workers or on_conflict != 'skip' or resume:
+        return load_status_updates_bulk(filename, chunk_size or 1000, workers,
+                                        on_conflict=on_conflict, resume=resume)
+    report = _new_load_report()
     try:
         with open(filename, 'r', encoding='UTF-8') as file:
             reader = csv.DictReader(file)
             for row in reader:
                 if "" in row.values():
+                    _tally(report, 'invalid', row.get('STATUS_ID'))
                     fin_bool = False
                     break
 
@@ -176,33 +462,285 @@ def load_status_updates(filename):
                     status_id = row['STATUS_ID']
                     user_id = row['USER_ID']
                     status_text = row['STATUS_TEXT']
-                    try:
-                        user_insert = users.add_user_table(Users)
-                        user_insert(user_id=user_id)
-                        logger.error("No user exist for status with status id: %s d", status_id)
-                        Users.delete(user_id=user_id)
+                    if not user_exists(user_id):
+                        _tally(report, 'missing_user', status_id)
+                        if _row_logging():
+                            logger.error("No user exist for status with status id: %s d",
+                                         status_id)
+                        fin_bool = False
+                    elif _add_status_row(status_id, user_id, status_text):
+                        _tally(report, 'loaded', status_id)
+                        if _row_logging():
+                            logger.info("New status with status id: %s was added "
+                                        "successfully", status_id)
+                        fin_bool = True
+                    else:
+                        _tally(report, 'duplicate', status_id)
+                        if _row_logging():
+                            logger.error("Failed to add new status with status id: %s",
+                                         status_id)
                         fin_bool = False
-                    except IntegrityError:
-                        try:
-                            status_insert = user_status.add_status_table(Status)
-                            status_insert(status_id=status_id, user_id=user_id,
-                                          status_text=status_text)
-                            logger.info("New status with status id: %s was added successfully",
-                                        status_id)
-                            fin_bool = True
-                        except IntegrityError:
-                            logger.error("Failed to add new status with status id: %s", status_id)
-                            fin_bool = False
 
                 except KeyError:
                     print('Parameter omitted in csv file!')
+                    _log_load_summary(report, 'statuses', filename)
                     return False
+        _log_load_summary(report, 'statuses', filename)
         return fin_bool
     except FileNotFoundError:
         print('File Not Found')
         return False
 
 
+def add_status_batch(batch, validate=False, report=None, on_conflict='skip'):
+    """
+    Writes a batch of (status_id, user_id, status_text) tuples with one
+    user lookup and one multi-row insert.
+
+    Requirements:
+    - Rows whose user does not exist are skipped, as are rows failing
+    validate_columns if validate is True.
+    - Rows whose status_id already exists are handled by on_conflict
+    (see socialnetwork_model.upsert_rows); 'fail' raises IntegrityError.
+    - Returns one bool per row, True if the row was added or updated.
+    - The outcome of every row is counted in report, if given.
+    """
+    if report is None:
+        report = _new_load_report()
+    mask = [True] * len(batch)
+    if validate:
+        mask = validate_columns(dict(zip(('status_id', 'user_id', 'status_text'),
+                                         map(list, zip(*batch)))))
+    valid_rows = mask
+    missing = {row[1] for row, valid in zip(batch, mask)
+               if valid and not known_users.contains(row[1])}
+    if missing:
+        missing_ids = list(missing)
+        since = known_users.generation()
+        found = sharding.scatter(
+            missing_ids, lambda user_id: user_id,
+            lambda tables, ids: [user_id in users.existing_users_table(tables[0])(ids)
+                                 for user_id in ids])
+        for user_id, exists in zip(missing_ids, found):
+            if exists:
+                known_users.put(user_id, since=since)
+                missing.discard(user_id)
+    mask = [valid and row[1] not in missing for row, valid in zip(batch, mask)]
+
+    def upsert(tables, rows):
+        return user_status.upsert_statuses_table(tables[1])(rows, on_conflict)
+
+    rows = [{'status_id': status_id, 'user_id': user_id, 'status_text': status_text}
+            for (status_id, user_id, status_text), valid in zip(batch, mask) if valid]
+    tables = sharding.all_tables()
+    # A status goes to its user's shard, so the uniqueness of status_id
+    # across shards is checked and written under the process's write
+    # lock (storage.write_transaction), which every status writer takes
+    # first
+    with storage.write_transaction():
+        skipped, moved = _cross_shard_conflicts(rows, tables, on_conflict)
+        written = iter(sharding.scatter(
+            [row for position, row in enumerate(rows) if position not in skipped],
+            itemgetter('user_id'), upsert, tables))
+        owners = {rows[position]['status_id']: shard for position, shard in moved.items()}
+        for index, (_, status_table) in enumerate(tables):
+            stale = [status_id for status_id, shard in owners.items() if shard != index]
+            if stale:
+                user_status.delete_statuses_table(status_table)(stale)
+    row_outcomes = []
+    for position in range(len(rows)):
+        if position in skipped:
+            row_outcomes.append('skipped')
+        else:
+            # A moved status is inserted on its new shard but replaces one
+            outcome = next(written)
+            row_outcomes.append('updated' if position in moved else outcome)
+    row_outcomes = iter(row_outcomes)
+    outcomes = [next(row_outcomes) if has_user else 'missing_user' if valid else 'invalid'
+                for valid, has_user in zip(valid_rows, mask)]
+    for row, outcome in zip(batch, outcomes):
+        _tally(report, _UPSERT_OUTCOMES.get(outcome, outcome), row[0])
+        if outcome == 'updated':
+            status_cache.discard(row[0])
+    results = [outcome in ('inserted', 'updated') for outcome in outcomes]
+    if _row_logging():
+        logger.info("Loaded batch of %d statuses (%d updated, %d skipped)",
+                    outcomes.count('inserted'), outcomes.count('updated'),
+                    len(results) - sum(results))
+    return results
+
+
+def _status_owners(status_ids, tables):
+    """
+    Returns {status_id: shard index} for those of status_ids stored on
+    any of the shards in tables, looked up on every shard at once.
+    """
+    status_ids = list(status_ids)
+    found = sharding.gather(
+        lambda shard: storage.backend(shard[1]).existing('status_id', status_ids), tables)
+    return {status_id: index for index, present in reversed(list(enumerate(found)))
+            for status_id in present}
+
+
+def _cross_shard_conflicts(rows, tables, on_conflict):
+    """
+    Finds the status rows whose status_id is already stored on another
+    shard than their user's, or goes there earlier in rows. With
+    on_conflict 'fail' raises IntegrityError; otherwise returns the set
+    of the positions of the rows to skip ('skip') and {position: shard
+    index} of the rows that move the status to their user's shard
+    ('overwrite'), to be deleted from every other shard once written.
+    """
+    skipped, moved = set(), {}
+    if len(tables) < 2 or not rows:
+        return skipped, moved
+    owners = _status_owners({row['status_id'] for row in rows}, tables)
+    for position, row in enumerate(rows):
+        status_id = row['status_id']
+        shard = sharding.shard_index(row['user_id'], len(tables))
+        if owners.setdefault(status_id, shard) == shard:
+            continue
+        if on_conflict == 'fail':
+            raise IntegrityError(f'UNIQUE constraint failed: Status.status_id '
+                                 f'({status_id!r})')
+        if on_conflict == 'overwrite':
+            owners[status_id] = moved[position] = shard
+        else:
+            skipped.add(position)
+    return skipped, moved
+
+
+def _add_status_row(status_id, user_id, status_text):
+    """
+    Inserts a status on its user's shard unless status_id is already
+    stored on any shard; returns whether it was inserted.
+    """
+    tables = sharding.all_tables()
+    with storage.write_transaction():
+        if len(tables) > 1 and _status_owners([status_id], tables):
+            return False
+        status_insert = user_status.add_statuses_table(sharding.tables_for(user_id, tables)[1])
+        return status_insert([{'status_id': status_id, 'user_id': user_id,
+                               'status_text': status_text}])[0]
+
+
+def _parallel_status_batches(filename, start, header, options):
+    """
+    Yields the (batch, error, offset) triples of the file in order (see
+    parallel_loader.iter_offset_batches), parsed by a pool of worker
+    processes over row-aligned byte ranges. offset is only set on the
+    last batch of a range. Only a few ranges are in flight at a time so
+    memory use stays bounded.
+    """
+    workers, chunk_size, chunk_bytes = options
+    tasks = iter([(filename, range_start, range_end, header, chunk_size)
+                  for range_start, range_end in
+                  parallel_loader.split_ranges(filename, start, chunk_bytes)])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append((task, pool.submit(parallel_loader.parse_range, task)))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            (_, range_start, range_end, _, _), future = pending.popleft()
+            results = future.result()
+            if results and results[-1][1] == 'unaligned':
+                # A quoted field spans the range boundary: the range start
+                # is still a row boundary, so parse the rest serially
+                for _, future in pending:
+                    future.cancel()
+                yield from parallel_loader.iter_offset_batches(
+                    filename, range_start, header, chunk_size)
+                return
+            task = next(tasks, None)
+            if task:
+                pending.append((task, pool.submit(parallel_loader.parse_range, task)))
+            for index, (batch, error) in enumerate(results):
+                last = index == len(results) - 1 and not error
+                yield batch, error, range_end if last else None
+            if results and results[-1][1]:
+                for _, future in pending:
+                    future.cancel()
+                return
+
+
+def load_status_updates_bulk(filename, chunk_size=1000, workers=None,
+                             chunk_bytes=8 * 1024 * 1024, validate=False, on_conflict='skip',
+                             resume=False):
+    """
+    Batched version of load_status_updates. With workers set, the file
+    is split into byte ranges aligned to row boundaries which are parsed
+    and validated by a pool of worker processes, while this process is
+    the single writer that owns the database connection.
+
+    Requirements:
+    - Same duplicate, missing-user, empty-field and missing-column rules
+    as load_status_updates, and the same True/False result.
+    - If validate is True, rows failing validate_columns are skipped.
+    - on_conflict sets what happens to rows whose status_id exists:
+    'skip' leaves the stored status, 'overwrite' replaces it, and 'fail'
+    stops the load (returning False) without writing that batch.
+    - Every batch commits together with a checkpoint of the byte offset
+    and row count reached. If resume is True, the load continues from
+    the checkpoint of an earlier load of the same, unchanged file. The
+    checkpoint is removed once the whole file has loaded.
+    - The memory storage engine keeps no checkpoints (they would go to
+    the main database file): resume loads the whole file again.
+    - Logs the number of rows loaded and the rows/sec rate.
+    """
+    report = _new_load_report()
+    checkpoints = storage.STORAGE['engine'] != 'memory'
+    try:
+        header, offset = parallel_loader.read_header(filename)
+        file_print = checkpoint.fingerprint(filename) if checkpoints else None
+    except FileNotFoundError:
+        print('File Not Found')
+        return False
+    rows_done = 0
+    if resume and not checkpoints:
+        logger.info("No checkpoints with the memory storage engine, loading %s from the "
+                    "start", filename)
+    elif resume:
+        saved = checkpoint.load('statuses', filename, file_print)
+        if saved is None:
+            logger.info("No checkpoint matches %s, loading it from the start", filename)
+        else:
+            offset, rows_done = saved
+            logger.info("Resuming %s after %d rows (byte %d)", filename, rows_done, offset)
+    if workers and workers > 1:
+        batches = _parallel_status_batches(filename, offset, header,
+                                           (workers, chunk_size, chunk_bytes))
+    else:
+        batches = parallel_loader.iter_offset_batches(filename, offset, header, chunk_size)
+    fin_bool = False
+    completed = True
+    try:
+        for batch, error, position in batches:
+            if batch:
+                with storage.write_transaction():
+                    fin_bool = add_status_batch(batch, validate, report, on_conflict)[-1]
+                    rows_done += len(batch)
+                    if checkpoints and position is not None:
+                        checkpoint.save('statuses', filename, file_print, position, rows_done)
+            if error:
+                completed = False
+                if error == 'missing':
+                    print('Parameter omitted in csv file!')
+                else:
+                    _tally(report, 'invalid', None)
+                fin_bool = False
+    except IntegrityError as error:
+        logger.error("Stopped loading statuses from %s: %s", filename, error)
+        fin_bool = completed = False
+    finally:
+        batches.close()
+    if checkpoints and completed:
+        checkpoint.clear('statuses', filename)
+    _log_load_summary(report, 'statuses', filename)
+    return fin_bool
+
+
 def add_user(user_id, email, user_name, user_last_name):
     """
 
@@ -215,16 +753,16 @@ def add_user(user_id, email, user_name, user_last_name):
     d_bool = validate_parameters([user_id, email, user_name, user_last_name],
                                  ['user_id', 'email', 'user_name', 'user_last_name'])
     if d_bool:
-        try:
-            user_insert = users.add_user_table(Users)
-            user_insert(user_id=user_id, email=email, user_name=user_name,
-                        user_last_name=user_last_name)
+        since = known_users.generation()
+        user_insert = users.add_users_table(sharding.tables_for(user_id)[0])
+        if user_insert([{'user_id': user_id, 'email': email, 'user_name': user_name,
+                         'user_last_name': user_last_name}])[0]:
+            known_users.put(user_id, since=since)
             logger.info("New user with id %s was added successfully ", user_id)
             return True
 
-        except IntegrityError:
-            logger.error("Failed to add new user with id %s", user_id)
-            return False
+        logger.error("Failed to add new user with id %s", user_id)
+        return False
     return d_bool
 
 
@@ -239,10 +777,12 @@ def update_user(user_id, email, user_name, user_last_name):
     d_bool = validate_parameters([user_id, email, user_name, user_last_name],
                                  ['user_id', 'email', 'user_name', 'user_last_name'])
     if d_bool:
-        if Users.find_one(user_id=user_id) is not None:
-            user_update = users.update_user_table(Users)
+        user_table = sharding.tables_for(user_id)[0]
+        if storage.backend(user_table).exists('user_id', user_id):
+            user_update = users.update_user_table(user_table)
             user_update(user_id=user_id, email=email, user_name=user_name,
                         user_last_name=user_last_name, columns=['user_id'])
+            user_cache.discard(user_id)
             logger.info("User(%s) information was modified successfully", user_id)
             return True
 
@@ -261,12 +801,17 @@ def delete_user(user_id):
     """
     d_bool = validate_parameters(user_id, 'user_id')
     if d_bool:
-        if Users.find_one(user_id=user_id) is not None:
-            user_delete = users.delete_user_table(Users)
+        user_table, status_table = sharding.tables_for(user_id)
+        if storage.backend(user_table).exists('user_id', user_id):
+            user_delete = users.delete_user_table(user_table)
             user_delete(user_id=user_id)
-            if Status.find_one(user_id=user_id) is not None:
+            known_users.discard(user_id)
+            user_cache.discard(user_id)
+            if storage.backend(status_table).exists('user_id', user_id):
                 # Deleting all status associated with user with user_id
-                Status.delete(user_id=user_id)
+                status_delete = user_status.delete_status_table(status_table)
+                status_delete(user_id=user_id)
+            status_cache.discard_where(lambda status: status['user_id'] == user_id)
             logger.info("User(%s) information was deleted successfully", user_id)
             return True
 
@@ -283,12 +828,21 @@ def search_user(user_id):
     Requirements:
     - If the user is found, returns the corresponding User instance.
     - Otherwise, it returns None.
+    - Reads from the read snapshot when it is on (see snapshot).
     """
     d_bool = validate_parameters(user_id, 'user_id')
     if d_bool:
-        user_find = users.search_user_table(Users)
-        fin_bool = user_find(user_id=user_id)
-        return fin_bool
+        fin_bool = user_cache.get(user_id)
+        if fin_bool is None:
+            since = user_cache.generation()
+            with snapshot.reading() as tables:
+                user_find = users.search_user_table(sharding.tables_for(user_id, tables)[0])
+                fin_bool = user_find(user_id=user_id)
+            if fin_bool is None:
+                return None
+            if tables is None:
+                user_cache.put(user_id, fin_bool, since)
+        return dict(fin_bool)
     return None
 
 
@@ -306,26 +860,28 @@ def add_status(status_id, user_id, status_text):
     d_bool = validate_parameters([user_id, status_id, status_text],
                                  ['user_id', 'status_id', 'status_text'])
     if d_bool:
-        try:
-            user_insert = users.add_user_table(Users)
-            user_insert(user_id=user_id)
+        if not user_exists(user_id):
             logger.error("No user with user id:%s exist for status with status id: %s ",
                          user_id, status_id)
-            Users.delete(user_id=user_id)
             return False
-        except IntegrityError:
-            try:
-                status_insert = user_status.add_status_table(Status)
-                status_insert(status_id=status_id, user_id=user_id, status_text=status_text)
-                logger.info("New status with status id: %s was added successfully", status_id)
-
-                return True
-            except IntegrityError:
-                logger.error("Failed to add new status with status id: %s", status_id)
-                return False
+        if _add_status_row(status_id, user_id, status_text):
+            logger.info("New status with status id: %s was added successfully", status_id)
+            return True
+        logger.error("Failed to add new status with status id: %s", status_id)
+        return False
     return d_bool
 
 
+def _status_table(status_id):
+    """
+    Returns the Status table of the shard that holds status_id, looked
+    up on every shard at once, or None if there is no such status.
+    """
+    tables = sharding.all_tables()
+    owner = _status_owners([status_id], tables).get(status_id)
+    return None if owner is None else tables[owner][1]
+
+
 def update_status(status_id, user_id, status_text):
     """
     Updates the values of an existing status_id
@@ -337,10 +893,12 @@ def update_status(status_id, user_id, status_text):
     d_bool = validate_parameters([user_id, status_id, status_text],
                                  ['user_id', 'status_id', 'status_text'])
     if d_bool:
-        if Users.find_one(user_id=user_id) is not None:
-            if Status.find_one(status_id=status_id) is not None:
-                status_update = user_status.update_status_table(Status)
+        if storage.backend(sharding.tables_for(user_id)[0]).exists('user_id', user_id):
+            status_table = _status_table(status_id)
+            if status_table is not None:
+                status_update = user_status.update_status_table(status_table)
                 status_update(status_id=status_id, status_text=status_text, columns=['status_id'])
+                status_cache.discard(status_id)
                 logger.info("User(%s) status information with status id:"
                             "%s was modified successfully",
                             user_id, status_id)
@@ -364,9 +922,11 @@ def delete_status(status_id):
     """
     d_bool = validate_parameters(status_id, 'status_id')
     if d_bool:
-        if Status.find_one(status_id=status_id) is not None:
-            status_delete = user_status.delete_status_table(Status)
+        status_table = _status_table(status_id)
+        if status_table is not None:
+            status_delete = user_status.delete_status_table(status_table)
             status_delete(status_id=status_id)
+            status_cache.discard(status_id)
             logger.info("Status(%s) information was deleted successfully", status_id)
             return True
 
@@ -375,6 +935,134 @@ def delete_status(status_id):
     return d_bool
 
 
+def list_statuses(user_id, after=None, limit=None, page_size=LIST_PAGE_SIZE):
+    """
+    Lists the statuses of a user in status_id order
+
+    Requirements:
+    - Yields one dict per status, starting after the status_id after
+    (from the first status if after is None).
+    - Stops after limit statuses, or at the last status if limit is None.
+    - Reads page_size rows at a time, each page continuing from the last
+    status_id seen, so memory use stays flat and every page costs the
+    same however many statuses the user has.
+    - Pages are read from the read snapshot when it is on.
+    """
+    if not validate_parameters(user_id, 'user_id'):
+        return
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        with snapshot.reading() as tables:
+            status_page = user_status.list_statuses_table(
+                sharding.tables_for(user_id, tables)[1])
+            page = status_page(user_id, after, size)
+        yield from page
+        if len(page) < size:
+            return
+        after = page[-1]['status_id']
+        if remaining is not None:
+            remaining -= len(page)
+
+
+def user_summary(user_id):
+    """
+    Summarizes the statuses of a user
+
+    Requirements:
+    - Returns a dict with the user_id, status_count (the number of the
+    user's statuses) and last_status_at (the created_at of the latest
+    one, None if there is none).
+    - Returns None if the user does not exist.
+    - Reads the per-user summary kept up to date as statuses are added
+    and deleted, so no statuses are read.
+    - Reads from the read snapshot when it is on.
+    """
+    if not validate_parameters(user_id, 'user_id'):
+        return None
+    with snapshot.reading() as tables:
+        users_table, status_table = sharding.tables_for(user_id, tables)
+        count, last_status_at = user_status.status_summary_table(status_table)(user_id)
+        if not count and not storage.backend(users_table).exists('user_id', user_id):
+            return None
+    return {'user_id': user_id, 'status_count': count, 'last_status_at': last_status_at}
+
+
+def recent_statuses(user_id, n=10):
+    """
+    Lists the latest statuses of a user
+
+    Requirements:
+    - Returns up to n status dicts, with their created_at, newest first.
+    - Returns an empty list if the user has no statuses.
+    - Reads the (user_id, created_at) index, so the cost depends on n,
+    not on how many statuses the user has.
+    - Reads from the read snapshot when it is on.
+    """
+    if not validate_parameters(user_id, 'user_id') or n <= 0:
+        return []
+    with snapshot.reading() as tables:
+        status_recent = user_status.recent_statuses_table(
+            sharding.tables_for(user_id, tables)[1])
+        return status_recent(user_id, n)
+
+
+def _quote_terms(query):
+    # Plain-text fallback for queries that are not valid FTS5 syntax:
+    # every word becomes a quoted term, so all of them must match
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+def search_status_text(query, limit=10, offset=0):
+    """
+    Searches the text of all statuses
+
+    Requirements:
+    - Returns up to limit statuses whose text matches query, best
+    matches first, skipping the first offset matches.
+    - query may use FTS5 syntax (phrases, OR, NOT, prefix*); words in a
+    query that is not valid FTS5 are matched as plain terms.
+    - Returns an empty list if nothing matches.
+    - Searches the read snapshot when it is on.
+    """
+    if not query or not query.strip():
+        return []
+    try:
+        return _search_text(query, limit, offset)
+    except OperationalError:
+        logger.info("Status search %r is not FTS5 syntax, matching plain terms", query)
+        return _search_text(_quote_terms(query), limit, offset)
+
+
+def _search_text(query, limit, offset):
+    """
+    Runs one status text search. With several shards, every shard
+    returns its best limit + offset matches and they are merged by rank.
+    """
+    with snapshot.reading() as tables:
+        tables = tables or sharding.all_tables()
+        if len(tables) == 1:
+            return user_status.search_status_text_table(tables[0][1])(query, limit, offset)
+        pages = sharding.gather(lambda shard: user_status.search_status_text_table(shard[1])(
+            query, limit + offset, 0, ranked=True), tables)
+    matches = sorted((match for page in pages for match in page),
+                     key=itemgetter('rank'))[offset:offset + limit]
+    for match in matches:
+        del match['rank']
+    return matches
+
+
+def rebuild_status_search():
+    """
+    Rebuilds the status text search index from the stored statuses.
+    """
+    start = time.perf_counter()
+    for database in sharding.databases():
+        model.rebuild_status_index(database)
+    logger.info("Rebuilt status search index in %.2fs", time.perf_counter() - start)
+    return True
+
+
 def search_status(status_id):
     """
     Searches for a status in status_collection
@@ -383,10 +1071,222 @@ def search_status(status_id):
     - If the status is found, returns the corresponding
     UserStatus instance.
     - Otherwise, it returns None.
+    - Reads from the read snapshot when it is on.
     """
     d_bool = validate_parameters(status_id, 'status_id')
     if d_bool:
-        status_find = user_status.search_status_table(Status)
-        fin_bool = status_find(status_id=status_id)
-        return fin_bool
+        fin_bool = status_cache.get(status_id)
+        if fin_bool is None:
+            since = status_cache.generation()
+            with snapshot.reading() as tables:
+                fin_bool = next((status for status in sharding.gather(
+                    lambda shard: user_status.search_status_table(shard[1])(
+                        status_id=status_id), tables) if status is not None), None)
+            if fin_bool is None:
+                return None
+            if tables is None:
+                status_cache.put(status_id, fin_bool, since)
+        return dict(fin_bool)
     return None
+
+
+def _valid_ids(ids, field):
+    """
+    Returns the distinct ids in order and the subset of them that pass
+    the field validator, checked in one pass.
+    """
+    ids = list(dict.fromkeys(ids))
+    mask = validate_columns({field: ids})
+    return ids, [value for value, valid in zip(ids, mask) if valid]
+
+
+def add_users(rows):
+    """
+    Adds many users at once
+
+    Requirements:
+    - rows is an iterable of (user_id, email, user_name, user_last_name)
+    tuples, the arguments of add_user.
+    - All rows are validated in one pass and written with multi-row
+    inserts in one transaction.
+    - Returns one bool per row, True if that user was added (False if
+    it was invalid or its user_id already exists).
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    mask = validate_columns(dict(zip(USER_COLUMNS, map(list, zip(*rows)))))
+    since = known_users.generation()
+    added = iter(sharding.scatter([dict(zip(USER_COLUMNS, row))
+                                   for row, valid in zip(rows, mask) if valid],
+                                  itemgetter('user_id'),
+                                  lambda tables, rows: users.add_users_table(tables[0])(rows)))
+    results = [valid and next(added) for valid in mask]
+    for row, result in zip(rows, results):
+        if result:
+            known_users.put(row[0], since=since)
+    logger.info("Added %d of %d users", sum(results), len(results))
+    return results
+
+
+def update_users(rows):
+    """
+    Updates many existing users at once
+
+    Requirements:
+    - rows is an iterable of (user_id, email, user_name, user_last_name)
+    tuples, the arguments of update_user.
+    - Returns one bool per row, True if that user existed and was
+    updated.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    mask = validate_columns(dict(zip(USER_COLUMNS, map(list, zip(*rows)))))
+    valid_rows = [dict(zip(USER_COLUMNS, row)) for row, valid in zip(rows, mask) if valid]
+
+    def update(tables, rows):
+        with storage.backend(tables[0]).write_transaction():
+            user_lookup = users.existing_users_table(tables[0])
+            existing = user_lookup(row['user_id'] for row in rows)
+            user_upsert = users.upsert_users_table(tables[0])
+            user_upsert([row for row in rows if row['user_id'] in existing], 'overwrite')
+        return [row['user_id'] in existing for row in rows]
+
+    updated = sharding.scatter(valid_rows, itemgetter('user_id'), update)
+    existing = {row['user_id'] for row, found in zip(valid_rows, updated) if found}
+    for user_id in existing:
+        user_cache.discard(user_id)
+    results = [valid and row[0] in existing for row, valid in zip(rows, mask)]
+    logger.info("Updated %d of %d users", sum(results), len(results))
+    return results
+
+
+def search_users(user_ids):
+    """
+    Searches for many users at once
+
+    Requirements:
+    - Returns a dict mapping every requested user_id to a copy of its
+    user (as search_user returns it), or None if it does not exist.
+    - Users not in the search cache are read with chunked IN queries,
+    from the read snapshot when it is on.
+    """
+    user_ids, valid_ids = _valid_ids(user_ids, 'user_id')
+    found = {}
+    missing = []
+    for user_id in valid_ids:
+        cached = user_cache.get(user_id)
+        if cached is None:
+            missing.append(user_id)
+        else:
+            found[user_id] = cached
+    if missing:
+        since = user_cache.generation()
+        with snapshot.reading() as tables:
+            users_found = sharding.scatter(
+                missing, lambda user_id: user_id,
+                lambda shard, ids: list(map(users.search_users_table(shard[0])(ids).get, ids)),
+                tables)
+        for user_id, user in zip(missing, users_found):
+            if user is not None:
+                if tables is None:
+                    user_cache.put(user_id, user, since)
+                found[user_id] = user
+    return {user_id: dict(found[user_id]) if user_id in found else None
+            for user_id in user_ids}
+
+
+def delete_users(user_ids):
+    """
+    Deletes many users, and their statuses, at once
+
+    Requirements:
+    - The users and their statuses are deleted with chunked IN queries
+    in one transaction.
+    - Returns a dict mapping every requested user_id to True if it was
+    deleted, or False if it did not exist or was invalid.
+    """
+    user_ids, valid_ids = _valid_ids(user_ids, 'user_id')
+
+    def delete(tables, ids):
+        with storage.backend(tables[0]).write_transaction():
+            user_lookup = users.existing_users_table(tables[0])
+            existing = user_lookup(ids)
+            if existing:
+                status_delete = user_status.delete_statuses_table(tables[1])
+                status_delete(existing, 'user_id')
+                user_delete = users.delete_users_table(tables[0])
+                user_delete(existing)
+        return [user_id in existing for user_id in ids]
+
+    deleted = sharding.scatter(valid_ids, lambda user_id: user_id, delete)
+    existing = {user_id for user_id, found in zip(valid_ids, deleted) if found}
+    for user_id in existing:
+        known_users.discard(user_id)
+        user_cache.discard(user_id)
+    if existing:
+        status_cache.discard_where(lambda status: status['user_id'] in existing)
+    logger.info("Deleted %d of %d users", len(existing), len(user_ids))
+    return {user_id: user_id in existing for user_id in user_ids}
+
+
+def search_statuses(status_ids):
+    """
+    Searches for many statuses at once
+
+    Requirements:
+    - Returns a dict mapping every requested status_id to a copy of its
+    status (as search_status returns it), or None if it does not exist.
+    - Statuses not in the search cache are read with chunked IN queries,
+    from the read snapshot when it is on.
+    """
+    status_ids, valid_ids = _valid_ids(status_ids, 'status_id')
+    found = {}
+    missing = []
+    for status_id in valid_ids:
+        cached = status_cache.get(status_id)
+        if cached is None:
+            missing.append(status_id)
+        else:
+            found[status_id] = cached
+    if missing:
+        since = status_cache.generation()
+        with snapshot.reading() as tables:
+            pages = sharding.gather(
+                lambda shard: user_status.search_statuses_table(shard[1])(missing), tables)
+        for statuses in pages:
+            for status_id, status in statuses.items():
+                if tables is None:
+                    status_cache.put(status_id, status, since)
+                found[status_id] = status
+    return {status_id: dict(found[status_id]) if status_id in found else None
+            for status_id in status_ids}
+
+
+def delete_statuses(status_ids):
+    """
+    Deletes many statuses at once
+
+    Requirements:
+    - The statuses are deleted with chunked IN queries in one
+    transaction.
+    - Returns a dict mapping every requested status_id to True if it
+    was deleted, or False if it did not exist or was invalid.
+    """
+    status_ids, valid_ids = _valid_ids(status_ids, 'status_id')
+
+    def delete(tables):
+        with storage.backend(tables[1]).write_transaction():
+            status_find = user_status.search_statuses_table(tables[1])
+            existing = set(status_find(valid_ids))
+            if existing:
+                status_delete = user_status.delete_statuses_table(tables[1])
+                status_delete(existing)
+        return existing
+
+    existing = set().union(*sharding.gather(delete))
+    for status_id in existing:
+        status_cache.discard(status_id)
+    logger.info("Deleted %d of %d statuses", len(existing), len(status_ids))
+    return {status_id: status_id in existing for status_id in status_ids}
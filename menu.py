@@ -1,9 +1,53 @@
 """
 Provides a basic frontend
+
+Run without arguments for the interactive menu. With --batch it runs a
+file of JSON commands instead, one per line, each naming a main
+function and its arguments:
+
+    {"op": "add_user", "user_id": "adark", "email": "a@uw.edu",
+     "user_name": "aarol", "user_last_name": "dark"}
+    {"op": "add_status", "status_id": "a_1", "user_id": "adark",
+     "status_text": "Hello"}
+
+    python menu.py --batch commands.jsonl --group-size 500 --workers 4
+    python menu.py --batch - < commands.jsonl
+
+Commands run in groups of --group-size on --workers threads. A group
+with any write runs in one transaction (see socialnetwork_model.run_batch),
+which holds the process's write lock, so write groups run one at a time.
+Groups of read-only commands (READ_OPERATIONS) take no write lock and
+run in parallel with each other and with the writes. Every command's
+result is printed as a JSON line, in input order, followed by a
+throughput summary. With more than one worker, groups may run out of
+order, so commands that depend on each other belong in the same group.
 """
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import json
 import sys
+import time
+from types import GeneratorType
+import export
 import main
-from socialnetwork_model import Users, Status, dataset
+import sharding
+import socialnetwork_model
+import storage
+
+# Statuses shown per page by list_statuses
+STATUS_PAGE_SIZE = 10
+
+# main functions a batch command may name in "op"
+BATCH_OPERATIONS = ('add_user', 'update_user', 'delete_user', 'search_user',
+                    'add_status', 'update_status', 'delete_status', 'search_status',
+                    'list_statuses', 'search_status_text', 'user_summary',
+                    'recent_statuses')
+
+# The ops of BATCH_OPERATIONS that only read
+READ_OPERATIONS = ('search_user', 'search_status', 'list_statuses', 'search_status_text',
+                   'user_summary', 'recent_statuses')
 
 
 def load_users():
@@ -117,6 +161,58 @@ def search_status():
             print(f"{key.title()}: {value}")
 
 
+def list_statuses():
+    """
+    Lists the statuses of a user one page at a time
+    """
+    user_id = input('Enter user ID to list statuses for: ')
+    after = None
+    while True:
+        page = list(main.list_statuses(user_id, after, limit=STATUS_PAGE_SIZE))
+        if not page and after is None:
+            print("No statuses found for this user")
+            return
+        for status in page:
+            print(f"{status['status_id']}: {status['status_text']}")
+        if len(page) < STATUS_PAGE_SIZE:
+            return
+        after = page[-1]['status_id']
+        if input("Show more? [y/n]: ").lower()[:1] != "y":
+            return
+
+
+def search_status_text():
+    """
+    Searches the text of all statuses
+    """
+    query = input('Enter words to search statuses for: ')
+    results = main.search_status_text(query, limit=STATUS_PAGE_SIZE)
+    if not results:
+        print("No matching statuses found")
+    for status in results:
+        print(f"{status['status_id']} ({status['user_id']}): {status['status_text']}")
+
+
+def rebuild_status_search():
+    """
+    Rebuilds the status search index
+    """
+    main.rebuild_status_search()
+    print("Status search index was rebuilt")
+
+
+def export_data():
+    """
+    Exports users or statuses to a CSV or JSONL file
+    """
+    table = input('Export users or statuses? [u/s]: ').lower()[:1]
+    filename = input('Enter filename to export to (.csv, .jsonl, optionally .gz): ')
+    user_id = input('Only export user ID (leave blank for all): ').strip() or None
+    kind = 'statuses' if table == 's' else 'users'
+    count = export.export_table(kind, filename, user_id=user_id)
+    print(f"Exported {count} {kind} to {filename}")
+
+
 def delete_status():
     """
     Deletes status from the database
@@ -134,13 +230,148 @@ def quit_program():
     """
     print("Exiting program")
     if input("Would you like to drop the database? [y/n]: ").lower()[0] == "y":
-        Users.delete()
-        Status.delete()
-        dataset.close()
+        for users_table, status_table in sharding.all_tables():
+            users_table.delete()
+            status_table.delete()
+        main.clear_caches()
+        sharding.close()
+        socialnetwork_model.close()
         sys.exit()
 
 
+def _run_command(operation, arguments):
+    result = getattr(main, operation)(**arguments)
+    return list(result) if isinstance(result, GeneratorType) else result
+
+
+def read_commands(lines):
+    """
+    Yields (line number, op, call) for every non-blank line of JSON
+    commands; call is None, and op the error, for a line that is not a
+    valid command.
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            command = json.loads(line)
+            operation = command.pop('op')
+        except (ValueError, KeyError, AttributeError, TypeError):
+            yield number, 'invalid JSON command', None
+            continue
+        if operation not in BATCH_OPERATIONS:
+            yield number, f'unknown op {operation!r}', None
+            continue
+        yield number, operation, partial(_run_command, operation, command)
+
+
+def _attempt(call):
+    # (succeeded, result or exception) of call, as run_batch reports it
+    try:
+        return True, call()
+    except Exception as error:  # pylint: disable=W0718
+        return False, error
+
+
+def _run_group(group):
+    # Runs one group of commands, in one transaction if any of them
+    # writes; returns a result dict per command
+    calls = [call for _, _, call in group if call is not None]
+    if all(operation in READ_OPERATIONS for _, operation, call in group if call is not None):
+        outcomes = iter([_attempt(call) for call in calls])
+    else:
+        outcomes = iter(socialnetwork_model.run_batch(calls, storage.write_transaction)
+                        if calls else [])
+    results = []
+    for number, operation, call in group:
+        if call is None:
+            results.append({'line': number, 'ok': False, 'error': operation})
+            continue
+        succeeded, value = next(outcomes)
+        if succeeded:
+            results.append({'line': number, 'op': operation, 'ok': value is not False,
+                            'result': value})
+        else:
+            results.append({'line': number, 'op': operation, 'ok': False,
+                            'error': f'{type(value).__name__}: {value}'})
+    return results
+
+
+def _groups(commands, group_size):
+    group = []
+    for command in commands:
+        group.append(command)
+        if len(group) == group_size:
+            yield group
+            group = []
+    if group:
+        yield group
+
+
+def run_commands(lines, group_size=100, workers=1, output=None):
+    """
+    Runs the JSON commands in lines in groups of group_size on workers
+    threads: groups with writes one at a time, one transaction each, and
+    read-only groups alongside them. Prints one JSON result line per
+    command to output, in input order, then a throughput summary.
+    Returns a dict of the counts and timings.
+    """
+    if group_size < 1 or workers < 1:
+        raise ValueError('group_size and workers must be at least 1')
+    output = output or sys.stdout
+    summary = {'commands': 0, 'ok': 0, 'failed': 0, 'groups': 0}
+
+    def report(results):
+        summary['groups'] += 1
+        for result in results:
+            summary['commands'] += 1
+            summary['ok' if result['ok'] else 'failed'] += 1
+            print(json.dumps(result, default=str), file=output)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers, thread_name_prefix='menu-batch') as pool:
+        # At most two groups per worker in flight, so memory stays flat
+        pending = deque()
+        for group in _groups(read_commands(lines), group_size):
+            pending.append(pool.submit(sharding.released, partial(_run_group, group)))
+            if len(pending) >= 2 * workers:
+                report(pending.popleft().result())
+        while pending:
+            report(pending.popleft().result())
+    summary['seconds'] = round(time.perf_counter() - start, 6)
+    rate = summary['commands'] / summary['seconds'] if summary['seconds'] else 0
+    summary['commands_per_sec'] = round(rate, 1)
+    print(f"Ran {summary['commands']} commands ({summary['ok']} ok, {summary['failed']} "
+          f"failed) in {summary['groups']} groups on {workers} workers in "
+          f"{summary['seconds']:.3f}s: {rate:.1f} commands/sec", file=output)
+    return summary
+
+
+def cli(argv=None):
+    """
+    Command line entry point of the batch mode; returns the exit status,
+    1 if any command failed.
+    """
+    parser = argparse.ArgumentParser(description='Runs a file of JSON commands')
+    parser.add_argument('--batch', required=True, metavar='FILE',
+                        help="JSONL command file, '-' for standard input")
+    parser.add_argument('--group-size', type=int, default=100,
+                        help='commands per transaction')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='threads running groups of commands (read-only groups '
+                        'run in parallel, write groups one at a time)')
+    options = parser.parse_args(argv)
+    if options.batch == '-':
+        summary = run_commands(sys.stdin, options.group_size, options.workers)
+    else:
+        with open(options.batch, encoding='UTF-8') as file:
+            summary = run_commands(file, options.group_size, options.workers)
+    return 1 if summary['failed'] else 0
+
+
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        sys.exit(cli())
     menu_options = {
         'A': load_users,
         'B': load_status_updates,
@@ -152,6 +383,10 @@ if __name__ == '__main__':
         'H': update_status,
         'I': search_status,
         'J': delete_status,
+        'K': list_statuses,
+        'L': search_status_text,
+        'M': rebuild_status_search,
+        'N': export_data,
         'Q': quit_program
     }
     while True:
@@ -166,6 +401,10 @@ if __name__ == '__main__':
                             H: Update status
                             I: Search status
                             J: Delete status
+                            K: List statuses of a user
+                            L: Search status text
+                            M: Rebuild status search index
+                            N: Export users or statuses
                             Q: Quit
 
                             Please enter your choice: """)
@@ -0,0 +1,189 @@
+"""
+Optional per-operation metrics for the users and user_status closures
+
+Instrumentation is off by default. While it is off, instrument() and
+transaction() hand back what they were given, so the closures run
+exactly as before. After enable(), every instrumented closure records
+its call count, error count, a latency histogram and a histogram of the
+time spent inside its transaction. snapshot() returns the numbers and
+write_prometheus() writes them in the Prometheus text format.
+"""
+
+from contextlib import contextmanager
+from functools import wraps
+import os
+import threading
+import time
+
+# Upper bounds (seconds) of the histogram buckets; the last one is +Inf
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+           0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+PREFIX = 'socialnetwork'
+
+_state = {'enabled': False}
+_lock = threading.Lock()
+_operations = {}
+
+
+def enable():
+    """
+    Turns instrumentation on for closures created from now on.
+    """
+    _state['enabled'] = True
+
+
+def disable():
+    """
+    Turns instrumentation off for closures created from now on.
+    """
+    _state['enabled'] = False
+
+
+def is_enabled():
+    """
+    Returns True if instrumentation is on.
+    """
+    return _state['enabled']
+
+
+def reset():
+    """
+    Forgets everything recorded so far.
+    """
+    with _lock:
+        _operations.clear()
+
+
+def _new_histogram():
+    return {'count': 0, 'sum': 0.0, 'buckets': [0] * len(BUCKETS)}
+
+
+def _operation(name):
+    # Must be called with the lock held
+    if name not in _operations:
+        _operations[name] = {'calls': 0, 'errors': 0, 'latency': _new_histogram(),
+                             'transaction': _new_histogram()}
+    return _operations[name]
+
+
+def _observe(histogram, seconds):
+    histogram['count'] += 1
+    histogram['sum'] += seconds
+    for index, bound in enumerate(BUCKETS):
+        if seconds <= bound:
+            histogram['buckets'][index] += 1
+            break
+
+
+def instrument(name, func):
+    """
+    Returns func wrapped to record calls, errors and latency under name,
+    or func itself when instrumentation is off.
+    """
+    if not _state['enabled']:
+        return func
+
+    @wraps(func)
+    def instrumented(*args, **kwargs):
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = func(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            with _lock:
+                operation = _operation(name)
+                operation['calls'] += 1
+                operation['errors'] += failed
+                _observe(operation['latency'], elapsed)
+
+    return instrumented
+
+
+def transaction(name, context):
+    """
+    Returns the transaction context manager context, wrapped to record
+    the time spent inside it under name when instrumentation is on.
+    """
+    if not _state['enabled']:
+        return context
+    return _timed(name, context)
+
+
+@contextmanager
+def _timed(name, context):
+    with context:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with _lock:
+                _observe(_operation(name)['transaction'], elapsed)
+
+
+def snapshot():
+    """
+    Returns a copy of the recorded metrics: a dict mapping each operation
+    name to its calls, errors and latency and transaction histograms.
+    Histogram buckets are cumulative and keyed by their upper bound.
+    """
+    with _lock:
+        result = {}
+        for name, operation in _operations.items():
+            result[name] = {'calls': operation['calls'], 'errors': operation['errors']}
+            for kind in ('latency', 'transaction'):
+                histogram = operation[kind]
+                running = 0
+                buckets = {}
+                for bound, count in zip(BUCKETS, histogram['buckets']):
+                    running += count
+                    buckets[bound] = running
+                result[name][kind] = {'count': histogram['count'],
+                                      'sum': histogram['sum'], 'buckets': buckets}
+        return result
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+def prometheus_text():
+    """
+    Returns the recorded metrics in the Prometheus text exposition format.
+    """
+    data = snapshot()
+    lines = []
+    for metric, key, description in (
+            ('operation_calls_total', 'calls', 'Calls of each database operation.'),
+            ('operation_errors_total', 'errors', 'Database operations that raised.')):
+        lines.append(f'# HELP {PREFIX}_{metric} {description}')
+        lines.append(f'# TYPE {PREFIX}_{metric} counter')
+        for name, operation in sorted(data.items()):
+            lines.append(f'{PREFIX}_{metric}{{operation="{name}"}} {operation[key]}')
+    for metric, key, description in (
+            ('operation_latency_seconds', 'latency', 'Latency of each database operation.'),
+            ('transaction_seconds', 'transaction', 'Time spent inside the transaction.')):
+        lines.append(f'# HELP {PREFIX}_{metric} {description}')
+        lines.append(f'# TYPE {PREFIX}_{metric} histogram')
+        for name, operation in sorted(data.items()):
+            histogram = operation[key]
+            for bound, count in histogram['buckets'].items():
+                lines.append(f'{PREFIX}_{metric}_bucket{{operation="{name}",'
+                             f'le="{_format_bound(bound)}"}} {count}')
+            lines.append(f'{PREFIX}_{metric}_sum{{operation="{name}"}} {histogram["sum"]}')
+            lines.append(f'{PREFIX}_{metric}_count{{operation="{name}"}} {histogram["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(path):
+    """
+    Writes prometheus_text() to path, replacing the file atomically so a
+    collector never reads a half-written file.
+    """
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='UTF-8') as file:
+        file.write(prometheus_text())
+    os.replace(temporary, path)
@@ -0,0 +1,291 @@
+"""
+CSV parsing for the bulk loaders and the workers of the multi-process
+status loader
+
+The functions in this module only parse and validate CSV text, so they
+can run in a process pool without touching the database. The single
+writer that owns the SQLite connection lives in main.
+
+With configure_reader('mmap'), files are read through mmap: blocks of
+the mapped file that contain no quote character are split on newlines
+and commas directly, and only rows with quotes go through the csv
+module. Either way rows come out as tuples of the known columns instead
+of one dict per row.
+"""
+
+import csv
+import io
+import mmap
+from operator import itemgetter
+import os
+import re
+
+STATUS_FIELDS = ('STATUS_ID', 'USER_ID', 'STATUS_TEXT')
+USER_FIELDS = ('USER_ID', 'EMAIL', 'NAME', 'LASTNAME')
+
+# Bytes of the mapped file split per step by the mmap reader
+BLOCK_SIZE = 1 << 20
+
+# A carriage return that does not start a CRLF line ending
+_BARE_CR = re.compile(rb'\r(?!\n)')
+
+# 'mmap' for the mapped reader, 'csv' to read every row with the csv module
+READER = {'backend': 'csv'}
+
+
+def configure_reader(backend='csv'):
+    """
+    Selects how the bulk loaders read files: 'csv' (the csv module) or
+    'mmap' (the memory-mapped reader, see iter_rows).
+    """
+    if backend not in ('mmap', 'csv'):
+        raise ValueError(f"Unknown reader backend: {backend}")
+    READER['backend'] = backend
+
+
+def read_header(filename):
+    """
+    Returns the CSV header as a list and the byte offset of the
+    first data row.
+    """
+    with open(filename, 'rb') as file:
+        line = file.readline()
+        return next(csv.reader([line.decode('UTF-8')]), []), file.tell()
+
+
+def split_ranges(filename, start, chunk_bytes):
+    """
+    Splits filename from byte offset start into (start, end) ranges of
+    about chunk_bytes each. Every boundary is moved forward to the next
+    newline so that no range starts in the middle of a row.
+    """
+    size = os.path.getsize(filename)
+    ranges = []
+    with open(filename, 'rb') as file:
+        while start < size:
+            file.seek(min(start + chunk_bytes, size))
+            file.readline()
+            end = min(file.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _split_block(text):
+    # Rows of CSV text without quote characters, which plain splits
+    # parse exactly as csv.reader would. Returns None for text with a
+    # bare carriage return, which only csv handles.
+    if '\r' in text:
+        text = text.replace('\r\n', '\n')
+        if '\r' in text:
+            return None
+    return [line.split(',') for line in text.split('\n') if line]
+
+
+def _split_block_offsets(block, position, offsets):
+    # _split_block for the bytes of a block starting at byte offset
+    # position, with no bare carriage return. Before each row is
+    # returned, offsets is set to the byte offsets of the end of the
+    # row before it and of its own end, as _rows_with_offsets does.
+    # Blank lines come out as empty rows, as they do from csv.
+    lines = block.split(b'\n')
+    if not lines[-1]:
+        lines.pop()
+    stop = position + len(block)
+    for line in lines:
+        position = min(position + len(line) + 1, stop)
+        offsets[:] = [offsets[1], position]
+        text = line.decode('UTF-8').removesuffix('\r')
+        yield text.split(',') if text else []
+
+
+def _csv_rows(buffer, position, stop, offsets=None):
+    # Parses rows with csv from position in the mapped buffer until a
+    # row ends at or after stop. csv pulls lines one at a time, so the
+    # buffer position is always the end of the last row returned.
+    buffer.seek(position)
+    lines = (line.decode('UTF-8') for line in iter(buffer.readline, b''))
+    for row in csv.reader(lines):
+        if offsets is not None:
+            offsets[:] = [offsets[1], buffer.tell()]
+        yield row
+        if buffer.tell() >= stop:
+            return
+
+
+def _csv_file_rows(filename, start):
+    # Rows of filename from byte offset start, all parsed with csv
+    with open(filename, 'rb') as raw:
+        raw.seek(start)
+        with io.TextIOWrapper(raw, encoding='UTF-8', newline='') as text_file:
+            yield from csv.reader(text_file)
+
+
+def _block_end(buffer, position, size):
+    # End of the block starting at position: just after the last
+    # newline within BLOCK_SIZE bytes (or the first one after, for
+    # longer lines)
+    limit = position + BLOCK_SIZE
+    if limit >= size:
+        return size
+    newline = buffer.rfind(b'\n', position, limit)
+    if newline == -1:
+        newline = buffer.find(b'\n', limit)
+    return size if newline == -1 else newline + 1
+
+
+def iter_rows(filename, start=0, offsets=None):
+    """
+    Yields the CSV rows of filename from byte offset start as lists of
+    strings, reading the file through mmap. Parses the same rows as
+    csv.reader: quoted fields (including ones spanning lines) are left
+    to csv, everything else is split directly from the mapped blocks.
+    Files with old Mac (bare CR) line endings are read with csv alone.
+
+    If offsets is a list, it is set before each row to the byte offsets
+    of the end of the previous row and of the end of this one.
+    """
+    with open(filename, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        if start >= size:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            if _BARE_CR.search(buffer, start):
+                if offsets is None:
+                    yield from _csv_file_rows(filename, start)
+                else:
+                    yield from _rows_with_offsets(filename, start, offsets)
+                return
+            position = start
+            while position < size:
+                end = _block_end(buffer, position, size)
+                quote = buffer.find(b'"', position, end)
+                plain_end = end if quote == -1 else max(
+                    buffer.rfind(b'\n', position, quote) + 1, position)
+                if offsets is None:
+                    yield from _split_block(buffer[position:plain_end].decode('UTF-8'))
+                else:
+                    yield from _split_block_offsets(buffer[position:plain_end], position,
+                                                    offsets)
+                if plain_end < end:
+                    yield from _csv_rows(buffer, plain_end, end, offsets)
+                    position = max(buffer.tell(), end)
+                else:
+                    position = end
+
+
+def iter_row_batches(rows, header, batch_size, fields=STATUS_FIELDS):
+    """
+    Validates rows (lists of strings laid out as header) with the same
+    rules as the serial loaders.
+
+    Yields (batch, error) pairs where batch is a list of up to
+    batch_size tuples of the fields columns and error is None, 'empty'
+    (a row with an empty field) or 'missing' (a required column is
+    missing). When error is set, batch holds the valid rows that came
+    before the bad row and nothing else is yielded.
+    """
+    width = len(header)
+    positions = {name: index for index, name in enumerate(header)}
+    indexes = [positions.get(field) for field in fields]
+    pick = itemgetter(*indexes) if None not in indexes else None
+    batch = []
+    for row in rows:
+        if not row:
+            continue
+        error = None
+        if '' in row[:width]:
+            error = 'empty'
+        elif pick is None:
+            error = 'missing'
+        else:
+            if len(row) < width:
+                # Like csv.DictReader, absent trailing fields are None
+                row = row + [None] * (width - len(row))
+            batch.append(pick(row))
+        if error:
+            yield batch, error
+            return
+        if len(batch) >= batch_size:
+            yield batch, None
+            batch = []
+    if batch:
+        yield batch, None
+
+
+def iter_batches(text_file, header, batch_size, fields=STATUS_FIELDS):
+    """
+    Runs iter_row_batches over the rows of text_file (which has no
+    header line), parsed with csv.
+    """
+    yield from iter_row_batches(csv.reader(text_file), header, batch_size, fields)
+
+
+def iter_file_batches(filename, start, header, batch_size, fields=STATUS_FIELDS):
+    """
+    Runs iter_row_batches over filename from byte offset start to the
+    end of the file, streaming it instead of reading it into memory.
+    """
+    if READER['backend'] == 'mmap':
+        rows = iter_rows(filename, start)
+    else:
+        rows = _csv_file_rows(filename, start)
+    yield from iter_row_batches(rows, header, batch_size, fields)
+
+
+def _rows_with_offsets(filename, start, offsets):
+    # Rows of filename from byte offset start, parsed by csv. Before
+    # each row is returned, offsets is set to the byte offsets of its
+    # start and end; csv pulls lines one at a time, so the bytes read so
+    # far always end with the row. Rows must end in LF or CRLF.
+    consumed = [start]
+
+    def lines(file):
+        for line in file:
+            consumed[0] += len(line)
+            yield line.decode('UTF-8')
+
+    with open(filename, 'rb') as file:
+        file.seek(start)
+        for row in csv.reader(lines(file)):
+            offsets[:] = [offsets[1], consumed[0]]
+            yield row
+
+
+def iter_offset_batches(filename, start, header, batch_size, fields=STATUS_FIELDS):
+    """
+    iter_file_batches for resumable loads: yields (batch, error, offset)
+    where offset is the byte offset to resume from once batch is
+    written, just after its last row, or the start of the bad row when
+    error is set. Reads the file with the configured reader backend.
+    """
+    offsets = [start, start]
+    if READER['backend'] == 'mmap':
+        rows = iter_rows(filename, start, offsets)
+    else:
+        rows = _rows_with_offsets(filename, start, offsets)
+    for batch, error in iter_row_batches(rows, header, batch_size, fields):
+        yield batch, error, offsets[0] if error else offsets[1]
+
+
+def parse_range(task):
+    """
+    Parses and validates the rows in one byte range in a worker process.
+
+    task is a (filename, start, end, header, batch_size) tuple. Returns
+    the list of (batch, error) pairs from iter_batches, or
+    [([], 'unaligned')] if the range boundaries cut a quoted field in
+    two (a well formed range always has an even number of quotes).
+    """
+    filename, start, end, header, batch_size = task
+    with open(filename, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start)
+    if data.count(b'"') % 2:
+        return [([], 'unaligned')]
+    rows = None
+    if READER['backend'] == 'mmap' and b'"' not in data:
+        rows = _split_block(data.decode('UTF-8'))
+    if rows is None:
+        rows = csv.reader(io.StringIO(data.decode('UTF-8'), newline=''))
+    return list(iter_row_batches(rows, header, batch_size))
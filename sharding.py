@@ -0,0 +1,328 @@
+"""
+Hash-sharded storage across several SQLite files
+
+With SHARDS['count'] set to N (SOCIALNETWORK_SHARDS in the environment,
+or configure(N)), users live in N database files next to the main one
+(social_media.shard0.db ... social_media.shard<N-1>.db). A user goes to
+the shard picked by a stable hash of its user_id, and its statuses go
+with it, so everything about one user is in one file. Each shard has
+its own connection and write lock, so bulk loads and batch queries fan
+out over a thread pool and write the shards in parallel. The main
+database keeps everything that is not per user, such as load
+checkpoints. With N = 0 (the default) there is a single shard: the
+main database.
+
+The number of shards is changed offline, with no other process using
+the database, by reshard:
+
+    python sharding.py 4            # main database -> 4 shards
+    python sharding.py 8 --from 4   # 4 shards -> 8 shards
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sys
+import threading
+import zlib
+
+from playhouse.dataset import DataSet
+from playhouse.pool import PooledSqliteDatabase
+
+import socialnetwork_model
+import storage
+
+SHARDS = {'count': int(os.environ.get('SOCIALNETWORK_SHARDS', '0'))}
+
+# Rows copied per statement and per fetch by reshard
+COPY_SIZE = 5000
+
+_COLUMNS = {'Users': ('user_id', 'email', 'user_name', 'user_last_name'),
+            'Status': ('status_id', 'user_id', 'status_text', 'created_at')}
+
+_state = {'tables': None, 'pool': None}
+_lock = threading.Lock()
+
+
+def shard_paths(count, path=None):
+    """
+    Returns the file names of count shards of the database at path (the
+    main database by default).
+    """
+    root, ext = os.path.splitext(path or socialnetwork_model.DB_SETTINGS['path'])
+    return [f'{root}.shard{index}{ext}' for index in range(count)]
+
+
+def shard_index(user_id, count=None):
+    """
+    Returns the shard of user_id out of count (the configured number of
+    shards). The hash is the same in every process and every run.
+    """
+    count = SHARDS['count'] if count is None else count
+    if count <= 1:
+        return 0
+    return zlib.crc32(str(user_id).encode('UTF-8')) % count
+
+
+def _open(path):
+    # A shard's DataSet, with its schema brought up to date
+    settings = socialnetwork_model.DB_SETTINGS
+    database = socialnetwork_model.make_database(path, settings['pool_size'],
+                                                 settings['busy_timeout'])
+    socialnetwork_model.ensure_schema(database)
+    return DataSet(database)
+
+
+def all_tables():
+    """
+    Returns the (Users, Status) DataSet tables of every shard, in shard
+    order. Without sharding that is the main database's pair alone, and
+    with the memory storage engine the memory store's pair.
+    """
+    if storage.STORAGE['engine'] == 'memory':
+        store = storage.memory_store()
+        return [(store.Users, store.Status)]
+    if not SHARDS['count']:
+        return [(socialnetwork_model.Users, socialnetwork_model.Status)]
+    if _state['tables'] is None:
+        with _lock:
+            if _state['tables'] is None:
+                datasets = [_open(path) for path in shard_paths(SHARDS['count'])]
+                _state['pool'] = ThreadPoolExecutor(max_workers=SHARDS['count'],
+                                                    thread_name_prefix='shard')
+                _state['tables'] = [(data['Users'], data['Status']) for data in datasets]
+    return _state['tables']
+
+
+def databases():
+    """
+    Returns the peewee database of every shard, in shard order (none
+    with the memory storage engine).
+    """
+    if storage.STORAGE['engine'] == 'memory':
+        return []
+    return [users.dataset._database for users, _ in all_tables()]  # pylint: disable=W0212
+
+
+def release_connections():
+    """
+    Gives the calling thread's connections to the main database and the
+    shards back to their pools. Threads that run calls for others (the
+    shard pool, async_main's executors) call this after every call, so
+    idle threads hold no pooled connections; connections of databases
+    without a pool stay open for the thread's next call.
+    """
+    for database in [socialnetwork_model.sqlite, *databases()]:
+        if isinstance(database, PooledSqliteDatabase) and not database.is_closed():
+            database.close()
+
+
+def released(call):
+    """
+    Runs call and returns its result, then release_connections().
+    """
+    try:
+        return call()
+    finally:
+        release_connections()
+
+
+def tables_for(user_id, tables=None):
+    """
+    Returns the (Users, Status) tables of the shard that holds user_id,
+    out of tables (a list like all_tables returns, all_tables() if None).
+    """
+    tables = tables or all_tables()
+    return tables[shard_index(user_id, len(tables))]
+
+
+def _run(calls):
+    # Runs the zero-argument calls, on the pool when there are several
+    # shards, and returns their results in order. Waits for every call
+    # before raising the first error.
+    if len(calls) == 1 or _state['pool'] is None:
+        return [call() for call in calls]
+    futures = [_state['pool'].submit(released, call) for call in calls]
+    errors = [future.exception() for future in futures]
+    for error in errors:
+        if error is not None:
+            raise error
+    return [future.result() for future in futures]
+
+
+def gather(call, tables=None):
+    """
+    Runs call(shard_tables) for the (Users, Status) tables of every shard
+    (out of tables, all_tables() if None), in parallel, and returns the
+    list of results in shard order.
+    """
+    return _run([lambda shard_tables=shard_tables: call(shard_tables)
+                 for shard_tables in tables or all_tables()])
+
+
+def scatter(items, user_id, call, tables=None):
+    """
+    Splits items by the shard of user_id(item) and runs
+    call(shard_tables, shard_items) for every shard that got any (out of
+    tables, all_tables() if None), in parallel. call returns one result
+    per item it was given; returns the results for all items, in the
+    order of items.
+    """
+    items = list(items)
+    tables = tables or all_tables()
+    if len(tables) == 1:
+        return call(tables[0], items) if items else []
+    groups = {}
+    for position, item in enumerate(items):
+        groups.setdefault(shard_index(user_id(item), len(tables)), []).append(position)
+    calls = [lambda index=index, positions=positions:
+             call(tables[index], [items[position] for position in positions])
+             for index, positions in groups.items()]
+    results = [None] * len(items)
+    for positions, outcome in zip(groups.values(), _run(calls)):
+        for position, result in zip(positions, outcome):
+            results[position] = result
+    return results
+
+
+def _close_database(database):
+    if hasattr(database, 'close_all'):
+        database.close_all()
+    elif not database.is_closed():
+        database.close()
+
+
+def close():
+    """
+    Closes the shard databases and stops the fan-out threads; the next
+    use opens them again.
+    """
+    with _lock:
+        tables, pool = _state['tables'], _state['pool']
+        _state.update(tables=None, pool=None)
+    if pool is not None:
+        # The pool threads' own connections close as the threads exit
+        pool.shutdown()
+    for users, _ in tables or []:
+        _close_database(users.dataset._database)  # pylint: disable=W0212
+
+
+def configure(count=0):
+    """
+    Switches the number of shards the process uses (0 for the main
+    database alone). Does not move any data; see reshard for that.
+    """
+    if count < 0:
+        raise ValueError(f"Invalid number of shards: {count}")
+    close()
+    SHARDS['count'] = count
+
+
+def _copy(source, targets, table):
+    # Streams table from the source database into the target databases,
+    # each row to the shard of its user_id; returns the rows copied
+    columns = _COLUMNS[table]
+    names = ', '.join(f'"{column}"' for column in columns)
+    insert = (f'INSERT INTO "{table}" ({names}) VALUES ({", ".join("?" * len(columns))}) '
+              'ON CONFLICT DO NOTHING')
+    user_column = columns.index('user_id')
+    copied = 0
+    cursor = source.execute_sql(f'SELECT {names} FROM "{table}" ORDER BY "id"')
+    while True:
+        rows = cursor.fetchmany(COPY_SIZE)
+        if not rows:
+            return copied
+        groups = {}
+        for row in rows:
+            groups.setdefault(shard_index(row[user_column], len(targets)), []).append(row)
+        for index, group in groups.items():
+            with targets[index].atomic():
+                targets[index].cursor().executemany(insert, group)
+        copied += len(rows)
+
+
+def _remove(path):
+    for name in (path, path + '-wal', path + '-shm'):
+        if os.path.exists(name):
+            os.remove(name)
+
+
+def _retire(sources, path):
+    # Empties the main database's tables, or removes a shard file, once
+    # its rows are in the new shards
+    for database in sources:
+        if database.database == path:
+            with database.atomic():
+                database.execute_sql('DELETE FROM "Status"')
+                database.execute_sql('DELETE FROM "Users"')
+            _close_database(database)
+        else:
+            _remove(database.database)
+
+
+def reshard(count, old_count=0, path=None):
+    """
+    Moves every user and status from old_count shards into count shards
+    (0 for the main database at path) and returns the number of (users,
+    statuses) moved. Run it with no other process using the database.
+
+    The new shards are written to temporary files first; the old shard
+    files are only removed, or the main database's tables emptied, once
+    every row has been copied.
+    """
+    if count < 0 or old_count < 0:
+        raise ValueError("The number of shards cannot be negative")
+    path = path or socialnetwork_model.DB_SETTINGS['path']
+    if count == old_count:
+        return 0, 0
+    close()
+    socialnetwork_model.close()
+    make = socialnetwork_model.make_database
+    sources = [make(name) for name in (shard_paths(old_count, path) if old_count else [path])
+               if old_count == 0 or os.path.exists(name)]
+    if count:
+        final = shard_paths(count, path)
+        staged = [name + '.reshard' for name in final]
+        for name in staged:
+            _remove(name)
+    else:
+        final = staged = [path]
+    targets = [make(name) for name in staged]
+    moved = [0, 0]
+    try:
+        for database in sources + targets:
+            socialnetwork_model.ensure_schema(database)
+        for database in sources:
+            moved[0] += _copy(database, targets, 'Users')
+            moved[1] += _copy(database, targets, 'Status')
+    finally:
+        for database in sources + targets:
+            _close_database(database)
+    _retire(sources, path)
+    for staged_name, final_name in zip(staged, final):
+        if staged_name != final_name:
+            os.replace(staged_name, final_name)
+    SHARDS['count'] = count
+    return tuple(moved)
+
+
+def cli(argv=None):
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description='Change the number of database shards '
+                                     'offline (0 for the main database alone)')
+    parser.add_argument('count', type=int, help='number of shards to move to')
+    parser.add_argument('--from', type=int, dest='old_count', default=SHARDS['count'],
+                        help='number of shards the data is in now (default: '
+                        'SOCIALNETWORK_SHARDS)')
+    parser.add_argument('--db', dest='path', help='main database file')
+    options = parser.parse_args(argv)
+    moved_users, moved_statuses = reshard(options.count, options.old_count, options.path)
+    print(f'Moved {moved_users} users and {moved_statuses} statuses '
+          f'into {options.count or "no"} shards')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(cli())
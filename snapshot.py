@@ -0,0 +1,188 @@
+"""
+In-memory read snapshot of the database
+
+After start(), main's read functions (search_user, search_status,
+search_users, search_statuses, list_statuses and search_status_text)
+read from an in-memory copy of the database, taken with SQLite's backup
+API, instead of contending with writers on the database file. With
+shards (see sharding), every shard gets its own copy.
+
+The copy is refreshed:
+
+- before a read, once it is more than max_age seconds old (the bound on
+  how stale a read can be) or max_writes write transactions have
+  committed since it was taken;
+- every interval seconds by a background thread, if interval is set,
+  so reads rarely wait for a refresh.
+
+Reads see their own writes: a thread that has committed a write since
+the copy was taken reads the live database until the next refresh.
+Inside a live_reads() block the calling thread always reads the live
+database. Reads from the copy are not put in main's search cache.
+"""
+# pylint: disable=W0718
+
+from contextlib import contextmanager
+import logging
+import threading
+import time
+
+from peewee import SqliteDatabase
+from playhouse.dataset import DataSet
+
+import sharding
+import socialnetwork_model
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT = {'enabled': False, 'max_age': 5.0, 'max_writes': 1000, 'interval': None}
+
+# tables: (Users, Status) of every shard's copy; commits: the commit
+# count when it was taken; taken: its time.monotonic()
+_state = {'tables': None, 'commits': 0, 'taken': 0.0, 'thread': None, 'stop': None}
+_commits = {'count': 0}
+counters = {'refreshes': 0, 'snapshot_reads': 0, 'live_reads': 0}
+
+# Held while reading from the copy or swapping in a new one: a copy
+# uses a single connection shared by every thread
+_read_lock = threading.RLock()
+_refresh_lock = threading.Lock()
+_commits_lock = threading.Lock()
+_thread_state = threading.local()
+
+
+def _committed():
+    # Commit listener: counts commits and remembers the calling thread's last one
+    with _commits_lock:
+        _commits['count'] += 1
+        _thread_state.last_commit = _commits['count']
+
+
+socialnetwork_model.on_commit(_committed)
+
+
+def _copy(database):
+    # An in-memory copy of database, shared by every thread
+    copy = SqliteDatabase(':memory:', check_same_thread=False, thread_safe=False)
+    source = database.connection()
+    source.backup(copy.connection())
+    data = DataSet(copy)
+    return data['Users'], data['Status']
+
+
+def _close(tables):
+    for users_table, _ in tables or []:
+        users_table.dataset.close()
+
+
+def _take():
+    # Takes a new copy and swaps it in; call with _refresh_lock held
+    commits = _commits['count']
+    started = time.monotonic()
+    # None (read live) when the storage engine has no database to copy
+    tables = [_copy(database) for database in sharding.databases()] or None
+    with _read_lock:
+        old = _state['tables']
+        _state.update(tables=tables, commits=commits, taken=started)
+        _close(old)
+    counters['refreshes'] += 1
+    logger.debug("Refreshed the read snapshot in %.3fs", time.monotonic() - started)
+
+
+def refresh():
+    """
+    Takes a new copy of the database (of every shard) now and swaps it
+    in for the old one.
+    """
+    with _refresh_lock:
+        _take()
+
+
+def _stale():
+    if _state['tables'] is None:
+        return True
+    if time.monotonic() - _state['taken'] > SNAPSHOT['max_age']:
+        return True
+    max_writes = SNAPSHOT['max_writes']
+    return bool(max_writes) and _commits['count'] - _state['commits'] >= max_writes
+
+
+def _refresher(stopping, interval):
+    while not stopping.wait(interval):
+        try:
+            refresh()
+        except Exception as error:
+            logger.error("Could not refresh the read snapshot: %s", error)
+
+
+def start(max_age=5.0, max_writes=1000, interval=None):
+    """
+    Starts serving reads from a snapshot, taking the first copy now.
+    max_age is the most seconds a snapshot serves reads for, max_writes
+    the most write transactions it may miss (0 for no limit) and
+    interval, if set, the seconds between background refreshes.
+    """
+    if SNAPSHOT['enabled']:
+        raise RuntimeError('read snapshots are already started')
+    SNAPSHOT.update(max_age=max_age, max_writes=max_writes, interval=interval)
+    refresh()
+    SNAPSHOT['enabled'] = True
+    if interval:
+        stopping = threading.Event()
+        thread = threading.Thread(target=_refresher, args=(stopping, interval),
+                                  name='snapshot-refresher', daemon=True)
+        _state.update(thread=thread, stop=stopping)
+        thread.start()
+
+
+def stop():
+    """
+    Stops serving reads from the snapshot and frees the copy.
+    """
+    SNAPSHOT['enabled'] = False
+    if _state['thread'] is not None:
+        _state['stop'].set()
+        _state['thread'].join()
+        _state.update(thread=None, stop=None)
+    with _refresh_lock, _read_lock:
+        _close(_state['tables'])
+        _state['tables'] = None
+
+
+@contextmanager
+def live_reads():
+    """
+    Context manager under which the calling thread reads the live
+    database, whatever the snapshot settings.
+    """
+    _thread_state.live = getattr(_thread_state, 'live', 0) + 1
+    try:
+        yield
+    finally:
+        _thread_state.live -= 1
+
+
+@contextmanager
+def reading():
+    """
+    Context manager for one read: yields the (Users, Status) tables of
+    the snapshot, one pair per shard, or None when the calling thread
+    must read the live database (snapshots off, inside live_reads, or
+    the thread has written since the snapshot was taken).
+    """
+    if not SNAPSHOT['enabled'] or getattr(_thread_state, 'live', 0):
+        counters['live_reads'] += 1
+        yield None
+        return
+    if _stale():
+        with _refresh_lock:
+            # Another thread may have refreshed (or stopped) it meanwhile
+            if SNAPSHOT['enabled'] and _stale():
+                _take()
+    with _read_lock:
+        if getattr(_thread_state, 'last_commit', 0) <= _state['commits']:
+            counters['snapshot_reads'] += 1
+            yield _state['tables']
+            return
+    counters['live_reads'] += 1
+    yield None
@@ -2,11 +2,199 @@
 Module for all database models related to social network
 """
 # pylint: disable= R0903
-from peewee import SqliteDatabase, Model, CharField, ForeignKeyField
+from contextlib import contextmanager
+import os
+import threading
+
+from peewee import (SqliteDatabase, Model, CharField, ForeignKeyField, IntegrityError,
+                    chunked)
 from playhouse.dataset import DataSet
+from playhouse.pool import PooledSqliteDatabase
+
+# Database settings, read from the environment:
+# - SOCIALNETWORK_DB: path of the database file
+# - SOCIALNETWORK_DB_POOL: size of the connection pool; when set (and not
+#   0) every thread gets its own pooled connection and the database uses
+#   WAL journaling, so readers don't block on the writer. A thread keeps
+#   its connection until it calls release_connection, and a thread
+#   waiting for one fails after busy_timeout, so the pool must be at
+#   least as large as the number of threads that use the database
+#   without releasing their connection in between
+# - SOCIALNETWORK_DB_BUSY_TIMEOUT: milliseconds a connection waits for a
+#   lock held by another connection before failing with "database is locked"
+DB_SETTINGS = {
+    'path': os.environ.get('SOCIALNETWORK_DB', 'social_media.db'),
+    'pool_size': int(os.environ.get('SOCIALNETWORK_DB_POOL', '0')),
+    'busy_timeout': int(os.environ.get('SOCIALNETWORK_DB_BUSY_TIMEOUT', '5000')),
+}
+
+
+def make_database(path, pool_size=0, busy_timeout=DB_SETTINGS['busy_timeout']):
+    """
+    Returns the peewee database for path. With pool_size, connections are
+    taken from a thread-safe pool (one per thread) and the database runs
+    in WAL mode with a busy timeout.
+    """
+    if pool_size:
+        pragmas = {'foreign_keys': 1, 'journal_mode': 'wal',
+                   'busy_timeout': busy_timeout, 'synchronous': 'normal'}
+        return PooledSqliteDatabase(path, pragmas=pragmas, max_connections=pool_size,
+                                    stale_timeout=300, timeout=busy_timeout / 1000,
+                                    check_same_thread=False)
+    return SqliteDatabase(path, pragmas={'foreign_keys': 1, 'busy_timeout': busy_timeout})
+
+
+# Creating the database object does not open the file; the first query
+# (or init()) does
+sqlite = make_database(**DB_SETTINGS)
+
+# SQLite allows a single writer, so writes from this process go through
+# write_transaction one at a time instead of failing on each other's locks
+write_lock = threading.RLock()
+
+# Write locks of other database files (the shards), keyed by path
+_write_locks = {}
+_write_locks_lock = threading.Lock()
+
+# Called after each commit by write_transaction, see on_commit
+_commit_listeners = []
+
+
+def _dataset(table):
+    # The DataSet of a DataSet table, or the main one for None
+    return init() if table is None else table.dataset
 
-sqlite = SqliteDatabase('social_media.db', pragmas={'foreign_keys': 1})
-sqlite.connect()
+
+def lock_for(database):
+    """
+    Returns the write lock of a peewee database: write_lock for the main
+    database, and one lock per file for any other.
+    """
+    if database is sqlite:
+        return write_lock
+    with _write_locks_lock:
+        return _write_locks.setdefault(database.database, threading.RLock())
+
+
+@contextmanager
+def write_transaction(table=None):
+    """
+    Context manager that holds the write lock of a database and runs the
+    block in a transaction on the calling thread's connection to it. The
+    database is the one of the DataSet table given, or the main one.
+
+    The connection is taken before the lock: with a pool, a thread
+    holding the lock while it waits for a free connection would wait on
+    the threads that hold connections and wait for the lock.
+    """
+    dataset = _dataset(table)
+    database = dataset._database  # pylint: disable=W0212
+    database.connect(reuse_if_open=True)
+    with lock_for(database), dataset.transaction():
+        yield
+    if not database.in_transaction():
+        for listener in _commit_listeners:
+            listener()
+
+
+def on_commit(listener):
+    """
+    Registers a zero-argument function that write_transaction calls on
+    the committing thread after every outermost transaction commits.
+    """
+    _commit_listeners.append(listener)
+
+
+def read_transaction(table=None):
+    """
+    Returns a transaction on the database of the DataSet table given (or
+    the main one), for reads that must see one consistent snapshot.
+    """
+    return _dataset(table).transaction()
+
+
+def run_batch(calls, transaction=write_transaction):
+    """
+    Runs a list of zero-argument calls in one write transaction (one
+    commit), made by transaction(): write_transaction by default, and
+    storage.write_transaction to follow the storage engine. The write
+    closures a call uses still open their own nested transactions
+    (savepoints), so a failed write does not undo the others. Returns
+    one (succeeded, result or exception) pair per call.
+    """
+    outcomes = []
+    with transaction():
+        for call in calls:
+            try:
+                outcomes.append((True, call()))
+            except Exception as error:  # pylint: disable=W0718
+                outcomes.append((False, error))
+    return outcomes
+
+
+# Keeps multi-row statements under SQLite's bound-parameter limit
+SQL_CHUNK = 500
+
+# What upsert_rows does with a row whose key already exists
+ON_CONFLICT = ('skip', 'overwrite', 'fail')
+
+
+def upsert_rows(table, key, rows, on_conflict='skip'):
+    """
+    Writes a batch of row dicts to the DataSet table with multi-row
+    INSERT ... ON CONFLICT statements; call it inside write_transaction.
+    Rows whose key already exists, in the table or earlier in the batch:
+
+    - skip: are left alone (ON CONFLICT DO NOTHING).
+    - overwrite: replace the stored values, apart from a status's
+      created_at (ON CONFLICT DO UPDATE).
+    - fail: raise IntegrityError before anything is written.
+
+    Returns one outcome per row: 'inserted', 'updated' or 'skipped'.
+    """
+    if on_conflict not in ON_CONFLICT:
+        raise ValueError(f"Unknown on_conflict policy: {on_conflict}")
+    table._migrate_new_columns(rows[0])  # pylint: disable=W0212
+    model = table.model_class
+    fields = model._meta.fields  # pylint: disable=W0212
+    existing = set()
+    for keys in chunked([row[key] for row in rows], SQL_CHUNK):
+        query = model.select(fields[key]).where(fields[key].in_(keys)).tuples()
+        existing.update(value for value, in query)
+    outcomes = []
+    written = []
+    for row in rows:
+        if row[key] not in existing:
+            existing.add(row[key])
+            outcomes.append('inserted')
+            written.append(row)
+        elif on_conflict == 'fail':
+            raise IntegrityError(f'UNIQUE constraint failed: {table.name}.{key} '
+                                 f'({row[key]!r})')
+        elif on_conflict == 'overwrite':
+            outcomes.append('updated')
+            written.append(row)
+        else:
+            outcomes.append('skipped')
+    for batch in chunked(written, SQL_CHUNK // len(rows[0])):
+        query = model.insert_many(batch)
+        if on_conflict == 'overwrite':
+            # A status keeps the created_at of its first insert
+            query = query.on_conflict(conflict_target=[fields[key]], preserve=[
+                fields[name] for name in rows[0] if name not in (key, 'created_at')])
+        else:
+            query = query.on_conflict_ignore()
+        query.execute()
+    return outcomes
+
+
+def release_connection():
+    """
+    Returns the calling thread's connection to the pool (or closes it
+    when pooling is off). Worker threads call this when they are done.
+    """
+    if not sqlite.is_closed():
+        sqlite.close()
 
 
 class BaseModel(Model):
@@ -41,19 +229,215 @@ class StatusTable(BaseModel):
     status_text = CharField()
 
 
-sqlite.create_tables([UsersTable, StatusTable])
-
-# Making a dataset from Sqlite Database above
-dataset = DataSet(sqlite)
-Users = dataset['Users']
-Status = dataset['Status']
-# Setting primary key as user_id and status_id
-Users.insert(user_id='test')
-Status.insert(status_id='test')
-Users.create_index(['user_id'], unique=True)
-Status.create_index(['status_id'], unique=True)
-# Delete the dummy record afterwards.
-Users.delete(user_id='test')
-Status.delete(status_id='test')
-sqlite.close()
-dataset.close()
+# Bumped whenever _MIGRATIONS gains a step; stored in PRAGMA user_version
+SCHEMA_VERSION = 5
+
+
+def _migrate_v1(database):
+    """
+    Base schema: the peewee model tables plus the DataSet tables Users and
+    Status with their columns and unique indexes created up front, so no
+    dummy rows are needed to build the indexes.
+    """
+    database.create_tables([UsersTable, StatusTable])
+    columns = {
+        'Users': ('user_id', 'user_last_name', 'email', 'user_name'),
+        'Status': ('status_id', 'user_id', 'status_text'),
+    }
+    for table, names in columns.items():
+        database.execute_sql(f'CREATE TABLE IF NOT EXISTS "{table}" '
+                             '("id" INTEGER NOT NULL PRIMARY KEY)')
+        existing = {column.name for column in database.get_columns(table)}
+        for name in names:
+            if name not in existing:
+                database.execute_sql(f'ALTER TABLE "{table}" ADD COLUMN "{name}" TEXT')
+    database.execute_sql('CREATE UNIQUE INDEX IF NOT EXISTS "users_user_id" '
+                         'ON "Users" ("user_id")')
+    database.execute_sql('CREATE UNIQUE INDEX IF NOT EXISTS "status_status_id" '
+                         'ON "Status" ("status_id")')
+
+
+def _migrate_v2(database):
+    """
+    Index on Status (user_id, status_id) so listing a user's statuses is
+    an index range scan in status_id order.
+    """
+    database.execute_sql('CREATE INDEX IF NOT EXISTS "status_user_id_status_id" '
+                         'ON "Status" ("user_id", "status_id")')
+
+
+def _migrate_v3(database):
+    """
+    Full-text index status_fts over Status.status_text. It is an FTS5
+    external-content table: it stores only the index, and triggers on
+    Status keep it in step with every insert, update and delete,
+    including the cascade from deleting a user. Statuses written before
+    this step are indexed by a rebuild.
+    """
+    database.execute_sql('CREATE VIRTUAL TABLE IF NOT EXISTS "status_fts" USING fts5('
+                         '"status_text", content="Status", content_rowid="id", '
+                         'tokenize="porter unicode61")')
+    database.execute_sql('CREATE TRIGGER IF NOT EXISTS "status_fts_insert" '
+                         'AFTER INSERT ON "Status" BEGIN '
+                         'INSERT INTO "status_fts" (rowid, "status_text") '
+                         'VALUES (new."id", new."status_text"); END')
+    database.execute_sql('CREATE TRIGGER IF NOT EXISTS "status_fts_delete" '
+                         'AFTER DELETE ON "Status" BEGIN '
+                         'INSERT INTO "status_fts" ("status_fts", rowid, "status_text") '
+                         'VALUES (\'delete\', old."id", old."status_text"); END')
+    database.execute_sql('CREATE TRIGGER IF NOT EXISTS "status_fts_update" '
+                         'AFTER UPDATE ON "Status" BEGIN '
+                         'INSERT INTO "status_fts" ("status_fts", rowid, "status_text") '
+                         'VALUES (\'delete\', old."id", old."status_text"); '
+                         'INSERT INTO "status_fts" (rowid, "status_text") '
+                         'VALUES (new."id", new."status_text"); END')
+    rebuild_status_index(database)
+
+
+def _migrate_v4(database):
+    """
+    Table load_checkpoint: how far each resumable load of a file has
+    got, written in the same transaction as the rows it covers.
+    """
+    database.execute_sql('CREATE TABLE IF NOT EXISTS "load_checkpoint" ('
+                         '"kind" TEXT NOT NULL, "filename" TEXT NOT NULL, '
+                         '"size" INTEGER NOT NULL, "digest" TEXT NOT NULL, '
+                         '"offset" INTEGER NOT NULL, "rows" INTEGER NOT NULL, '
+                         '"updated" TEXT NOT NULL, PRIMARY KEY ("kind", "filename"))')
+
+
+# Adds one status of new.user_id, written at new.created_at, to user_summary
+_SUMMARY_ADD = ('INSERT INTO "user_summary" ("user_id", "status_count", "last_status_at") '
+                'VALUES (new."user_id", 1, new."created_at") '
+                'ON CONFLICT ("user_id") DO UPDATE SET "status_count" = "status_count" + 1, '
+                '"last_status_at" = CASE WHEN "last_status_at" IS NULL '
+                'OR excluded."last_status_at" > "last_status_at" '
+                'THEN excluded."last_status_at" ELSE "last_status_at" END; ')
+# Takes one status of old.user_id out of user_summary; the latest time is
+# read back from the (user_id, created_at) index
+_SUMMARY_REMOVE = ('UPDATE "user_summary" SET "status_count" = "status_count" - 1, '
+                   '"last_status_at" = (SELECT MAX("created_at") FROM "Status" '
+                   'WHERE "user_id" = old."user_id") WHERE "user_id" = old."user_id"; '
+                   'DELETE FROM "user_summary" '
+                   'WHERE "user_id" = old."user_id" AND "status_count" <= 0; ')
+
+
+def _migrate_v5(database):
+    """
+    Status.created_at (an ISO 8601 UTC time, set by storage when a
+    status is written), an index on Status (user_id, created_at) for a
+    user's latest statuses, and table user_summary: each user's status
+    count and latest created_at. Triggers on Status keep user_summary in
+    step with every insert, delete and change of user_id or created_at,
+    in the same transaction. Statuses written before this step have no
+    created_at and count towards the summary built here.
+    """
+    existing = {column.name for column in database.get_columns('Status')}
+    if 'created_at' not in existing:
+        database.execute_sql('ALTER TABLE "Status" ADD COLUMN "created_at" TEXT')
+    database.execute_sql('CREATE INDEX IF NOT EXISTS "status_user_id_created_at" '
+                         'ON "Status" ("user_id", "created_at")')
+    database.execute_sql('CREATE TABLE IF NOT EXISTS "user_summary" ('
+                         '"user_id" TEXT NOT NULL PRIMARY KEY, '
+                         '"status_count" INTEGER NOT NULL, "last_status_at" TEXT)')
+    database.execute_sql('CREATE TRIGGER IF NOT EXISTS "status_summary_insert" '
+                         f'AFTER INSERT ON "Status" BEGIN {_SUMMARY_ADD}END')
+    database.execute_sql('CREATE TRIGGER IF NOT EXISTS "status_summary_delete" '
+                         f'AFTER DELETE ON "Status" BEGIN {_SUMMARY_REMOVE}END')
+    database.execute_sql('CREATE TRIGGER IF NOT EXISTS "status_summary_update" '
+                         'AFTER UPDATE OF "user_id", "created_at" ON "Status" '
+                         'WHEN old."user_id" IS NOT new."user_id" '
+                         'OR old."created_at" IS NOT new."created_at" '
+                         f'BEGIN {_SUMMARY_REMOVE}{_SUMMARY_ADD}END')
+    database.execute_sql('INSERT OR REPLACE INTO "user_summary" '
+                         'SELECT "user_id", COUNT(*), MAX("created_at") FROM "Status" '
+                         'WHERE "user_id" IS NOT NULL GROUP BY "user_id"')
+
+
+# Schema steps in order; step n brings user_version from n to n + 1.
+# Every step must be safe to run on a database that already has it.
+_MIGRATIONS = [_migrate_v1, _migrate_v2, _migrate_v3, _migrate_v4, _migrate_v5]
+
+
+def rebuild_status_index(database=None):
+    """
+    Rebuilds the status_text full-text index from the Status table, for
+    databases whose index is missing rows or was damaged. Uses the
+    current database unless one is given.
+    """
+    if database is None:
+        init()
+        database = sqlite
+    with lock_for(database), database.atomic():
+        database.execute_sql('INSERT INTO "status_fts" ("status_fts") VALUES (\'rebuild\')')
+
+
+def ensure_schema(database):
+    """
+    Brings the schema of database up to SCHEMA_VERSION. Costs a single
+    PRAGMA read when the schema is already current; otherwise the
+    missing steps run in one write transaction.
+    """
+    if database.pragma('user_version') >= SCHEMA_VERSION:
+        return
+    with lock_for(database), database.atomic('IMMEDIATE'):
+        version = database.pragma('user_version')
+        for migration in _MIGRATIONS[version:]:
+            migration(database)
+        database.pragma('user_version', SCHEMA_VERSION)
+
+
+_state = {'dataset': None, 'Users': None, 'Status': None}
+_init_lock = threading.Lock()
+
+
+def init():
+    """
+    Opens the database, makes sure its schema is current and builds the
+    DataSet and its Users and Status tables. Runs once; later calls
+    return the existing DataSet.
+    """
+    if _state['dataset'] is None:
+        with _init_lock:
+            if _state['dataset'] is None:
+                ensure_schema(sqlite)
+                data = DataSet(sqlite)
+                _state.update(Users=data['Users'], Status=data['Status'])
+                _state['dataset'] = data
+    return _state['dataset']
+
+
+def __getattr__(name):
+    """
+    dataset, Users and Status are created on first use (see init), so
+    importing this module does not touch the database.
+    """
+    if name in _state:
+        init()
+        return _state[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def close():
+    """
+    Closes the database connections and forgets the DataSet; the next
+    use of dataset, Users or Status opens them again.
+    """
+    with _init_lock:
+        _state.update(dataset=None, Users=None, Status=None)
+        if isinstance(sqlite, PooledSqliteDatabase):
+            sqlite.close_all()
+        elif not sqlite.is_closed():
+            sqlite.close()
+
+
+def configure(**settings):
+    """
+    Switches to a different database; accepts the DB_SETTINGS keys path,
+    pool_size and busy_timeout. Closes the current database first.
+    """
+    global sqlite  # pylint: disable=W0603
+    close()
+    DB_SETTINGS.update(settings)
+    sqlite = make_database(**DB_SETTINGS)
+    sqlite.bind([UsersTable, StatusTable])
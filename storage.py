@@ -0,0 +1,798 @@
+"""
+Storage engines behind the users and user_status closure factories
+
+The closure factories take a table and work through the interface of
+SqliteTable: the DataSet table API (insert, update, delete, find_one,
+find, all, len) plus the batch and query operations the closures need.
+backend() wraps a playhouse.dataset table in SqliteTable (or its
+CompiledTable subclass), and passes an engine's own tables through
+unchanged.
+
+There are two engines, chosen with configure() or SOCIALNETWORK_STORAGE:
+
+- 'sqlite' (the default): the DataSet tables of the database file(s),
+  see socialnetwork_model and sharding.
+- 'memory': a MemoryStore in this process. Records are __slots__
+  objects in dicts keyed by user_id and status_id, with an index of
+  each user's status_ids in order. user_id and status_id are unique, a
+  status needs an existing user, and deleting a user deletes its
+  statuses, as in the StatusTable schema. Writes are serialized by one
+  lock and are atomic per operation, but there is no rollback. With a
+  file (configure(path=...) or SOCIALNETWORK_MEMORY_FILE), the store is
+  loaded from it on first use and saved to it by save(), close() and at
+  exit; the file is an SQLite database with the usual schema.
+
+On the 'sqlite' engine, insert, update, delete, find_one and exists run
+as parameterized SQL compiled once per table and column set (see
+CompiledTable), skipping DataSet's per-call query building;
+SOCIALNETWORK_COMPILED_SQL=0 or configure(compiled=False) turns that off.
+"""
+# pylint: disable=R0903
+
+import atexit
+from bisect import bisect_right, insort
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import lru_cache
+from heapq import nlargest
+from itertools import count
+import os
+import re
+import threading
+
+from peewee import IntegrityError, chunked
+from playhouse.dataset import Table
+
+import socialnetwork_model
+from socialnetwork_model import ON_CONFLICT, SQL_CHUNK, upsert_rows
+
+ENGINES = ('sqlite', 'memory')
+
+STORAGE = {'engine': os.environ.get('SOCIALNETWORK_STORAGE', 'sqlite'),
+           'path': os.environ.get('SOCIALNETWORK_MEMORY_FILE'),
+           'compiled': os.environ.get('SOCIALNETWORK_COMPILED_SQL', '1') != '0'}
+
+# Columns of the status listing and text search results
+STATUS_COLUMNS = ('status_id', 'user_id', 'status_text')
+# Columns of recent_statuses results
+RECENT_COLUMNS = STATUS_COLUMNS + ('created_at',)
+
+
+def now():
+    """
+    Returns the current time as the ISO 8601 UTC text stored in
+    Status.created_at, which sorts in time order.
+    """
+    return datetime.now(timezone.utc).isoformat(timespec='microseconds')
+
+
+def stamped(table_name, rows):
+    """
+    Returns rows with created_at set to now() where a Status row has
+    none; rows of other tables are returned as they are.
+    """
+    if table_name != 'Status':
+        return rows
+    created_at = now()
+    return [row if row.get('created_at') else {**row, 'created_at': created_at}
+            for row in rows]
+
+
+class SqliteTable:
+    """
+    The storage interface over a playhouse.dataset table
+    """
+    __slots__ = ('table',)
+
+    def __init__(self, table):
+        self.table = table
+
+    def _field(self, column):
+        return self.table.model_class._meta.fields[column]  # pylint: disable=W0212
+
+    def write_transaction(self):
+        """
+        Context manager for a write transaction on the table's database.
+        """
+        return socialnetwork_model.write_transaction(self.table)
+
+    def read_transaction(self):
+        """
+        Context manager for a read transaction on the table's database.
+        """
+        return socialnetwork_model.read_transaction(self.table)
+
+    def insert(self, **row):
+        """
+        Inserts one row.
+        """
+        return self.table.insert(**stamped(self.table.name, [row])[0])
+
+    def update(self, **kwargs):
+        """
+        Updates the rows matching the columns listed in columns.
+        """
+        return self.table.update(**kwargs)
+
+    def delete(self, **where):
+        """
+        Deletes the rows matching where (every row if empty).
+        """
+        return self.table.delete(**where)
+
+    def find_one(self, **where):
+        """
+        Returns the first row matching where as a dict, or None.
+        """
+        return self.table.find_one(**where)
+
+    def upsert(self, key, rows, on_conflict='skip'):
+        """
+        Writes a batch of row dicts, see socialnetwork_model.upsert_rows.
+        """
+        return upsert_rows(self.table, key, stamped(self.table.name, rows), on_conflict)
+
+    def exists(self, column, value):
+        """
+        Returns whether a row has value in column.
+        """
+        field = self._field(column)
+        return self.table.model_class.select(field).where(field == value).exists()
+
+    def existing(self, column, values):
+        """
+        Returns the subset of values present in column.
+        """
+        model = self.table.model_class
+        field = self._field(column)
+        found = set()
+        for chunk in chunked(list(values), SQL_CHUNK):
+            query = model.select(field).where(field.in_(chunk)).tuples()
+            found.update(value for value, in query)
+        return found
+
+    def find_in(self, column, values):
+        """
+        Returns the rows whose column is in values, as dicts.
+        """
+        model = self.table.model_class
+        field = self._field(column)
+        rows = []
+        for chunk in chunked(list(values), SQL_CHUNK):
+            rows.extend(model.select().where(field.in_(chunk)).dicts())
+        return rows
+
+    def delete_in(self, column, values):
+        """
+        Deletes the rows whose column is in values; returns how many.
+        """
+        model = self.table.model_class
+        field = self._field(column)
+        deleted = 0
+        for chunk in chunked(list(values), SQL_CHUNK):
+            deleted += model.delete().where(field.in_(chunk)).execute()
+        return deleted
+
+    def page(self, user_id, after, limit):
+        """
+        Returns up to limit of a user's statuses in status_id order,
+        after the status_id after. Served from the (user_id, status_id)
+        index, so every page costs the same however deep it is.
+        """
+        model = self.table.model_class
+        fields = model._meta.fields  # pylint: disable=W0212
+        condition = fields['user_id'] == user_id
+        if after is not None:
+            condition &= fields['status_id'] > after
+        query = (model.select(*[fields[column] for column in STATUS_COLUMNS])
+                 .where(condition).order_by(fields['status_id']).limit(limit).dicts())
+        return list(query)
+
+    def search_text(self, query, limit, offset, ranked=False):
+        """
+        Ranked (bm25) full-text search over status_text through the
+        status_fts index; raises sqlite's OperationalError if query is
+        not valid FTS5 syntax. ranked adds each match's 'rank' (lower
+        is better), for merging the results of several databases.
+        """
+        table = self.table.model_class._meta.table_name  # pylint: disable=W0212
+        rank = ', "status_fts".rank AS "rank"' if ranked else ''
+        sql = (f'SELECT s."status_id", s."user_id", s."status_text"{rank} '
+               f'FROM "status_fts" JOIN "{table}" AS s ON s."id" = "status_fts".rowid '
+               f'WHERE "status_fts" MATCH ? ORDER BY "status_fts".rank LIMIT ? OFFSET ?')
+        cursor = self.table.dataset.query(sql, (query, limit, offset))
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def summary(self, user_id):
+        """
+        Returns (status count, latest created_at) of a user's statuses,
+        one primary key lookup in user_summary; (0, None) if none.
+        """
+        row = self.table.dataset.query(
+            'SELECT "status_count", "last_status_at" FROM "user_summary" '
+            'WHERE "user_id" = ?', (user_id,)).fetchone()
+        return tuple(row) if row else (0, None)
+
+    def recent(self, user_id, limit):
+        """
+        Returns a user's latest limit statuses, newest first, read
+        backwards along the (user_id, created_at) index.
+        """
+        names = ', '.join(f'"{column}"' for column in RECENT_COLUMNS)
+        cursor = self.table.dataset.query(
+            f'SELECT {names} FROM "{self.table.name}" WHERE "user_id" = ? '
+            'ORDER BY "created_at" DESC, "id" DESC LIMIT ?', (user_id, limit))
+        return [dict(zip(RECENT_COLUMNS, row)) for row in cursor]
+
+
+@lru_cache(maxsize=256)
+def _compile(kind, table, columns, where):
+    # The SQL text of one kind of statement on table, for the given
+    # columns (inserted, set or selected) and where columns, built once
+    condition = ' AND '.join(f'"{column}" = ?' for column in where)
+    condition = f' WHERE {condition}' if condition else ''
+    names = ', '.join(f'"{column}"' for column in columns)
+    if kind == 'insert':
+        return f'INSERT INTO "{table}" ({names}) VALUES ({", ".join("?" * len(columns))})'
+    if kind == 'update':
+        assignments = ', '.join(f'"{column}" = ?' for column in columns)
+        return f'UPDATE "{table}" SET {assignments}{condition}'
+    if kind == 'delete':
+        return f'DELETE FROM "{table}"{condition}'
+    return f'SELECT {names} FROM "{table}"{condition} LIMIT 1'
+
+
+class CompiledTable(SqliteTable):
+    """
+    SqliteTable whose single-row operations (insert, update, delete,
+    find_one, exists) run cached parameterized SQL on the table's
+    connection instead of building a peewee query per call. Calls the
+    SQL cannot express as DataSet would (a column the table does not
+    have yet, a None to match, a conjunction) go through DataSet.
+    """
+    __slots__ = ()
+
+    def _columns(self, names):
+        # The table's columns, or None if names are not all among them
+        fields = self.table.model_class._meta.fields  # pylint: disable=W0212
+        return tuple(fields) if fields.keys() >= names else None
+
+    def _execute(self, kind, columns, where, params):
+        return self.table.dataset.query(_compile(kind, self.table.name, columns, where), params)
+
+    def insert(self, **row):
+        """
+        Inserts one row; returns its id.
+        """
+        row = stamped(self.table.name, [row])[0]
+        if not row or self._columns(row.keys()) is None:
+            return super().insert(**row)
+        return self._execute('insert', tuple(row), (), tuple(row.values())).lastrowid
+
+    def update(self, columns=None, conjunction=None, **data):
+        """
+        Updates the rows matching the columns listed in columns; returns
+        how many were updated.
+        """
+        where = tuple(columns or ())
+        values = [data[column] for column in where]
+        if (not data.keys() - set(where) or conjunction is not None or None in values
+                or self._columns(data.keys()) is None):
+            return super().update(columns=columns, conjunction=conjunction, **data)
+        assigned = tuple(column for column in data if column not in where)
+        params = tuple(data[column] for column in assigned) + tuple(values)
+        return self._execute('update', assigned, where, params).rowcount
+
+    def delete(self, **where):
+        """
+        Deletes the rows matching where (every row if empty); returns
+        how many were deleted.
+        """
+        if None in where.values() or self._columns(where.keys()) is None:
+            return super().delete(**where)
+        return self._execute('delete', (), tuple(where), tuple(where.values())).rowcount
+
+    def find_one(self, **where):
+        """
+        Returns the first row matching where as a dict, or None.
+        """
+        columns = self._columns(where.keys())
+        if columns is None or None in where.values():
+            return super().find_one(**where)
+        row = self._execute('select', columns, tuple(where), tuple(where.values())).fetchone()
+        return None if row is None else dict(zip(columns, row))
+
+    def exists(self, column, value):
+        """
+        Returns whether a row has value in column.
+        """
+        if value is None or self._columns({column}) is None:
+            return super().exists(column, value)
+        return self._execute('select', ('id',), (column,), (value,)).fetchone() is not None
+
+
+class UserRecord:
+    """
+    One user of a MemoryStore
+    """
+    __slots__ = ('id', 'user_id', 'user_last_name', 'email', 'user_name')
+
+    def __init__(self, row):
+        self.id = row.get('id')  # pylint: disable=C0103
+        self.user_id = row.get('user_id')
+        self.user_last_name = row.get('user_last_name')
+        self.email = row.get('email')
+        self.user_name = row.get('user_name')
+
+
+class StatusRecord:
+    """
+    One status of a MemoryStore
+    """
+    __slots__ = ('id', 'status_id', 'user_id', 'status_text', 'created_at')
+
+    def __init__(self, row):
+        self.id = row.get('id')  # pylint: disable=C0103
+        self.status_id = row.get('status_id')
+        self.user_id = row.get('user_id')
+        self.status_text = row.get('status_text')
+        self.created_at = row.get('created_at')
+
+
+def _as_dict(record):
+    return {name: getattr(record, name) for name in record.__slots__}
+
+
+# Words of a status text, and terms of a search (a trailing * makes a prefix)
+_WORD = re.compile(r'\w+')
+_TERM = re.compile(r'(\w+)(\*?)')
+
+
+def _parse_query(query):
+    # A query is alternatives separated by OR, each a list of terms that
+    # must all match; quotes and the other FTS5 operators are ignored
+    alternatives = []
+    for part in re.split(r'\s+OR\s+', query):
+        terms = [(word.lower(), bool(star)) for word, star in _TERM.findall(part)
+                 if word not in ('AND', 'NOT', 'NEAR')]
+        if terms:
+            alternatives.append(terms)
+    return alternatives
+
+
+def _score(alternatives, text):
+    # Number of matching words in the best alternative, 0 if none matches
+    words = [word.lower() for word in _WORD.findall(text)]
+    best = 0
+    for terms in alternatives:
+        hits = [sum(1 for word in words if word.startswith(term) if prefix or word == term)
+                for term, prefix in terms]
+        if all(hits):
+            best = max(best, sum(hits))
+    return best
+
+
+class MemoryTable:
+    """
+    The Users or Status table of a MemoryStore, with the interface of
+    SqliteTable
+    """
+
+    def __init__(self, store, name):
+        self.store = store
+        self.name = name
+        self.key = 'user_id' if name == 'Users' else 'status_id'
+        self.record = UserRecord if name == 'Users' else StatusRecord
+        self.rows = store.users if name == 'Users' else store.statuses
+        self._ids = count(1)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def write_transaction(self):
+        """
+        Context manager holding the store's lock.
+        """
+        return self.store.locked()
+
+    read_transaction = write_transaction
+
+    def _select(self, where):
+        # The records matching where, found through an index when it
+        # names the key (or, for statuses, the user)
+        if self.key in where:
+            record = self.rows.get(where[self.key])
+            candidates = [] if record is None else [record]
+        elif self.name == 'Status' and 'user_id' in where:
+            candidates = [self.rows[status_id] for status_id in
+                          self.store.user_statuses.get(where['user_id'], ())]
+        else:
+            candidates = list(self.rows.values())
+        return [record for record in candidates
+                if all(getattr(record, column) == value for column, value in where.items())]
+
+    def _add(self, row):
+        # Inserts one row dict, enforcing the key and the status's user
+        key = row[self.key]
+        if key in self.rows:
+            raise IntegrityError(f'UNIQUE constraint failed: {self.name}.{self.key}')
+        if self.name == 'Status' and row.get('user_id') not in self.store.users:
+            raise IntegrityError('FOREIGN KEY constraint failed')
+        record = self.record(row)
+        if record.id is None:
+            record.id = next(self._ids)
+        self.rows[key] = record
+        if self.name == 'Status':
+            insort(self.store.user_statuses.setdefault(record.user_id, []), key)
+        return record.id
+
+    def _change(self, record, data):
+        # Sets data on record, keeping the indexes and the rules in step
+        old_key = getattr(record, self.key)
+        new_key = data.get(self.key, old_key)
+        if new_key != old_key:
+            if new_key in self.rows:
+                raise IntegrityError(f'UNIQUE constraint failed: {self.name}.{self.key}')
+            if self.name == 'Users' and old_key in self.store.user_statuses:
+                raise IntegrityError('FOREIGN KEY constraint failed')
+        user_id = data.get('user_id', record.user_id)
+        if self.name == 'Status' and user_id != record.user_id:
+            if user_id not in self.store.users:
+                raise IntegrityError('FOREIGN KEY constraint failed')
+        if self.name == 'Status':
+            self._unlink_status(record)
+        del self.rows[old_key]
+        for name in self.record.__slots__[1:]:
+            if name in data:
+                setattr(record, name, data[name])
+        self.rows[new_key] = record
+        if self.name == 'Status':
+            insort(self.store.user_statuses.setdefault(record.user_id, []), new_key)
+
+    def _unlink_status(self, record):
+        user_statuses = self.store.user_statuses[record.user_id]
+        user_statuses.remove(record.status_id)
+        if not user_statuses:
+            del self.store.user_statuses[record.user_id]
+
+    def _remove(self, record):
+        del self.rows[getattr(record, self.key)]
+        if self.name == 'Users':
+            # ON DELETE CASCADE: the user's statuses go with it
+            for status_id in self.store.user_statuses.pop(record.user_id, []):
+                del self.store.statuses[status_id]
+        else:
+            self._unlink_status(record)
+
+    def insert(self, **row):
+        """
+        Inserts one row; raises IntegrityError for an existing key or,
+        for a status, a user that does not exist.
+        """
+        with self.store.locked():
+            return self._add(stamped(self.name, [row])[0])
+
+    def update(self, columns=None, **data):
+        """
+        Sets data on the rows whose values in the listed columns match
+        data; returns how many rows were updated.
+        """
+        where = {column: data.pop(column) for column in columns or ()}
+        with self.store.locked():
+            records = self._select(where)
+            for record in records:
+                self._change(record, data)
+        return len(records)
+
+    def delete(self, **where):
+        """
+        Deletes the rows matching where (every row if empty); returns
+        how many were deleted.
+        """
+        with self.store.locked():
+            records = self._select(where)
+            for record in records:
+                self._remove(record)
+        return len(records)
+
+    def find(self, **where):
+        """
+        Returns the rows matching where as dicts.
+        """
+        with self.store.locked():
+            return [_as_dict(record) for record in self._select(where)]
+
+    def find_one(self, **where):
+        """
+        Returns the first row matching where as a dict, or None.
+        """
+        rows = self.find(**where)
+        return rows[0] if rows else None
+
+    def all(self):
+        """
+        Returns every row as a dict.
+        """
+        return self.find()
+
+    def upsert(self, key, rows, on_conflict='skip'):
+        """
+        Writes a batch of row dicts with the rules of
+        socialnetwork_model.upsert_rows; returns 'inserted', 'updated'
+        or 'skipped' per row.
+        """
+        if on_conflict not in ON_CONFLICT:
+            raise ValueError(f"Unknown on_conflict policy: {on_conflict}")
+        rows = stamped(self.name, rows)
+        with self.store.locked():
+            existing = {row[key] for row in rows if row[key] in self.rows}
+            if on_conflict == 'fail':
+                seen = set()
+                for row in rows:
+                    if row[key] in existing or row[key] in seen:
+                        raise IntegrityError(f'UNIQUE constraint failed: {self.name}.{key} '
+                                             f'({row[key]!r})')
+                    seen.add(row[key])
+            if self.name == 'Status':
+                for row in rows:
+                    if row.get('user_id') not in self.store.users:
+                        raise IntegrityError('FOREIGN KEY constraint failed')
+            outcomes = []
+            for row in rows:
+                if row[key] not in existing:
+                    self._add(row)
+                    existing.add(row[key])
+                    outcomes.append('inserted')
+                elif on_conflict == 'overwrite':
+                    # A status keeps the created_at of its first insert
+                    self.update(columns=[key], **{name: value for name, value in row.items()
+                                                  if name != 'created_at'})
+                    outcomes.append('updated')
+                else:
+                    outcomes.append('skipped')
+            return outcomes
+
+    def exists(self, column, value):
+        """
+        Returns whether a row has value in column.
+        """
+        if column == self.key:
+            return value in self.rows
+        return self.find_one(**{column: value}) is not None
+
+    def existing(self, column, values):
+        """
+        Returns the subset of values present in column.
+        """
+        with self.store.locked():
+            return {value for value in values if self.exists(column, value)}
+
+    def find_in(self, column, values):
+        """
+        Returns the rows whose column is in values, as dicts.
+        """
+        with self.store.locked():
+            return [row for value in dict.fromkeys(values)
+                    for row in self.find(**{column: value})]
+
+    def delete_in(self, column, values):
+        """
+        Deletes the rows whose column is in values; returns how many.
+        """
+        with self.store.locked():
+            return sum(self.delete(**{column: value}) for value in set(values))
+
+    def page(self, user_id, after, limit):
+        """
+        Returns up to limit of a user's statuses in status_id order,
+        after the status_id after, from the per-user sorted index.
+        """
+        with self.store.locked():
+            status_ids = self.store.user_statuses.get(user_id, [])
+            start = 0 if after is None else bisect_right(status_ids, after)
+            return [{column: getattr(self.rows[status_id], column) for column in STATUS_COLUMNS}
+                    for status_id in status_ids[start:start + limit]]
+
+    def _user_records(self, user_id):
+        return [self.rows[status_id] for status_id in self.store.user_statuses.get(user_id, ())]
+
+    def summary(self, user_id):
+        """
+        Returns (status count, latest created_at) of a user's statuses,
+        from the per-user index; (0, None) if none.
+        """
+        with self.store.locked():
+            times = [record.created_at for record in self._user_records(user_id)
+                     if record.created_at is not None]
+            return len(self.store.user_statuses.get(user_id, ())), max(times, default=None)
+
+    def recent(self, user_id, limit):
+        """
+        Returns a user's latest limit statuses, newest first (statuses
+        without created_at last), from the per-user index.
+        """
+        with self.store.locked():
+            latest = nlargest(limit, self._user_records(user_id),
+                              key=lambda record: (record.created_at is not None,
+                                                  record.created_at or '', record.id))
+            return [{column: getattr(record, column) for column in RECENT_COLUMNS}
+                    for record in latest]
+
+    def search_text(self, query, limit, offset, ranked=False):
+        """
+        Word search over status_text: the words of query must all occur
+        (a trailing * matches a prefix, OR separates alternatives). Ranked
+        by the number of matching words; no stemming, unlike the SQLite
+        engine.
+        """
+        alternatives = _parse_query(query)
+        with self.store.locked():
+            scored = [(score, record.id, record) for record in self.rows.values()
+                      for score in [_score(alternatives, record.status_text or '')] if score]
+        scored.sort(key=lambda match: (-match[0], match[1]))
+        matches = []
+        for score, _, record in scored[offset:offset + limit]:
+            match = {column: getattr(record, column) for column in STATUS_COLUMNS}
+            if ranked:
+                match['rank'] = -score
+            matches.append(match)
+        return matches
+
+
+class MemoryStore:
+    """
+    Users and statuses held in this process (the 'memory' engine)
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.users = {}
+        self.statuses = {}
+        # user_id -> that user's status_ids in order
+        self.user_statuses = {}
+        self.Users = MemoryTable(self, 'Users')  # pylint: disable=C0103
+        self.Status = MemoryTable(self, 'Status')  # pylint: disable=C0103
+
+    @contextmanager
+    def locked(self):
+        """
+        Context manager holding the store's lock.
+        """
+        with self.lock:
+            yield
+
+    def rows(self, table, columns, user_id=None):
+        """
+        Returns the rows of table ('Users' or 'Status') as tuples of
+        columns in id order, only user_id's if given.
+        """
+        records = self.users if table == 'Users' else self.statuses
+        with self.lock:
+            selected = [record for record in records.values()
+                        if user_id is None or record.user_id == user_id]
+        selected.sort(key=lambda record: record.id)
+        return [tuple(getattr(record, column) for column in columns) for record in selected]
+
+    def save(self, path):
+        """
+        Writes the store to path, an SQLite database with the usual
+        schema, replacing the file in one step.
+        """
+        staged = path + '.saving'
+        if os.path.exists(staged):
+            os.remove(staged)
+        database = socialnetwork_model.make_database(staged)
+        try:
+            socialnetwork_model.ensure_schema(database)
+            with self.lock, database.atomic():
+                for table, record in (('Users', UserRecord), ('Status', StatusRecord)):
+                    names = ', '.join(f'"{name}"' for name in record.__slots__)
+                    database.cursor().executemany(
+                        f'INSERT INTO "{table}" ({names}) VALUES '
+                        f'({", ".join("?" * len(record.__slots__))})',
+                        self.rows(table, record.__slots__))
+        finally:
+            database.close()
+        os.replace(staged, path)
+
+    def load(self, path):
+        """
+        Adds the users and statuses of the SQLite database at path;
+        statuses whose user is not there are left out.
+        """
+        database = socialnetwork_model.make_database(path)
+        try:
+            socialnetwork_model.ensure_schema(database)
+            with self.lock:
+                for table, record in ((self.Users, UserRecord), (self.Status, StatusRecord)):
+                    names = ', '.join(f'"{name}"' for name in record.__slots__)
+                    cursor = database.execute_sql(
+                        f'SELECT {names} FROM "{table.name}" ORDER BY "id"')
+                    for row in cursor:
+                        row = dict(zip(record.__slots__, row))
+                        if table is self.Users or row['user_id'] in self.users:
+                            # As stored: an old status without created_at keeps none
+                            table._add(row)  # pylint: disable=W0212
+                    table._ids = count(max([0] + [row.id for row in table.rows.values()]) + 1)  # pylint: disable=W0212
+        finally:
+            database.close()
+
+
+_state = {'store': None, 'atexit': False}
+_lock = threading.Lock()
+
+
+def backend(table):
+    """
+    Returns the storage interface of table: an engine's own table as it
+    is, a playhouse.dataset table wrapped in CompiledTable (SqliteTable
+    if compiled SQL is off).
+    """
+    if isinstance(table, MemoryTable):
+        return table
+    if STORAGE['compiled'] and isinstance(table, Table):
+        return CompiledTable(table)
+    return SqliteTable(table)
+
+
+def memory_store():
+    """
+    Returns the MemoryStore of the 'memory' engine, creating it (and
+    loading its file, if there is one) on first use.
+    """
+    if _state['store'] is None:
+        with _lock:
+            if _state['store'] is None:
+                store = MemoryStore()
+                path = STORAGE['path']
+                if path and os.path.exists(path):
+                    store.load(path)
+                if path and not _state['atexit']:
+                    atexit.register(close)
+                    _state['atexit'] = True
+                _state['store'] = store
+    return _state['store']
+
+
+def write_transaction():
+    """
+    Context manager for writes that commit together: the memory store's
+    lock with the 'memory' engine, so the main database file is left
+    alone, and a write transaction on the main database with 'sqlite'.
+    """
+    if STORAGE['engine'] == 'memory':
+        return memory_store().locked()
+    return socialnetwork_model.write_transaction()
+
+
+def save():
+    """
+    Saves the memory store to its file, if it has one and is open.
+    """
+    store = _state['store']
+    if store is not None and STORAGE['path']:
+        store.save(STORAGE['path'])
+
+
+def close():
+    """
+    Saves the memory store to its file, if it has one, and drops it.
+    """
+    with _lock:
+        save()
+        _state['store'] = None
+
+
+def configure(engine='sqlite', path=None, compiled=True):
+    """
+    Selects the storage engine, 'sqlite' or 'memory'; path is the file
+    the memory store is loaded from and saved to (None to keep it only
+    in memory) and compiled whether the 'sqlite' engine runs single-row
+    operations as cached SQL (see CompiledTable). Closes the current
+    memory store first.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown storage engine: {engine}")
+    close()
+    STORAGE.update(engine=engine, path=path, compiled=compiled)
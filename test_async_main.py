@@ -0,0 +1,118 @@
+"""
+Module to test async_main.py
+"""
+
+import asyncio
+import os
+import tempfile
+from unittest import TestCase
+import async_main
+import main
+import sharding
+import socialnetwork_model
+
+
+class TestAsyncMain(TestCase):
+    """
+    Unit test class called TestAsyncMain
+    """
+
+    def tearDown(self):
+        """
+        Teardown method to run after
+        """
+        socialnetwork_model.Users.delete()
+        socialnetwork_model.Status.delete()
+        main.clear_caches()
+
+    def test_concurrent_writes_share_transactions(self):
+        """
+        test concurrent writes are merged into a few transactions
+        """
+        async def scenario():
+            api = async_main.make_api(max_batch=50)
+            added = await asyncio.gather(*[
+                api.add_user(f'user{index}', f'u{index}@uw.edu', 'Name', 'Last')
+                for index in range(40)])
+            duplicate = await api.add_user('user1', 'u1@uw.edu', 'Name', 'Last')
+            statuses = await asyncio.gather(*[
+                api.add_status(f'status{index}', f'user{index}', 'Hello there')
+                for index in range(40)])
+            found = await api.search_status('status7')
+            stats = api.stats()
+            await api.close()
+            return added, duplicate, statuses, found, stats
+
+        added, duplicate, statuses, found, stats = asyncio.run(scenario())
+        self.assertTrue(all(added))
+        self.assertFalse(duplicate)
+        self.assertTrue(all(statuses))
+        self.assertEqual(found['user_id'], 'user7')
+        self.assertEqual(stats['writes'], 81)
+        self.assertLess(stats['batches'], 81)
+        self.assertEqual(len(socialnetwork_model.Users), 40)
+
+    def test_cancelled_write_is_skipped(self):
+        """
+        test a write cancelled before the writer picks it up never runs
+        """
+        async def scenario():
+            api = async_main.make_api()
+            task = asyncio.ensure_future(api.add_user('gone', 'g@uw.edu', 'Gone', 'User'))
+            await asyncio.sleep(0)
+            task.cancel()
+            kept = await api.add_user('kept', 'k@uw.edu', 'Kept', 'User')
+            await api.close()
+            return task.cancelled(), kept, api.stats()
+
+        cancelled, kept, stats = asyncio.run(scenario())
+        self.assertTrue(cancelled)
+        self.assertTrue(kept)
+        self.assertEqual(stats['cancelled'], 1)
+        self.assertIsNone(socialnetwork_model.Users.find_one(user_id='gone'))
+
+    def test_load_and_failed_write(self):
+        """
+        test loads run on the writer and exceptions reach the caller
+        """
+        async def scenario():
+            api = async_main.make_api(max_concurrency=2)
+            loaded = await api.load_users('accounts1.csv')
+            with self.assertRaises(TypeError):
+                await api.add_user('missing_arguments')
+            await api.close()
+            return loaded
+
+        self.assertTrue(asyncio.run(scenario()))
+        self.assertIsNotNone(main.search_user('dave03'))
+
+    def test_small_connection_pool(self):
+        """
+        test executor threads give their pooled connections back, with
+        more threads than connections and with sharded fan-out
+        """
+        original = dict(socialnetwork_model.DB_SETTINGS)
+
+        async def scenario():
+            api = async_main.make_api(max_workers=8)
+            await api.add_user('adark', 'a@uw.edu', 'Name', 'Last')
+            await api.add_status('adark_1', 'adark', 'Hello')
+            found = await asyncio.gather(*[api.search_status('adark_1') for _ in range(64)])
+            await api.close()
+            return found
+
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                for shards in (0, 3):
+                    socialnetwork_model.configure(
+                        path=os.path.join(directory, f'pool{shards}.db'), pool_size=2)
+                    sharding.configure(shards)
+                    main.clear_caches()
+                    main.configure_search_cache(maxsize=0)
+                    found = asyncio.run(scenario())
+                    self.assertTrue(all(status['user_id'] == 'adark' for status in found))
+            finally:
+                main.configure_search_cache()
+                sharding.configure(0)
+                socialnetwork_model.configure(**original)
+                main.clear_caches()
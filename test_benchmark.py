@@ -0,0 +1,84 @@
+"""
+Module to test benchmark.py
+"""
+
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+import benchmark
+import socialnetwork_model
+
+
+class TestBenchmark(TestCase):
+    """
+    Unit test class called TestBenchmark
+    """
+
+    def setUp(self):
+        """
+        Setup method to run before
+        """
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_generators_are_seeded(self):
+        """
+        test generated files have the loader layout and depend on the seed
+        """
+        paths = [os.path.join(self.directory, f'{name}.csv') for name in 'abc']
+        benchmark.generate_status_csv(paths[0], 50, 10, seed=1)
+        benchmark.generate_status_csv(paths[1], 50, 10, seed=1)
+        benchmark.generate_users_csv(paths[2], 10, seed=1)
+        with open(paths[0], encoding='UTF-8') as first, \
+                open(paths[1], encoding='UTF-8') as second:
+            self.assertEqual(first.read(), second.read())
+        with open(paths[0], encoding='UTF-8') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(len(rows), 50)
+        user_ids = {benchmark.user_id_for(index) for index in range(10)}
+        self.assertTrue({row['USER_ID'] for row in rows} <= user_ids)
+        with open(paths[2], encoding='UTF-8') as file:
+            self.assertEqual([row['USER_ID'] for row in csv.DictReader(file)],
+                             sorted(user_ids))
+
+    def test_crud_overhead(self):
+        """
+        test the overhead micro-benchmark times both paths of every operation
+        """
+        rows = benchmark.crud_overhead(self.directory, samples=20)
+        self.assertEqual([row['operation'] for row in rows],
+                         ['insert', 'find_one', 'exists', 'update', 'delete'])
+        for row in rows:
+            self.assertGreater(row['dataset'], 0)
+            self.assertGreater(row['compiled'], 0)
+        with patch('sys.stdout', new_callable=io.StringIO) as output:
+            self.assertEqual(benchmark.cli(['--overhead', '--samples', '5']), 0)
+        self.assertIn('compiled', output.getvalue())
+
+    def test_run_and_compare(self):
+        """
+        test a small run writes a JSON report and compare finds regressions
+        """
+        output = os.path.join(self.directory, 'bench.json')
+        original = dict(socialnetwork_model.DB_SETTINGS)
+        with patch('sys.stdout', new_callable=io.StringIO):
+            self.assertEqual(benchmark.cli(['--sizes', '30', '--samples', '5',
+                                            '--output', output]), 0)
+        self.assertEqual(socialnetwork_model.DB_SETTINGS, original)
+        with open(output, encoding='UTF-8') as file:
+            report = json.load(file)
+        operations = {row['operation'] for row in report['results']}
+        self.assertTrue({'load_users', 'load_status_updates', 'search_user',
+                         'search_status', 'update_user', 'update_status',
+                         'delete_user'} <= operations)
+        slower = json.loads(json.dumps(report))
+        for row in slower['results']:
+            row['seconds'] = row['seconds'] * 2 + 1
+        regressions = benchmark.compare(output, slower)
+        self.assertEqual(len(regressions), len(report['results']))
+        self.assertEqual(benchmark.compare(report, report), [])
@@ -0,0 +1,113 @@
+"""
+Module to test cache.py
+"""
+
+from unittest import TestCase
+from unittest.mock import patch
+import cache
+
+
+class TestCacheFunctions(TestCase):
+    """
+    Unit test class called TestCacheFunctions
+    """
+
+    def setUp(self):
+        """
+        Setup method to run before
+        """
+        self.lru = cache.make_lru(maxsize=2)
+
+    def test_put_get(self):
+        """
+        test for put and get
+        """
+        self.lru.put('a', 1)
+        self.assertEqual(self.lru.get('a'), 1)
+        self.assertIsNone(self.lru.get('b'))
+        self.assertEqual(self.lru.get('b', 0), 0)
+
+    def test_put_since_generation(self):
+        """
+        test a fill read before a discard of its key is not stored
+        """
+        since = self.lru.generation()
+        self.lru.discard('a')
+        self.assertFalse(self.lru.put('a', 'old', since))
+        self.assertIsNone(self.lru.get('a'))
+        # Other keys, and reads begun after the discard, are stored
+        self.assertTrue(self.lru.put('b', 1, since))
+        self.assertTrue(self.lru.put('a', 'new', self.lru.generation()))
+        since = self.lru.generation()
+        self.lru.discard_where(lambda value: False)
+        self.assertFalse(self.lru.put('c', 1, since))
+        # Keys whose discards were forgotten are still refused
+        since = self.lru.generation()
+        for key in 'xyz':
+            self.lru.discard(key)
+        self.assertFalse(self.lru.put('x', 1, since))
+        self.assertEqual(self.lru.stats()['stale'], 3)
+
+    def test_eviction(self):
+        """
+        test least recently used key is evicted
+        """
+        self.lru.put('a')
+        self.lru.put('b')
+        # Touch 'a' so that 'b' becomes the oldest
+        self.assertTrue(self.lru.contains('a'))
+        self.lru.put('c')
+        self.assertTrue(self.lru.contains('a'))
+        self.assertFalse(self.lru.contains('b'))
+        self.assertEqual(self.lru.size(), 2)
+
+    def test_discard_clear(self):
+        """
+        test for discard and clear
+        """
+        self.lru.put('a')
+        self.lru.put('b')
+        self.lru.discard('a')
+        self.lru.discard('missing')
+        self.assertFalse(self.lru.contains('a'))
+        self.lru.clear()
+        self.assertEqual(self.lru.size(), 0)
+
+    def test_stats(self):
+        """
+        test hit, miss and eviction counters
+        """
+        self.lru.put('a', 1)
+        self.lru.get('a')
+        self.lru.get('b')
+        self.lru.put('b', 2)
+        self.lru.put('c', 3)
+        stats = self.lru.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (1, 1, 1))
+        self.assertEqual(stats['size'], 2)
+
+    def test_ttl(self):
+        """
+        test entries expire after ttl seconds
+        """
+        lru = cache.make_lru(maxsize=2, ttl=10)
+        with patch('cache.time.monotonic', return_value=100):
+            lru.put('a', 1)
+        with patch('cache.time.monotonic', return_value=105):
+            self.assertEqual(lru.get('a'), 1)
+        with patch('cache.time.monotonic', return_value=111):
+            self.assertIsNone(lru.get('a'))
+        self.assertEqual(lru.stats()['expirations'], 1)
+
+    def test_discard_where_configure(self):
+        """
+        test discard_where and configure
+        """
+        self.lru.put('a', {'user_id': 'x'})
+        self.lru.put('b', {'user_id': 'y'})
+        self.lru.discard_where(lambda value: value['user_id'] == 'x')
+        self.assertFalse(self.lru.contains('a'))
+        self.assertTrue(self.lru.contains('b'))
+        self.lru.configure(maxsize=5, ttl=1)
+        self.assertEqual(self.lru.size(), 0)
+        self.assertEqual((self.lru.stats()['maxsize'], self.lru.stats()['ttl']), (5, 1))
@@ -0,0 +1,65 @@
+"""
+Module to test checkpoint.py
+"""
+
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+import checkpoint
+
+
+class TestCheckpoint(TestCase):
+    """
+    Unit test class called TestCheckpoint
+    """
+
+    def setUp(self):
+        """
+        Setup method to run before
+        """
+        with tempfile.NamedTemporaryFile('wb', suffix='.csv', delete=False) as file:
+            file.write(b'STATUS_ID,USER_ID,STATUS_TEXT\n' + b'x_1,x,Hello\n' * 100)
+        self.filename = file.name
+
+    def tearDown(self):
+        """
+        Teardown method to run after
+        """
+        checkpoint.clear('statuses', self.filename)
+        os.remove(self.filename)
+
+    def test_fingerprint(self):
+        """
+        test the fingerprint follows the size, modification time and sampled blocks
+        """
+        with patch('checkpoint.HASH_BYTES', 16), patch('checkpoint.HASH_SAMPLES', 4):
+            first = checkpoint.fingerprint(self.filename)
+            times = os.stat(self.filename)
+            with open(self.filename, 'r+b') as file:
+                file.seek(-3, os.SEEK_END)
+                file.write(b'Hi\n')
+            os.utime(self.filename, ns=(times.st_atime_ns, times.st_mtime_ns))
+            second = checkpoint.fingerprint(self.filename)
+            os.utime(self.filename, ns=(times.st_atime_ns, times.st_mtime_ns + 10 ** 9))
+            third = checkpoint.fingerprint(self.filename)
+            self.assertEqual(checkpoint.fingerprint(self.filename), third)
+        self.assertEqual(first[0], second[0])
+        self.assertEqual(second[0], third[0])
+        self.assertEqual(len({first[1], second[1], third[1]}), 3)
+
+    def test_save_load_clear(self):
+        """
+        test checkpoints round trip and are ignored for a changed file
+        """
+        self.assertIsNone(checkpoint.load('statuses', self.filename))
+        file_print = checkpoint.fingerprint(self.filename)
+        checkpoint.save('statuses', self.filename, file_print, 42, 3)
+        checkpoint.save('statuses', self.filename, file_print, 54, 4)
+        self.assertEqual(checkpoint.load('statuses', self.filename), (54, 4))
+        self.assertIsNone(checkpoint.load('users', self.filename))
+        with open(self.filename, 'ab') as file:
+            file.write(b'x_2,x,More\n')
+        self.assertIsNone(checkpoint.load('statuses', self.filename))
+        checkpoint.clear('statuses', self.filename)
+        self.assertIsNone(checkpoint.load('statuses', self.filename, file_print))
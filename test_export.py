@@ -0,0 +1,85 @@
+"""
+Module to test export.py
+"""
+
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+import export
+import main
+import socialnetwork_model
+
+
+class TestExport(TestCase):
+    """
+    Unit test class called TestExport
+    """
+
+    def setUp(self):
+        """
+        Setup method to run before
+        """
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        main.add_user('adark', 'adark@uw.edu', 'aarol', 'adark1')
+        main.add_user('bdark', 'bdark@uw.edu', 'barol', 'bdark1')
+        main.add_status('adark_1', 'adark', 'Perfect weather today')
+        main.add_status('bdark_1', 'bdark', 'Perfect weather tomorrow')
+        main.add_status('bdark_2', 'bdark', 'Rain again')
+
+    def tearDown(self):
+        """
+        Teardown method to run after
+        """
+        socialnetwork_model.Users.delete()
+        socialnetwork_model.Status.delete()
+        main.clear_caches()
+
+    def test_csv_export_round_trip(self):
+        """
+        test a CSV export can be loaded back by the loaders
+        """
+        users_file = os.path.join(self.directory, 'users.csv')
+        status_file = os.path.join(self.directory, 'status.csv')
+        self.assertEqual(export.export_users(users_file), 2)
+        self.assertEqual(export.export_statuses(status_file), 3)
+        with open(users_file, encoding='UTF-8') as file:
+            self.assertEqual(file.readline().strip(), 'USER_ID,EMAIL,NAME,LASTNAME')
+        socialnetwork_model.Users.delete()
+        socialnetwork_model.Status.delete()
+        main.clear_caches()
+        self.assertTrue(main.load_users(users_file))
+        self.assertTrue(main.load_status_updates(status_file))
+        self.assertEqual(main.search_user('bdark')['user_last_name'], 'bdark1')
+        self.assertEqual(main.search_status('bdark_2')['status_text'], 'Rain again')
+
+    def test_gzip_jsonl_for_one_user(self):
+        """
+        test gzip and JSONL output chosen from the name and the user filter
+        """
+        path = os.path.join(self.directory, 'status.jsonl.gz')
+        self.assertEqual(export.export_statuses(path, user_id='bdark'), 2)
+        with gzip.open(path, 'rt', encoding='UTF-8') as file:
+            rows = [json.loads(line) for line in file]
+        self.assertEqual(rows, [
+            {'STATUS_ID': 'bdark_1', 'USER_ID': 'bdark', 'STATUS_TEXT': 'Perfect weather tomorrow'},
+            {'STATUS_ID': 'bdark_2', 'USER_ID': 'bdark', 'STATUS_TEXT': 'Rain again'}])
+        with self.assertRaises(ValueError):
+            export.export_users(path, output_format='xml')
+
+    def test_cli_streams_in_blocks(self):
+        """
+        test the command line export with a fetch size smaller than the table
+        """
+        path = os.path.join(self.directory, 'status.csv')
+        original = export.FETCH_SIZE
+        export.FETCH_SIZE = 2
+        try:
+            self.assertEqual(export.cli(['statuses', path]), 0)
+        finally:
+            export.FETCH_SIZE = original
+        with open(path, encoding='UTF-8') as file:
+            self.assertEqual(len(file.readlines()), 4)
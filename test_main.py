@@ -3,17 +3,23 @@ Module to test main.py
 """
 # pylint: disable=C0301
 import io
+import os
+import tempfile
 from unittest.mock import patch, Mock, mock_open
 from unittest import TestCase
 from peewee import SqliteDatabase
-from socialnetwork_model import StatusTable, UsersTable, Status, Users
+from socialnetwork_model import StatusTable, UsersTable
 from playhouse.dataset import DataSet
+import checkpoint
 import main
+import parallel_loader
+import socialnetwork_model
 
 
-class TestMain(TestCase):
+class MainTestCase(TestCase):
     """
-    Unit test class called TestMain
+    Base class of the main tests: a test database and clean tables and
+    caches after every test
     """
 
     def setUp(self):
@@ -22,16 +28,23 @@ class TestMain(TestCase):
         self.sqlite.connect()
         self.sqlite.create_tables([StatusTable, UsersTable])
         self.dataset = DataSet(self.sqlite)
-        self.Users = Users
-        self.Status = Status
+        self.Users = socialnetwork_model.Users
+        self.Status = socialnetwork_model.Status
 
     def tearDown(self):
         self.sqlite.drop_tables([StatusTable, UsersTable])
         self.sqlite.close()
         self.Users.delete()
         self.Status.delete()
+        main.clear_caches()
         self.dataset.close()
 
+
+class TestMain(MainTestCase):
+    """
+    Unit test class called TestMain
+    """
+
     def test_validate_parameters(self):
         """
         test validate_parameters method
@@ -53,6 +66,31 @@ class TestMain(TestCase):
             self.assertEqual(main.validate_parameters(test[0], test[1]),
                              expected_output)
 
+    def test_user_exists(self):
+        """
+        test user_exists method and the known_users cache
+        """
+        self.assertFalse(main.user_exists('adark_01'))
+        main.add_user('adark_01', 'adark@uw.edu', 'aarol', 'adark')
+        self.assertTrue(main.known_users.contains('adark_01'))
+        self.assertTrue(main.user_exists('adark_01'))
+        # Falls back to the indexed lookup when the cache is cold
+        main.clear_caches()
+        self.assertTrue(main.user_exists('adark_01'))
+        self.assertTrue(main.known_users.contains('adark_01'))
+        main.delete_user('adark_01')
+        self.assertFalse(main.known_users.contains('adark_01'))
+        self.assertFalse(main.user_exists('adark_01'))
+
+    def test_add_status_no_writes_for_missing_user(self):
+        """
+        test add_status does not write to Users to check the user
+        """
+        with patch('main.users.add_user_table') as mock_add_user_table:
+            self.assertFalse(main.add_status('9', 'nobody', 'Hello'))
+            mock_add_user_table.assert_not_called()
+        self.assertIsNone(self.Users.find_one(user_id='nobody'))
+
     def test_load_users(self):
         """
         test load_users method
@@ -253,6 +291,159 @@ class TestMain(TestCase):
         # Testing for user not in database
         self.assertEqual(main.search_user('adark05.1'), None)
 
+    def test_search_cache(self):
+        """
+        test search caches are read through and invalidated by writes
+        """
+        main.add_user('adark', 'adark@uw.edu', 'aarol', 'adark1')
+        main.add_status('1', 'adark', 'Perfect weather today')
+        before = main.search_cache_stats()
+        self.assertEqual(main.search_user('adark')['user_name'], 'aarol')
+        self.assertEqual(main.search_user('adark')['user_name'], 'aarol')
+        self.assertEqual(main.search_status('1')['status_text'], 'Perfect weather today')
+        self.assertEqual(main.search_status('1')['status_text'], 'Perfect weather today')
+        after = main.search_cache_stats()
+        self.assertEqual(after['user']['hits'] - before['user']['hits'], 1)
+        self.assertEqual(after['status']['misses'] - before['status']['misses'], 1)
+        # Callers get copies, not the cached rows
+        main.search_user('adark')['user_name'] = 'changed'
+        self.assertEqual(main.search_user('adark')['user_name'], 'aarol')
+        main.update_user('adark', 'adark@uw.edu', 'barol', 'adark1')
+        self.assertEqual(main.search_user('adark')['user_name'], 'barol')
+        main.update_status('1', 'adark', 'Rain')
+        self.assertEqual(main.search_status('1')['status_text'], 'Rain')
+        # Deleting the user drops the cascaded statuses from the cache
+        main.delete_user('adark')
+        self.assertIsNone(main.search_user('adark'))
+        self.assertIsNone(main.search_status('1'))
+        main.configure_search_cache(maxsize=4, ttl=60)
+        self.assertEqual(main.search_cache_stats()['user']['maxsize'], 4)
+        main.configure_search_cache()
+
+    def test_search_cache_fill_races_write(self):
+        """
+        test a search that read a row before a concurrent write does not
+        put the old row back into the cache
+        """
+        main.add_user('adark', 'adark@uw.edu', 'aarol', 'adark1')
+        search_user_table = main.users.search_user_table
+
+        def racing(table):
+            search = search_user_table(table)
+
+            def read_then_write(**kwargs):
+                row = search(**kwargs)
+                main.update_user('adark', 'adark@uw.edu', 'barol', 'adark1')
+                return row
+            return read_then_write
+
+        with patch.object(main.users, 'search_user_table', racing):
+            self.assertEqual(main.search_user('adark')['user_name'], 'aarol')
+        self.assertEqual(main.search_user('adark')['user_name'], 'barol')
+        # Nor is a deleted user remembered as existing
+        since = main.known_users.generation()
+        main.delete_user('adark')
+        main.known_users.put('adark', since=since)
+        self.assertFalse(main.user_exists('adark'))
+
+    def test_list_statuses(self):
+        """
+        test list_statuses pages through a user's statuses in order
+        """
+        main.add_user('adark', 'adark@uw.edu', 'aarol', 'adark1')
+        main.add_user('bdark', 'bdark@uw.edu', 'barol', 'bdark1')
+        for index in range(25):
+            main.add_status(f'adark_{index:03}', 'adark', f'Status {index}')
+        main.add_status('bdark_000', 'bdark', 'Other user')
+        listed = [status['status_id'] for status in main.list_statuses('adark', page_size=4)]
+        self.assertEqual(listed, [f'adark_{index:03}' for index in range(25)])
+        page = list(main.list_statuses('adark', after='adark_009', limit=5, page_size=2))
+        self.assertEqual([status['status_id'] for status in page],
+                         [f'adark_{index:03}' for index in range(10, 15)])
+        self.assertEqual(page[0]['status_text'], 'Status 10')
+        self.assertEqual(list(main.list_statuses('adark', after='adark_024')), [])
+        self.assertEqual(list(main.list_statuses('nobody')), [])
+        # Pages are served from the (user_id, status_id) index
+        status_model = socialnetwork_model.Status.model_class
+        plan = status_model.select().where(
+            (status_model.user_id == 'adark') & (status_model.status_id > 'a')
+        ).order_by(status_model.status_id).sql()
+        detail = ' '.join(str(row) for row in main.model.init().query(
+            'EXPLAIN QUERY PLAN ' + plan[0], plan[1]))
+        self.assertIn('status_user_id_status_id', detail)
+        self.assertNotIn('TEMP B-TREE', detail)
+
+    def test_user_summary_and_recent_statuses(self):
+        """
+        test the per-user summary and latest statuses follow every status write
+        """
+        main.add_user('adark', 'adark@uw.edu', 'aarol', 'adark1')
+        main.add_user('bdark', 'bdark@uw.edu', 'barol', 'bdark1')
+        self.assertEqual(main.user_summary('adark'),
+                         {'user_id': 'adark', 'status_count': 0, 'last_status_at': None})
+        self.assertIsNone(main.user_summary('nobody'))
+        self.assertEqual(main.recent_statuses('adark'), [])
+        for index in range(3):
+            main.add_status(f'adark_{index}', 'adark', f'Status {index}')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'status.csv')
+            with open(path, 'w', encoding='UTF-8') as file:
+                file.write('STATUS_ID,USER_ID,STATUS_TEXT\n')
+                file.writelines(f'{user}_9{index},{user},Loaded {index}\n'
+                                for user in ('adark', 'bdark') for index in range(2))
+            self.assertTrue(main.load_status_updates(path, chunk_size=3))
+        summary = main.user_summary('adark')
+        self.assertEqual(summary['status_count'], 5)
+        recent = main.recent_statuses('adark', 4)
+        self.assertEqual([status['status_id'] for status in recent],
+                         ['adark_91', 'adark_90', 'adark_2', 'adark_1'])
+        self.assertEqual(summary['last_status_at'], recent[0]['created_at'])
+        self.assertTrue(main.delete_status('adark_91'))
+        self.assertTrue(main.update_status('adark_90', 'adark', 'Changed'))
+        self.assertEqual(main.user_summary('adark')['status_count'], 4)
+        self.assertEqual(main.recent_statuses('adark', 1)[0]['status_text'], 'Changed')
+        self.assertEqual(main.user_summary('bdark')['status_count'], 2)
+        self.assertTrue(main.delete_user('bdark'))
+        self.assertIsNone(main.user_summary('bdark'))
+        self.assertEqual(main.recent_statuses('bdark'), [])
+        self.assertEqual(main.recent_statuses('adark', 0), [])
+        # Served from the (user_id, created_at) index without sorting
+        detail = ' '.join(str(row) for row in main.model.init().query(
+            'EXPLAIN QUERY PLAN SELECT "status_id" FROM "Status" WHERE "user_id" = ? '
+            'ORDER BY "created_at" DESC, "id" DESC LIMIT 1', ('adark',)))
+        self.assertIn('status_user_id_created_at', detail)
+        self.assertNotIn('TEMP B-TREE', detail)
+
+    def test_search_status_text(self):
+        """
+        test full-text search stays in sync with status writes
+        """
+        main.add_user('adark', 'adark@uw.edu', 'aarol', 'adark1')
+        main.add_user('bdark', 'bdark@uw.edu', 'barol', 'bdark1')
+        main.add_status('1', 'adark', 'Sunny in Seattle this morning')
+        main.add_status('2', 'bdark', 'Seattle Seattle Seattle')
+        main.add_status('3', 'bdark', 'Coffee time')
+        found = main.search_status_text('seattle')
+        self.assertEqual([status['status_id'] for status in found], ['2', '1'])
+        self.assertEqual(found[1], {'status_id': '1', 'user_id': 'adark',
+                                    'status_text': 'Sunny in Seattle this morning'})
+        self.assertEqual(len(main.search_status_text('seattle', limit=1, offset=1)), 1)
+        self.assertEqual(len(main.search_status_text('Seattle OR coffee')), 3)
+        self.assertEqual(main.search_status_text('Seattle, morning?')[0]['status_id'], '1')
+        self.assertEqual(main.search_status_text(''), [])
+        main.update_status('3', 'bdark', 'Coffee in Seattle')
+        main.delete_status('2')
+        self.assertEqual({status['status_id'] for status in main.search_status_text('seattle')},
+                         {'1', '3'})
+        main.delete_user('adark')
+        self.assertEqual([status['status_id'] for status in main.search_status_text('seattle')],
+                         ['3'])
+        # A rebuild indexes rows written behind the index's back
+        main.model.init().query('INSERT INTO "status_fts" ("status_fts") VALUES (\'delete-all\')')
+        self.assertEqual(main.search_status_text('seattle'), [])
+        self.assertTrue(main.rebuild_status_search())
+        self.assertEqual(len(main.search_status_text('seattle')), 1)
+
     def test_add_status(self):
         """
        test add_status method
@@ -358,3 +549,300 @@ class TestMain(TestCase):
                               ], expected_output)
         # Test for non existent status
         self.assertIsNone(main.search_status('4'))
+
+
+class TestBulkLoads(MainTestCase):
+    """
+    Unit test class for the bulk, batch and resumable loaders
+    """
+
+    def test_validate_columns(self):
+        """
+        test validate_columns method
+        """
+        columns = {
+            'user_id': ['badark07', 'badark07', 'b' * 31, 'b01'],
+            'email': ['ben@uw.edu', '[adark@07', 'ben@uw.edu', 'badark@07'],
+            'user_last_name': ['Adark', 'Adark', 'Adark', 'Ad-ark'],
+            'ignored': ['!', '!', '!', '!'],
+        }
+        self.assertEqual(main.validate_columns(columns), [True, False, False, True])
+        self.assertEqual(main.validate_columns({'user_id': [None]}), [False])
+        self.assertEqual(main.validate_columns({}), [])
+        # Scalar and list forms agree with the columnar form
+        self.assertTrue(main.validate_parameters('Ad-ark', 'user_last_name'))
+        self.assertFalse(main.validate_parameters('Adark', 'unknown'))
+        self.assertFalse(main.validate_parameters(['Adark'], 'user_id'))
+
+    def test_load_users_bulk(self):
+        """
+        test load_users in bulk (chunked) mode
+        """
+        tests = (
+            # Working test case, spans several chunks
+            ([
+                 {"USER_ID": "John", "EMAIL": "Doe", "NAME": "student1", "LASTNAME": "Doe1"},
+                 {"USER_ID": "Jane", "EMAIL": "Smith", "NAME": "student2", "LASTNAME": "Doe2"},
+                 {"USER_ID": "Doe", "EMAIL": "John", "NAME": "student3", "LASTNAME": "Doe3"},
+             ], True),
+            # Duplicate inside the file and against the table, last row is new
+            ([
+                 {"USER_ID": "John", "EMAIL": "Doe", "NAME": "student", "LASTNAME": "Doe1"},
+                 {"USER_ID": "Smith", "EMAIL": "Jane", "NAME": "student", "LASTNAME": "Doe4"},
+                 {"USER_ID": "Smith", "EMAIL": "Jane", "NAME": "student", "LASTNAME": "Doe4"},
+                 {"USER_ID": "Ann", "EMAIL": "Lee", "NAME": "student", "LASTNAME": "Lee"},
+             ], True),
+            # Last row is a duplicate
+            ([
+                 {"USER_ID": "Bob", "EMAIL": "Lee", "NAME": "student", "LASTNAME": "Lee"},
+                 {"USER_ID": "John", "EMAIL": "Doe", "NAME": "student", "LASTNAME": "Doe1"},
+             ], False),
+            # Empty parameter stops the load
+            ([
+                 {"USER_ID": "Tim", "EMAIL": "Lee", "NAME": "student", "LASTNAME": "Lee"},
+                 {"USER_ID": "Tom", "EMAIL": "Doe", "NAME": "student", "LASTNAME": ""},
+                 {"USER_ID": "Tam", "EMAIL": "Doe", "NAME": "student", "LASTNAME": "Doe"},
+             ], False),
+            # Missing parameter test case
+            ([
+                 {"USER_ID": "Kim", "EMAIL": "Doe", "NAME": "student"},
+             ], False),
+        )
+        for test in tests:
+            mock_dict_reader1 = Mock(return_value=iter(test[0]))
+            with patch('main.csv.DictReader', mock_dict_reader1):
+                self.assertEqual(main.load_users('accounts1.csv', chunk_size=2), test[1])
+        for user_id in ('John', 'Jane', 'Doe', 'Smith', 'Ann', 'Bob', 'Tim'):
+            self.assertIsNotNone(main.search_user(user_id))
+        for user_id in ('Tom', 'Tam', 'Kim'):
+            self.assertIsNone(main.search_user(user_id))
+        self.assertFalse(main.load_users_bulk('ccounts.csv'))
+        # Invalid rows are skipped when validating
+        mock_dict_reader1 = Mock(return_value=iter([
+            {"USER_ID": "Val01", "EMAIL": "v@uw.edu", "NAME": "Val", "LASTNAME": "Lee"},
+            {"USER_ID": "Val!02", "EMAIL": "v@uw.edu", "NAME": "Val", "LASTNAME": "Lee"},
+        ]))
+        with patch('main.csv.DictReader', mock_dict_reader1):
+            self.assertFalse(main.load_users_bulk('accounts1.csv', validate=True))
+        self.assertIsNotNone(main.search_user('Val01'))
+        self.assertIsNone(self.Users.find_one(user_id='Val!02'))
+
+    def test_load_status_updates_bulk(self):
+        """
+        test batched and multi-process status loading match the serial loader
+        """
+        main.add_user('John01', 'J1@u.edu', 'John1', 'Breezy1')
+        main.add_user('John02', 'J2@u.edu', 'John2', 'Breezy2')
+        lines = ['STATUS_ID,USER_ID,STATUS_TEXT']
+        for index in range(60):
+            lines.append(f'John01_{index:03},John01,Status number {index}')
+            lines.append(f'John02_{index:03},John02,"Quoted, with a comma"')
+            lines.append(f'Nobody_{index:03},Nobody,User does not exist')
+        lines.append('John01_000,John01,Duplicate status id')
+        lines.append('John02_999,John02,"A quoted\nmulti-line status"')
+        lines.append('John01_999,John01,Last status')
+        cases = (
+            ('\n'.join(lines) + '\n', True),
+            ('\n'.join(lines[:-3]) + '\n', False),
+            ('\n'.join(lines[:50] + ['John01_500,John01,'] + lines[50:]) + '\n', False),
+            ('STATUS_ID,USER_ID\nJohn01_001,John01\n', False),
+        )
+        for text, expected_output in cases:
+            with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False,
+                                             encoding='UTF-8') as file:
+                file.write(text)
+            results = []
+            for loader, options in ((main.load_status_updates, {}),
+                                    (main.load_status_updates, {'chunk_size': 7}),
+                                    (main.load_status_updates_bulk,
+                                     {'chunk_size': 7, 'workers': 2, 'chunk_bytes': 256})):
+                self.Status.delete()
+                self.assertEqual(loader(file.name, **options), expected_output)
+                results.append(sorted((row['status_id'], row['user_id'], row['status_text'])
+                                      for row in self.Status.all()))
+            os.remove(file.name)
+            self.assertEqual(results[0], results[1])
+            self.assertEqual(results[0], results[2])
+        self.assertFalse(main.load_status_updates('tatus_updates.csv', chunk_size=10))
+        self.assertEqual(main.add_status_batch([('v_1', 'John01', 'Hello'),
+                                                ('v_2', 'John01', 'Bad!'),
+                                                ('v_3', 'Nobody', 'Hi')], validate=True),
+                         [True, False, False])
+
+    def test_load_users_mmap_reader(self):
+        """
+        test the bulk loaders give the same result with the mmap reader
+        """
+        results = []
+        try:
+            for backend in ('csv', 'mmap'):
+                parallel_loader.configure_reader(backend)
+                self.Users.delete()
+                self.Status.delete()
+                main.clear_caches()
+                self.assertTrue(main.load_users('accounts1.csv', chunk_size=3))
+                main.load_status_updates('status_updates1.csv', chunk_size=3)
+                results.append([sorted(tuple(value for key, value in row.items()
+                                             if key not in ('id', 'created_at'))
+                                       for row in table.all())
+                                for table in (self.Users, self.Status)])
+        finally:
+            parallel_loader.configure_reader()
+        self.assertEqual(results[0], results[1])
+
+    def test_load_status_updates_resume(self):
+        """
+        test an interrupted load resumes from its checkpoint
+        """
+        main.add_user('John01', 'J1@u.edu', 'John1', 'Breezy1')
+        lines = ['STATUS_ID,USER_ID,STATUS_TEXT']
+        lines += [f'John01_{index:03},John01,"Status, number {index}"' for index in range(10)]
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False,
+                                         encoding='UTF-8') as file:
+            file.write('\n'.join(lines) + '\n')
+        original = main.add_status_batch
+        calls = []
+
+        def crash_on_third_batch(*args):
+            calls.append(args[0])
+            if len(calls) == 3:
+                raise RuntimeError('killed')
+            return original(*args)
+
+        try:
+            with patch('main.add_status_batch', crash_on_third_batch):
+                with self.assertRaises(RuntimeError):
+                    main.load_status_updates(file.name, chunk_size=3)
+            self.assertEqual(len(self.Status), 6)
+            self.assertEqual(checkpoint.load('statuses', file.name)[1], 6)
+            with self.assertLogs(main.logger, 'INFO') as logs:
+                self.assertTrue(main.load_status_updates(file.name, resume=True))
+            self.assertIn('Resuming', logs.output[0])
+            self.assertIn('4 loaded, 0 updated, 0 duplicate', '\n'.join(logs.output))
+            self.assertEqual(len(self.Status), 10)
+            self.assertEqual(main.search_status('John01_009')['status_text'], 'Status, number 9')
+            # Finished loads leave no checkpoint; a changed file starts over
+            self.assertIsNone(checkpoint.load('statuses', file.name))
+            with patch('main.add_status_batch', crash_on_third_batch):
+                calls.clear()
+                with self.assertRaises(RuntimeError):
+                    main.load_status_updates(file.name, chunk_size=3)
+            with open(file.name, 'a', encoding='UTF-8') as changed:
+                changed.write('John01_010,John01,Appended\n')
+            with self.assertLogs(main.logger, 'INFO') as logs:
+                self.assertTrue(main.load_status_updates(file.name, resume=True))
+            self.assertIn('No checkpoint matches', logs.output[0])
+            self.assertIn('1 loaded, 0 updated, 10 duplicate', '\n'.join(logs.output))
+        finally:
+            os.remove(file.name)
+
+    def test_batch_api(self):
+        """
+        test the batch add, update, search and delete functions
+        """
+        self.assertEqual(main.add_users([
+            ('adark', 'adark@uw.edu', 'aarol', 'adark1'),
+            ('bdark', 'bdark@uw.edu', 'barol', 'bdark1'),
+            ('adark', 'adark@uw.edu', 'aarol', 'adark1'),
+            ('bad!', 'bad@uw.edu', 'bad', 'bad')]), [True, True, False, False])
+        self.assertEqual(main.add_users([]), [])
+        self.assertTrue(main.user_exists('bdark'))
+        main.add_status('a_1', 'adark', 'Hello')
+        main.add_status('a_2', 'adark', 'Again')
+        main.add_status('b_1', 'bdark', 'Hi')
+        self.assertEqual(main.search_user('adark')['user_name'], 'aarol')
+        self.assertEqual(main.update_users([
+            ('adark', 'new@uw.edu', 'anew', 'adark1'),
+            ('cdark', 'c@uw.edu', 'carol', 'cdark1')]), [True, False])
+        found = main.search_users(['adark', 'cdark', 'bdark', 'adark'])
+        self.assertEqual(list(found), ['adark', 'cdark', 'bdark'])
+        self.assertEqual(found['adark']['user_name'], 'anew')
+        self.assertEqual(found['bdark'], main.search_user('bdark'))
+        self.assertIsNone(found['cdark'])
+        statuses = main.search_statuses(['a_1', 'b_1', 'x_1'])
+        self.assertEqual(statuses['a_1']['status_text'], 'Hello')
+        self.assertIsNone(statuses['x_1'])
+        self.assertEqual(main.delete_statuses(['a_2', 'x_1']), {'a_2': True, 'x_1': False})
+        self.assertIsNone(main.search_status('a_2'))
+        # Deleting users cascades to their statuses and the caches
+        self.assertEqual(main.delete_users(['adark', 'cdark']), {'adark': True, 'cdark': False})
+        self.assertIsNone(main.search_user('adark'))
+        self.assertIsNone(main.search_status('a_1'))
+        self.assertFalse(main.user_exists('adark'))
+        self.assertEqual(main.search_status('b_1')['user_id'], 'bdark')
+        self.assertEqual(len(self.Status), 1)
+
+    def test_load_on_conflict(self):
+        """
+        test the skip, overwrite and fail policies for existing rows
+        """
+        main.add_user('John01', 'J1@u.edu', 'John1', 'Breezy1')
+        main.add_status('John01_1', 'John01', 'Old status')
+        users_text = ('USER_ID,EMAIL,NAME,LASTNAME\n'
+                      'John01,new@u.edu,John1,Breezy1\nJohn02,J2@u.edu,John2,Breezy2\n')
+        status_text = ('STATUS_ID,USER_ID,STATUS_TEXT\n'
+                       'John01_1,John01,New status\nJohn01_2,John01,Another status\n')
+        paths = []
+        for text in (users_text, status_text):
+            with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False,
+                                             encoding='UTF-8') as file:
+                file.write(text)
+            paths.append(file.name)
+        try:
+            # fail writes nothing from the conflicting chunk
+            self.assertFalse(main.load_users(paths[0], on_conflict='fail'))
+            self.assertIsNone(main.search_user('John02'))
+            self.assertFalse(main.load_status_updates(paths[1], on_conflict='fail'))
+            self.assertIsNone(main.search_status('John01_2'))
+            # skip keeps the stored rows
+            with self.assertLogs(main.logger, 'INFO') as logs:
+                self.assertTrue(main.load_users(paths[0], chunk_size=10))
+            self.assertIn('Loaded chunk of 1 users (0 updated, 1 skipped)', logs.output[0])
+            self.assertEqual(main.search_user('John01')['email'], 'J1@u.edu')
+            self.assertEqual(main.search_status('John01_1')['status_text'], 'Old status')
+            # overwrite replaces them, also in the search caches
+            self.assertTrue(main.load_users(paths[0], on_conflict='overwrite'))
+            self.assertEqual(main.search_user('John01')['email'], 'new@u.edu')
+            with self.assertLogs(main.logger, 'INFO') as logs:
+                self.assertTrue(main.load_status_updates(paths[1], on_conflict='overwrite'))
+            self.assertIn('1 loaded, 1 updated, 0 duplicate', '\n'.join(logs.output))
+            self.assertEqual(main.search_status('John01_1')['status_text'], 'New status')
+            self.assertEqual(len(main.search_status_text('status')), 2)
+        finally:
+            for path in paths:
+                os.remove(path)
+        with self.assertRaises(ValueError):
+            main.add_status_batch([('John01_3', 'John01', 'Hi')], on_conflict='merge')
+
+    def test_load_logging_summary(self):
+        """
+        test summary mode logs counts and samples instead of every row
+        """
+        main.add_user('evmiles97', 'eve@uw.edu', 'Eve', 'Miles')
+        main.configure_load_logging('summary', samples=2)
+        try:
+            with self.assertLogs(main.logger, 'INFO') as logs:
+                main.load_users('accounts1.csv')
+                main.load_status_updates_bulk('status_updates1.csv', 2, validate=True)
+        finally:
+            main.configure_load_logging()
+        self.assertFalse([line for line in logs.output if 'was loaded successfully' in line])
+        self.assertFalse([line for line in logs.output if 'Loaded batch' in line])
+        summaries = [line for line in logs.output if ' from ' in line]
+        self.assertEqual(len(summaries), 2)
+        self.assertIn('1 duplicate', summaries[0])
+        self.assertIn('Sample duplicate users: evmiles97', '\n'.join(logs.output))
+
+    def test_async_logging(self):
+        """
+        test queued records are written to the log file when disabled
+        """
+        main.enable_async_logging()
+        try:
+            self.assertNotIn(main.file_handler, main.logger.handlers)
+            main.logger.info('async logging check')
+        finally:
+            main.disable_async_logging()
+        self.assertIn(main.file_handler, main.logger.handlers)
+        with open(main.file_handler.baseFilename, encoding='UTF-8') as file:
+            self.assertIn('async logging check', file.read())
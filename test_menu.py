@@ -0,0 +1,117 @@
+"""
+Module to test menu.py
+"""
+
+import io
+import json
+import os
+import tempfile
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+import main
+import menu
+import socialnetwork_model
+
+
+def command(op, **arguments):
+    """
+    Returns one JSON command line
+    """
+    return json.dumps({'op': op, **arguments}) + '\n'
+
+
+class TestMenu(TestCase):
+    """
+    Unit test class called TestMenu
+    """
+
+    def tearDown(self):
+        """
+        Teardown method to run after
+        """
+        socialnetwork_model.Users.delete()
+        socialnetwork_model.Status.delete()
+        main.clear_caches()
+
+    def test_run_commands(self):
+        """
+        test batch commands run in groups and report every result in order
+        """
+        lines = [
+            command('add_user', user_id='adark', email='adark@uw.edu', user_name='aarol',
+                    user_last_name='adark1'),
+            command('add_status', status_id='a_1', user_id='adark', status_text='Hello'),
+            command('add_status', status_id='x_1', user_id='nobody', status_text='No user'),
+            '\n',
+            'not json\n',
+            command('drop_everything'),
+            command('search_user', user_id='adark', extra=1),
+            command('list_statuses', user_id='adark'),
+            command('user_summary', user_id='adark'),
+        ]
+        output = io.StringIO()
+        summary = menu.run_commands(lines, group_size=2, output=output)
+        results = [json.loads(line) for line in output.getvalue().splitlines()[:-1]]
+        self.assertEqual([result['line'] for result in results], [1, 2, 3, 5, 6, 7, 8, 9])
+        self.assertEqual([result['ok'] for result in results],
+                         [True, True, False, False, False, False, True, True])
+        self.assertEqual(results[3]['error'], 'invalid JSON command')
+        self.assertEqual(results[4]['error'], "unknown op 'drop_everything'")
+        self.assertIn('TypeError', results[5]['error'])
+        self.assertEqual(results[6]['result'][0]['status_text'], 'Hello')
+        self.assertEqual(results[7]['result']['status_count'], 1)
+        self.assertEqual((summary['commands'], summary['ok'], summary['failed'],
+                          summary['groups']), (8, 4, 4, 4))
+        self.assertIn('8 commands (4 ok, 4 failed) in 4 groups', output.getvalue())
+        with self.assertRaises(ValueError):
+            menu.run_commands(lines, group_size=0)
+
+    def test_read_groups_skip_write_lock(self):
+        """
+        test read-only groups run while another thread holds the write lock
+        """
+        main.add_user('adark', 'adark@uw.edu', 'aarol', 'adark1')
+        lines = [command('search_user', user_id='adark'),
+                 command('user_summary', user_id='adark')] * 4
+        output = io.StringIO()
+        locked, done = threading.Event(), threading.Event()
+
+        def hold_lock():
+            with socialnetwork_model.write_lock:
+                locked.set()
+                done.wait(10)
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        locked.wait()
+        runner = threading.Thread(target=menu.run_commands, args=(lines,),
+                                  kwargs={'group_size': 2, 'workers': 2, 'output': output})
+        runner.start()
+        runner.join(10)
+        finished = not runner.is_alive()
+        done.set()
+        holder.join()
+        runner.join()
+        self.assertTrue(finished)
+        self.assertIn('8 commands (8 ok, 0 failed) in 4 groups', output.getvalue())
+
+    def test_cli_with_workers(self):
+        """
+        test the command line runs a command file on several threads
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'commands.jsonl')
+            with open(path, 'w', encoding='UTF-8') as file:
+                file.writelines(command('add_user', user_id=f'user{index:03}',
+                                        email=f'u{index}@uw.edu', user_name='N',
+                                        user_last_name='L') for index in range(50))
+            with patch('sys.stdout', new_callable=io.StringIO) as output:
+                self.assertEqual(menu.cli(['--batch', path, '--group-size', '7',
+                                           '--workers', '3']), 0)
+            lines = output.getvalue().splitlines()
+            self.assertEqual([json.loads(line)['line'] for line in lines[:-1]],
+                             list(range(1, 51)))
+            self.assertEqual(len(socialnetwork_model.Users), 50)
+            with patch('sys.stdout', new_callable=io.StringIO):
+                self.assertEqual(menu.cli(['--batch', path]), 1)
@@ -0,0 +1,78 @@
+"""
+Module to test metrics.py
+"""
+
+from contextlib import nullcontext
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import MagicMock
+import metrics
+import users
+
+
+class TestMetricsFunctions(TestCase):
+    """
+    Unit test class called TestMetricsFunctions
+    """
+
+    def setUp(self):
+        """
+        Setup method to run before
+        """
+        metrics.reset()
+
+    def tearDown(self):
+        """
+        Teardown method to run after
+        """
+        metrics.disable()
+        metrics.reset()
+
+    def test_disabled_returns_originals(self):
+        """
+        test nothing is wrapped or recorded while disabled
+        """
+        self.assertFalse(metrics.is_enabled())
+        context = nullcontext()
+        self.assertIs(metrics.instrument('op', len), len)
+        self.assertIs(metrics.transaction('op', context), context)
+        users.add_user_table(MagicMock())(user_id='ben24')
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_enabled_records_closures(self):
+        """
+        test calls, errors, latency and transaction time are recorded
+        """
+        metrics.enable()
+        table = MagicMock()
+        users.add_user_table(table)(user_id='ben24')
+        table.insert.side_effect = ValueError
+        with self.assertRaises(ValueError):
+            users.add_user_table(table)(user_id='ben24')
+        data = metrics.snapshot()['add_user']
+        self.assertEqual((data['calls'], data['errors']), (2, 1))
+        self.assertEqual(data['latency']['count'], 2)
+        self.assertEqual(data['latency']['buckets'][float('inf')], 2)
+        self.assertEqual(data['transaction']['count'], 2)
+        self.assertGreater(data['latency']['sum'], 0)
+
+    def test_prometheus_export(self):
+        """
+        test the Prometheus text format and file exporter
+        """
+        metrics.enable()
+        metrics.instrument('search_user', lambda: None)()
+        text = metrics.prometheus_text()
+        self.assertIn('# TYPE socialnetwork_operation_calls_total counter', text)
+        self.assertIn('socialnetwork_operation_calls_total{operation="search_user"} 1', text)
+        self.assertIn('socialnetwork_operation_latency_seconds_bucket'
+                      '{operation="search_user",le="+Inf"} 1', text)
+        self.assertIn('socialnetwork_operation_latency_seconds_count'
+                      '{operation="search_user"} 1', text)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'socialnetwork.prom')
+            metrics.write_prometheus(path)
+            with open(path, encoding='UTF-8') as file:
+                self.assertEqual(file.read(), text)
+            self.assertEqual(os.listdir(directory), ['socialnetwork.prom'])
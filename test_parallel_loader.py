@@ -0,0 +1,165 @@
+"""
+Module to test parallel_loader.py
+"""
+
+import csv
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+import parallel_loader
+
+
+class TestParallelLoaderFunctions(TestCase):
+    """
+    Unit test class called TestParallelLoaderFunctions
+    """
+
+    def setUp(self):
+        """
+        Setup method to run before
+        """
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False,
+                                         encoding='UTF-8') as file:
+            file.write('STATUS_ID,USER_ID,STATUS_TEXT\n'
+                       'a_1,a,Hello\n'
+                       'a_2,a,"Hello, again"\n'
+                       'b_1,b,"Two\nlines"\n'
+                       'b_2,b,\n'
+                       'b_3,b,Never read\n')
+        self.filename = file.name
+
+    def tearDown(self):
+        """
+        Teardown method to run after
+        """
+        os.remove(self.filename)
+
+    def test_read_header(self):
+        """
+        test for read_header
+        """
+        header, offset = parallel_loader.read_header(self.filename)
+        self.assertEqual(header, ['STATUS_ID', 'USER_ID', 'STATUS_TEXT'])
+        self.assertEqual(offset, len('STATUS_ID,USER_ID,STATUS_TEXT\n'))
+
+    def test_split_ranges(self):
+        """
+        test ranges cover the file and end on newlines
+        """
+        _, offset = parallel_loader.read_header(self.filename)
+        ranges = parallel_loader.split_ranges(self.filename, offset, 5)
+        self.assertEqual(ranges[0][0], offset)
+        self.assertEqual(ranges[-1][1], os.path.getsize(self.filename))
+        with open(self.filename, 'rb') as file:
+            data = file.read()
+        for start, end in ranges:
+            self.assertEqual(data[end - 1:end], b'\n')
+            self.assertEqual(data[start - 1:start], b'\n')
+
+    def test_parse_range(self):
+        """
+        test parse_range batches, stops on an empty field and detects
+        ranges that split a quoted field
+        """
+        header, offset = parallel_loader.read_header(self.filename)
+        end = os.path.getsize(self.filename)
+        results = parallel_loader.parse_range((self.filename, offset, end, header, 2))
+        self.assertEqual(results, [
+            ([('a_1', 'a', 'Hello'), ('a_2', 'a', 'Hello, again')], None),
+            ([('b_1', 'b', 'Two\nlines')], 'empty'),
+        ])
+        split = offset + len('a_1,a,Hello\na_2,a,"Hello, again"\nb_1,b,"Two\n')
+        results = parallel_loader.parse_range((self.filename, offset, split, header, 2))
+        self.assertEqual(results, [([], 'unaligned')])
+
+    def test_iter_batches_missing_column(self):
+        """
+        test a missing column stops the parse
+        """
+        batches = list(parallel_loader.iter_file_batches(
+            self.filename, 0, ['STATUS_ID', 'USER_ID'], 10))
+        self.assertEqual(batches, [([], 'missing')])
+
+    def test_iter_rows_matches_csv(self):
+        """
+        test the mmap reader parses the same rows as csv for any block size
+        """
+        with open(self.filename, 'a', encoding='UTF-8', newline='') as file:
+            file.write('c_1,c,"Quoted ""twice"", split\r\nover lines"\r\n\n'
+                       'c_2,c,Ünïcode\nc_3,c,end')
+        with open(self.filename, encoding='UTF-8', newline='') as file:
+            expected = [row for row in csv.reader(file) if row]
+        original = parallel_loader.BLOCK_SIZE
+        try:
+            for block_size in (1, 7, 64, 1 << 20):
+                parallel_loader.BLOCK_SIZE = block_size
+                self.assertEqual([row for row in parallel_loader.iter_rows(self.filename)
+                                  if row], expected)
+        finally:
+            parallel_loader.BLOCK_SIZE = original
+        # Bare carriage returns end rows for csv, so those files go to csv
+        with open(self.filename, 'w', encoding='UTF-8', newline='') as file:
+            file.write('a,b\rc,d\r')
+        self.assertEqual(list(parallel_loader.iter_rows(self.filename)), [['a', 'b'], ['c', 'd']])
+
+    def test_reader_backends_agree(self):
+        """
+        test both reader backends produce the same batches
+        """
+        header, offset = parallel_loader.read_header(self.filename)
+        results = []
+        try:
+            for backend in ('csv', 'mmap'):
+                parallel_loader.configure_reader(backend)
+                results.append(list(parallel_loader.iter_file_batches(
+                    self.filename, offset, header, 2)))
+        finally:
+            parallel_loader.configure_reader()
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[1][-1], ([('b_1', 'b', 'Two\nlines')], 'empty'))
+        with self.assertRaises(ValueError):
+            parallel_loader.configure_reader('arrow')
+
+    def test_offset_batches_backends_agree(self):
+        """
+        test the mmap reader reports the same resume offsets as csv
+        """
+        with open(self.filename, 'wb') as file:
+            file.write('STATUS_ID,USER_ID,STATUS_TEXT\r\n'
+                       'a_1,a,Héllo wörld\r\n\r\n'
+                       'a_2,a,"Quoted, ünïcode"\n'
+                       'a_3,a,Plain again\n\n'
+                       'b_1,b,"Two\nlines"\n'
+                       'b_2,b,No newline at the end'.encode('UTF-8'))
+        header, offset = parallel_loader.read_header(self.filename)
+        results = []
+        try:
+            for backend in ('csv', 'mmap'):
+                parallel_loader.configure_reader(backend)
+                with patch('parallel_loader.BLOCK_SIZE', 16):
+                    results.append(list(parallel_loader.iter_offset_batches(
+                        self.filename, offset, header, 1)))
+        finally:
+            parallel_loader.configure_reader()
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(len(results[1]), 5)
+        self.assertEqual(results[1][-1][2], os.path.getsize(self.filename))
+
+    def test_iter_offset_batches(self):
+        """
+        test offsets point just past each batch and resume cleanly there
+        """
+        header, offset = parallel_loader.read_header(self.filename)
+        batches = list(parallel_loader.iter_offset_batches(self.filename, offset, header, 1))
+        self.assertEqual([batch for batch, _, _ in batches], [
+            [('a_1', 'a', 'Hello')], [('a_2', 'a', 'Hello, again')],
+            [('b_1', 'b', 'Two\nlines')], []])
+        self.assertEqual(batches[-1][1], 'empty')
+        with open(self.filename, 'rb') as file:
+            data = file.read()
+        # The bad row is not skipped on resume
+        self.assertTrue(data[batches[-1][2]:].startswith(b'b_2,b,'))
+        resumed = list(parallel_loader.iter_offset_batches(
+            self.filename, batches[1][2], header, 10))
+        self.assertEqual(resumed[0][0], [('b_1', 'b', 'Two\nlines')])
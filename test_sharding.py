@@ -0,0 +1,192 @@
+"""
+Module to test sharding.py
+"""
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from peewee import IntegrityError
+import export
+import main
+import sharding
+import socialnetwork_model
+
+USERS = [(f'user{index:02}', f'user{index:02}@uw.edu', f'Name{index}', f'Last{index}')
+         for index in range(20)]
+
+
+class TestSharding(TestCase):
+    """
+    Unit test class called TestSharding
+    """
+
+    def setUp(self):
+        """
+        Setup method to run before: a main database and 3 shards in a
+        temporary directory
+        """
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'social.db')
+        self.original = dict(socialnetwork_model.DB_SETTINGS)
+        socialnetwork_model.configure(path=self.path)
+        sharding.configure(3)
+        main.clear_caches()
+
+    def tearDown(self):
+        """
+        Teardown method to run after
+        """
+        sharding.configure(0)
+        socialnetwork_model.configure(**self.original)
+        main.clear_caches()
+
+    def counts(self):
+        """
+        Returns the number of users in each shard
+        """
+        return [len(users_table) for users_table, _ in sharding.all_tables()]
+
+    def test_shard_index(self):
+        """
+        test the hash is stable and spreads users over the shards
+        """
+        self.assertEqual(sharding.shard_index('user00', 3), sharding.shard_index('user00'))
+        self.assertEqual(sharding.shard_index('anything', 0), 0)
+        self.assertEqual({sharding.shard_index(user[0]) for user in USERS}, {0, 1, 2})
+        self.assertEqual(sharding.shard_paths(2, 'x/social.db'),
+                         ['x/social.shard0.db', 'x/social.shard1.db'])
+        with self.assertRaises(ValueError):
+            sharding.configure(-1)
+
+    def test_single_key_operations(self):
+        """
+        test main's single-key functions route to the user's shard
+        """
+        for user in USERS[:6]:
+            self.assertTrue(main.add_user(*user))
+        self.assertFalse(main.add_user(*USERS[0]))
+        self.assertTrue(main.add_status('s_1', 'user01', 'Rain in Seattle'))
+        self.assertFalse(main.add_status('s_2', 'nobody', 'No user'))
+        users_table, status_table = sharding.tables_for('user01')
+        self.assertEqual(users_table.find_one(user_id='user01')['user_name'], 'Name1')
+        self.assertEqual(status_table.find_one(status_id='s_1')['user_id'], 'user01')
+        self.assertEqual(sum(self.counts()), 6)
+        self.assertEqual(len(socialnetwork_model.Users), 0)
+        self.assertTrue(main.update_user('user01', 'n@uw.edu', 'New', 'Last1'))
+        self.assertEqual(main.search_user('user01')['user_name'], 'New')
+        # Statuses are found by status_id alone, whichever user updates them
+        self.assertTrue(main.update_status('s_1', 'user02', 'Sun in Seattle'))
+        self.assertEqual(main.search_status('s_1')['status_text'], 'Sun in Seattle')
+        self.assertEqual(main.search_status_text('seattle'), [
+            {'status_id': 's_1', 'user_id': 'user01', 'status_text': 'Sun in Seattle'}])
+        self.assertEqual([status['status_id'] for status in main.list_statuses('user01')],
+                         ['s_1'])
+        self.assertTrue(main.delete_status('s_1'))
+        self.assertIsNone(main.search_status('s_1'))
+        self.assertTrue(main.delete_user('user01'))
+        self.assertIsNone(main.search_user('user01'))
+        self.assertEqual(sum(self.counts()), 5)
+
+    def test_status_id_unique_across_shards(self):
+        """
+        test a status_id stays unique when its users are on different shards
+        """
+        for user in USERS[:3]:
+            self.assertTrue(main.add_user(*user))
+        self.assertNotEqual(sharding.shard_index('user00'), sharding.shard_index('user01'))
+        self.assertTrue(main.add_status('s_1', 'user00', 'First'))
+        self.assertFalse(main.add_status('s_1', 'user01', 'Second'))
+        self.assertEqual(main.add_status_batch([('s_1', 'user01', 'Batch'),
+                                                ('s_2', 'user01', 'New'),
+                                                ('s_2', 'user02', 'Same batch')]),
+                         [False, True, False])
+        with self.assertRaises(IntegrityError):
+            main.add_status_batch([('s_1', 'user01', 'Fail')], on_conflict='fail')
+        self.assertEqual(sum(len(status_table) for _, status_table in sharding.all_tables()),
+                         2)
+        self.assertEqual(main.search_status('s_1')['status_text'], 'First')
+        self.assertTrue(main.update_status('s_1', 'user01', 'Edited'))
+        self.assertEqual(sharding.tables_for('user00')[1].find_one(status_id='s_1')[
+            'status_text'], 'Edited')
+        # Overwriting with another user moves the status to that user's shard
+        self.assertEqual(main.add_status_batch([('s_1', 'user01', 'Moved')],
+                                               on_conflict='overwrite'), [True])
+        self.assertIsNone(sharding.tables_for('user00')[1].find_one(status_id='s_1'))
+        self.assertEqual(main.search_status('s_1')['user_id'], 'user01')
+        self.assertEqual(list(main.list_statuses('user00')), [])
+        self.assertTrue(main.delete_status('s_1'))
+        self.assertFalse(main.delete_status('s_1'))
+        self.assertEqual(sum(len(status_table) for _, status_table in sharding.all_tables()),
+                         1)
+
+    def test_batch_and_bulk_operations(self):
+        """
+        test bulk loads and batch queries fan out over every shard
+        """
+        users_file = os.path.join(self.directory, 'users.csv')
+        with open(users_file, 'w', encoding='UTF-8') as file:
+            file.write('USER_ID,EMAIL,NAME,LASTNAME\n')
+            file.writelines(','.join(user) + '\n' for user in USERS)
+        self.assertTrue(main.load_users(users_file, chunk_size=7))
+        self.assertTrue(all(self.counts()))
+        self.assertEqual(sum(self.counts()), 20)
+        status_file = os.path.join(self.directory, 'status.csv')
+        with open(status_file, 'w', encoding='UTF-8') as file:
+            file.write('STATUS_ID,USER_ID,STATUS_TEXT\n')
+            file.writelines(f'{user[0]}_{number},{user[0]},coffee number {number}\n'
+                            for user in USERS for number in range(3))
+        self.assertTrue(main.load_status_updates(status_file, chunk_size=10))
+        for users_table, status_table in sharding.all_tables():
+            self.assertEqual(len(status_table), 3 * len(users_table))
+        self.assertEqual(len(main.search_status_text('coffee', limit=100)), 60)
+        page = main.search_status_text('coffee', limit=5, offset=55)
+        self.assertEqual(len(page), 5)
+        self.assertNotIn('rank', page[0])
+        self.assertEqual(main.add_users([USERS[0], ('new01', 'n@uw.edu', 'N', 'L')]),
+                         [False, True])
+        found = main.search_users(['user05', 'user17', 'nobody'])
+        self.assertEqual(found['user17']['email'], 'user17@uw.edu')
+        self.assertIsNone(found['nobody'])
+        self.assertEqual(main.update_users([('user05', 'x@uw.edu', 'X', 'Y')]), [True])
+        self.assertEqual(main.search_user('user05')['email'], 'x@uw.edu')
+        statuses = main.search_statuses(['user03_1', 'user19_2', 'nope'])
+        self.assertEqual(statuses['user19_2']['user_id'], 'user19')
+        self.assertIsNone(statuses['nope'])
+        self.assertEqual(main.delete_statuses(['user03_1', 'nope']),
+                         {'user03_1': True, 'nope': False})
+        self.assertEqual(main.delete_users(['user04', 'user11']),
+                         {'user04': True, 'user11': True})
+        self.assertEqual(sum(len(status_table) for _, status_table in sharding.all_tables()),
+                         53)
+        exported = os.path.join(self.directory, 'export.csv')
+        self.assertEqual(export.export_users(exported), 19)
+        self.assertEqual(export.export_statuses(exported, user_id='user19'), 3)
+        self.assertTrue(main.rebuild_status_search())
+
+    def test_reshard(self):
+        """
+        test resharding moves every row to its new shard and back
+        """
+        sharding.configure(0)
+        self.assertEqual(main.add_users(USERS), [True] * 20)
+        for user in USERS:
+            main.add_status(f'{user[0]}_1', user[0], f'Hello from {user[0]}')
+        self.assertEqual(sharding.reshard(3, 0, self.path), (20, 20))
+        self.assertEqual(sharding.SHARDS['count'], 3)
+        main.clear_caches()
+        self.assertEqual(len(socialnetwork_model.Users), 0)
+        self.assertEqual(sum(self.counts()), 20)
+        self.assertEqual(sharding.cli(['2', '--from', '3', '--db', self.path]), 0)
+        self.assertFalse(os.path.exists(sharding.shard_paths(3, self.path)[2]))
+        for index, (users_table, status_table) in enumerate(sharding.all_tables()):
+            for user in users_table.all():
+                self.assertEqual(sharding.shard_index(user['user_id'], 2), index)
+                self.assertIsNotNone(status_table.find_one(user_id=user['user_id']))
+        self.assertEqual(main.search_status('user07_1')['status_text'], 'Hello from user07')
+        self.assertEqual(sharding.reshard(0, 2, self.path), (20, 20))
+        self.assertEqual(len(socialnetwork_model.Users), 20)
+        self.assertEqual(len(socialnetwork_model.Status), 20)
+        self.assertEqual(main.search_status_text('user07'), [
+            {'status_id': 'user07_1', 'user_id': 'user07', 'status_text': 'Hello from user07'}])
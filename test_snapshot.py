@@ -0,0 +1,132 @@
+"""
+Module to test snapshot.py
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import tempfile
+import time
+from unittest import TestCase
+import main
+import sharding
+import snapshot
+import socialnetwork_model
+
+
+def in_other_thread(func, *args):
+    """
+    Runs func(*args) on a new thread, which has written nothing
+    """
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(func, *args).result()
+
+
+class TestSnapshot(TestCase):
+    """
+    Unit test class called TestSnapshot
+    """
+
+    def setUp(self):
+        """
+        Setup method to run before
+        """
+        main.add_user('adark', 'adark@uw.edu', 'aarol', 'adark1')
+        main.add_status('adark_1', 'adark', 'Coffee in Seattle')
+
+    def tearDown(self):
+        """
+        Teardown method to run after
+        """
+        snapshot.stop()
+        socialnetwork_model.Users.delete()
+        socialnetwork_model.Status.delete()
+        main.clear_caches()
+
+    def test_reads_come_from_the_snapshot(self):
+        """
+        test other threads read the snapshot until it is refreshed
+        """
+        snapshot.start(max_age=60, max_writes=0)
+        main.add_user('bdark', 'bdark@uw.edu', 'barol', 'bdark1')
+        main.add_status('bdark_1', 'bdark', 'More coffee')
+        self.assertIsNone(in_other_thread(main.search_user, 'bdark'))
+        self.assertEqual(in_other_thread(main.search_user, 'adark')['user_name'], 'aarol')
+        self.assertEqual(len(in_other_thread(main.search_status_text, 'coffee')), 1)
+        self.assertEqual(in_other_thread(main.search_users, ['adark', 'bdark'])['bdark'], None)
+        self.assertIsNone(in_other_thread(main.search_statuses, ['bdark_1'])['bdark_1'])
+        # Snapshot reads are not cached, so a refresh is seen right away
+        snapshot.refresh()
+        self.assertEqual(in_other_thread(main.search_user, 'bdark')['user_name'], 'barol')
+        self.assertEqual(in_other_thread(main.search_status, 'bdark_1')['user_id'], 'bdark')
+        self.assertEqual([status['status_id'] for status in
+                          in_other_thread(lambda: list(main.list_statuses('bdark')))],
+                         ['bdark_1'])
+        self.assertGreaterEqual(snapshot.counters['snapshot_reads'], 7)
+
+    def test_read_your_writes(self):
+        """
+        test a thread that wrote reads the live database, and live_reads
+        """
+        snapshot.start(max_age=60, max_writes=0)
+        main.add_user('bdark', 'bdark@uw.edu', 'barol', 'bdark1')
+        self.assertEqual(main.search_user('bdark')['user_name'], 'barol')
+        main.clear_caches()
+
+        def live_search():
+            with snapshot.live_reads():
+                return main.search_user('bdark')
+
+        self.assertEqual(in_other_thread(live_search)['user_name'], 'barol')
+        main.clear_caches()
+        self.assertIsNone(in_other_thread(main.search_user, 'bdark'))
+
+    def test_staleness_bounds(self):
+        """
+        test the snapshot refreshes after max_writes commits or max_age seconds
+        """
+        snapshot.start(max_age=60, max_writes=2)
+        main.add_user('bdark', 'bdark@uw.edu', 'barol', 'bdark1')
+        self.assertIsNone(in_other_thread(main.search_user, 'bdark'))
+        main.add_user('cdark', 'cdark@uw.edu', 'carol', 'cdark1')
+        self.assertEqual(in_other_thread(main.search_user, 'bdark')['user_name'], 'barol')
+        snapshot.stop()
+        snapshot.start(max_age=0.05, max_writes=0)
+        main.add_user('ddark', 'ddark@uw.edu', 'darol', 'ddark1')
+        self.assertIsNone(in_other_thread(main.search_user, 'ddark'))
+        time.sleep(0.1)
+        self.assertEqual(in_other_thread(main.search_user, 'ddark')['user_name'], 'darol')
+        with self.assertRaises(RuntimeError):
+            snapshot.start()
+
+    def test_scheduled_refresh(self):
+        """
+        test the background thread refreshes the snapshot every interval
+        """
+        snapshot.start(max_age=60, max_writes=0, interval=0.02)
+        refreshes = snapshot.counters['refreshes']
+        main.add_user('bdark', 'bdark@uw.edu', 'barol', 'bdark1')
+        deadline = time.monotonic() + 5
+        while snapshot.counters['refreshes'] < refreshes + 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(in_other_thread(main.search_user, 'bdark')['user_name'], 'barol')
+
+    def test_sharded_snapshot(self):
+        """
+        test every shard gets its own copy
+        """
+        original = dict(socialnetwork_model.DB_SETTINGS)
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                socialnetwork_model.configure(path=os.path.join(directory, 'social.db'))
+                sharding.configure(2)
+                self.assertEqual(main.add_users([('adark', 'a@uw.edu', 'A', 'A'),
+                                                 ('bdark', 'b@uw.edu', 'B', 'B')]), [True, True])
+                snapshot.start(max_age=60, max_writes=0)
+                main.add_user('cdark', 'c@uw.edu', 'C', 'C')
+                found = in_other_thread(main.search_users, ['adark', 'bdark', 'cdark'])
+                self.assertEqual([user and user['user_name'] for user in found.values()],
+                                 ['A', 'B', None])
+            finally:
+                snapshot.stop()
+                sharding.configure(0)
+                socialnetwork_model.configure(**original)
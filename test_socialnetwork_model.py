@@ -0,0 +1,168 @@
+"""
+Module to test socialnetwork_model.py
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import subprocess
+import sys
+import shutil
+import tempfile
+from unittest import TestCase
+from peewee import IntegrityError
+from playhouse.pool import PooledSqliteDatabase
+import socialnetwork_model
+
+
+class TestSocialNetworkModel(TestCase):
+    """
+    Unit test class called TestSocialNetworkModel
+    """
+
+    def setUp(self):
+        """
+        Setup method to run before
+        """
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'pool_test.db')
+
+    def test_make_database_default(self):
+        """
+        test the default database is not pooled
+        """
+        database = socialnetwork_model.make_database(self.path)
+        self.assertNotIsInstance(database, PooledSqliteDatabase)
+        self.assertEqual(database.pragma('foreign_keys'), 1)
+        database.close()
+
+    def test_make_database_pooled(self):
+        """
+        test pooled mode uses WAL and serves threads concurrently
+        """
+        database = socialnetwork_model.make_database(self.path, pool_size=4)
+        self.assertIsInstance(database, PooledSqliteDatabase)
+        self.assertEqual(database.pragma('journal_mode'), 'wal')
+        database.execute_sql('CREATE TABLE t (n INTEGER)')
+        database.close()
+
+        def work(number):
+            with database.connection_context():
+                with socialnetwork_model.write_lock, database.atomic():
+                    database.execute_sql('INSERT INTO t VALUES (?)', (number,))
+                return database.execute_sql('SELECT COUNT(*) FROM t').fetchone()[0]
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            counts = list(pool.map(work, range(50)))
+        self.assertEqual(max(counts), 50)
+        database.close_all()
+
+    def test_pool_smaller_than_writers(self):
+        """
+        test writers get a connection before the write lock, so a small pool does not time out
+        """
+        original = dict(socialnetwork_model.DB_SETTINGS)
+        socialnetwork_model.configure(path=self.path, pool_size=4, busy_timeout=2000)
+
+        def work(number):
+            try:
+                if number % 2:
+                    # Holds a connection while it waits for the write lock
+                    len(socialnetwork_model.Users)
+                with socialnetwork_model.write_transaction():
+                    socialnetwork_model.Users.insert(user_id=f'user{number}')
+                return len(socialnetwork_model.Users)
+            finally:
+                socialnetwork_model.release_connection()
+
+        try:
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                counts = list(pool.map(work, range(80)))
+            self.assertEqual(max(counts), 80)
+        finally:
+            socialnetwork_model.configure(**original)
+
+    def test_import_has_no_side_effects(self):
+        """
+        test importing the module does not create or open the database
+        """
+        environment = dict(os.environ, SOCIALNETWORK_DB=self.path)
+        subprocess.run([sys.executable, '-c', 'import socialnetwork_model'],
+                       env=environment, check=True)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_ensure_schema(self):
+        """
+        test schema setup creates the tables once and is skipped afterwards
+        """
+        database = socialnetwork_model.make_database(self.path)
+        socialnetwork_model.ensure_schema(database)
+        self.assertEqual(database.pragma('user_version'),
+                         socialnetwork_model.SCHEMA_VERSION)
+        self.assertEqual({column.name for column in database.get_columns('Users')},
+                         {'id', 'user_id', 'user_last_name', 'email', 'user_name'})
+        database.execute_sql('INSERT INTO "Users" ("user_id") VALUES (?)', ('a',))
+        with self.assertRaises(IntegrityError):
+            database.execute_sql('INSERT INTO "Users" ("user_id") VALUES (?)', ('a',))
+        # A current schema costs a single PRAGMA read and no DDL
+        statements = []
+        database.connection().set_trace_callback(statements.append)
+        socialnetwork_model.ensure_schema(database)
+        database.connection().set_trace_callback(None)
+        self.assertEqual(len(statements), 1)
+        database.close()
+
+    def test_ensure_schema_upgrades_old_layout(self):
+        """
+        test a database created before the schema version is upgraded
+        """
+        database = socialnetwork_model.make_database(self.path)
+        database.execute_sql('CREATE TABLE "Users" ("id" INTEGER NOT NULL PRIMARY KEY, '
+                             '"user_id" TEXT)')
+        database.execute_sql('CREATE UNIQUE INDEX "users_user_id" ON "Users" (user_id)')
+        socialnetwork_model.ensure_schema(database)
+        self.assertIn('email', {column.name for column in database.get_columns('Users')})
+        self.assertTrue({'status_status_id', 'status_user_id_status_id'} <=
+                        {index.name for index in database.get_indexes('Status')})
+        database.close()
+
+    def test_user_summary_migration(self):
+        """
+        test the summary step counts the statuses already stored
+        """
+        database = socialnetwork_model.make_database(self.path)
+        # A version 4 database with statuses: the current schema without
+        # the summary table and its triggers
+        socialnetwork_model.ensure_schema(database)
+        for trigger in ('insert', 'delete', 'update'):
+            database.execute_sql(f'DROP TRIGGER "status_summary_{trigger}"')
+        database.execute_sql('DROP TABLE "user_summary"')
+        database.execute_sql('INSERT INTO "Status" ("status_id", "user_id") '
+                             'VALUES (\'a_1\', \'a\'), (\'a_2\', \'a\')')
+        database.pragma('user_version', 4)
+        socialnetwork_model.ensure_schema(database)
+        self.assertEqual(database.execute_sql('SELECT * FROM "user_summary"').fetchall(),
+                         [('a', 2, None)])
+        database.execute_sql('UPDATE "Status" SET "user_id" = \'b\', '
+                             '"created_at" = \'2026\' WHERE "status_id" = \'a_2\'')
+        database.execute_sql('DELETE FROM "Status" WHERE "status_id" = \'a_1\'')
+        self.assertEqual(database.execute_sql('SELECT * FROM "user_summary"').fetchall(),
+                         [('b', 1, '2026')])
+        database.close()
+
+    def test_configure(self):
+        """
+        test configure switches database and init builds the tables lazily
+        """
+        original = dict(socialnetwork_model.DB_SETTINGS)
+        try:
+            socialnetwork_model.configure(path=self.path)
+            self.assertFalse(os.path.exists(self.path))
+            socialnetwork_model.Users.insert(user_id='lazy')
+            self.assertTrue(os.path.exists(self.path))
+            self.assertEqual(len(socialnetwork_model.Users), 1)
+        finally:
+            socialnetwork_model.configure(**original)
+        self.assertIsNone(socialnetwork_model.Users.find_one(user_id='lazy'))
+        with self.assertRaises(AttributeError):
+            socialnetwork_model.missing_attribute  # pylint: disable=W0104
@@ -0,0 +1,252 @@
+"""
+Module to test storage.py
+"""
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from peewee import IntegrityError
+from playhouse.dataset import DataSet
+import export
+import main
+import storage
+import socialnetwork_model
+
+
+def scenario():
+    """
+    Runs the same operations through main and returns what they returned
+    """
+    results = [
+        main.add_users([('adark', 'adark@uw.edu', 'aarol', 'adark1'),
+                        ('bdark', 'bdark@uw.edu', 'barol', 'bdark1'),
+                        ('adark', 'adark@uw.edu', 'aarol', 'adark1')]),
+        main.add_user('cdark', 'cdark@uw.edu', 'carol', 'cdark1'),
+        main.add_user('cdark', 'cdark@uw.edu', 'carol', 'cdark1'),
+        main.add_status('a_2', 'adark', 'Rain in Seattle'),
+        main.add_status('a_1', 'adark', 'Coffee in Seattle'),
+        main.add_status('b_1', 'bdark', 'Coffee again'),
+        main.add_status('x_1', 'nobody', 'No user'),
+        main.add_status('a_1', 'adark', 'Duplicate'),
+        main.update_user('bdark', 'b@uw.edu', 'bnew', 'bdark1'),
+        main.update_status('b_1', 'bdark', 'Tea again'),
+        main.search_user('bdark')['user_name'],
+        main.search_status('a_2')['status_text'],
+        [status['status_id'] for status in main.list_statuses('adark', page_size=1)],
+        [status['status_id'] for status in main.list_statuses('adark', after='a_1')],
+        main.search_status_text('seattle', limit=1, offset=1)[0]['status_id'],
+        main.user_summary('adark')['status_count'],
+        [status['status_id'] for status in main.recent_statuses('adark')],
+        main.update_users([('adark', 'a@uw.edu', 'anew', 'adark1'), ('zz', 'z@uw.edu', 'z', 'z')]),
+        main.delete_statuses(['a_2', 'x_1']),
+        main.delete_user('adark'),
+        main.search_status('a_1'),
+        main.delete_users(['bdark', 'nobody']),
+        main.search_statuses(['b_1']),
+        sorted(main.search_users(['cdark', 'adark']).items(),
+               key=lambda item: item[0])[1][1]['user_name'],
+    ]
+    return results
+
+
+class TestStorage(TestCase):
+    """
+    Unit test class called TestStorage
+    """
+
+    def setUp(self):
+        """
+        Setup method to run before
+        """
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        main.clear_caches()
+
+    def tearDown(self):
+        """
+        Teardown method to run after
+        """
+        storage.configure('sqlite')
+        socialnetwork_model.Users.delete()
+        socialnetwork_model.Status.delete()
+        main.clear_caches()
+
+    def test_memory_table_rules(self):
+        """
+        test uniqueness, the status's user, cascades and upsert policies
+        """
+        store = storage.MemoryStore()
+        store.Users.insert(user_id='adark', email='a@uw.edu')
+        with self.assertRaises(IntegrityError):
+            store.Users.insert(user_id='adark')
+        with self.assertRaises(IntegrityError):
+            store.Status.insert(status_id='x_1', user_id='nobody', status_text='x')
+        store.Status.insert(status_id='a_2', user_id='adark', status_text='two')
+        store.Status.insert(status_id='a_1', user_id='adark', status_text='one')
+        self.assertEqual(store.Status.page('adark', None, 10),
+                         [{'status_id': 'a_1', 'user_id': 'adark', 'status_text': 'one'},
+                          {'status_id': 'a_2', 'user_id': 'adark', 'status_text': 'two'}])
+        self.assertEqual(store.Users.update(columns=['user_id'], user_id='adark',
+                                            email='new@uw.edu'), 1)
+        self.assertEqual(store.Users.find_one(user_id='adark')['email'], 'new@uw.edu')
+        self.assertEqual(len(store.Status), 2)
+        rows = [{'user_id': 'bdark', 'email': 'b'}, {'user_id': 'adark', 'email': 'a'}]
+        with self.assertRaises(IntegrityError):
+            store.Users.upsert('user_id', rows, 'fail')
+        self.assertIsNone(store.Users.find_one(user_id='bdark'))
+        self.assertEqual(store.Users.upsert('user_id', rows), ['inserted', 'skipped'])
+        self.assertEqual(store.Users.upsert('user_id', rows, 'overwrite'),
+                         ['updated', 'updated'])
+        self.assertEqual(store.Users.existing('user_id', ['adark', 'cdark']), {'adark'})
+        # Deleting a user deletes its statuses
+        self.assertEqual(store.Users.delete(user_id='adark'), 1)
+        self.assertEqual(len(store.Status), 0)
+        self.assertEqual(store.Users.delete_in('user_id', ['bdark', 'cdark']), 1)
+
+    def test_engines_agree(self):
+        """
+        test main returns the same results on both engines
+        """
+        on_sqlite = scenario()
+        main.clear_caches()
+        storage.configure('memory')
+        self.assertEqual(scenario(), on_sqlite)
+        self.assertEqual(len(storage.memory_store().Users), 1)
+
+    def test_memory_engine_bulk_and_export(self):
+        """
+        test the loaders and export work on the memory engine, apart from the file
+        """
+        storage.configure('memory')
+        users_file = os.path.join(self.directory, 'users.csv')
+        with open(users_file, 'w', encoding='UTF-8') as file:
+            file.write('USER_ID,EMAIL,NAME,LASTNAME\n')
+            file.writelines(f'user{index},u{index}@uw.edu,N{index},L{index}\n'
+                            for index in range(50))
+        self.assertTrue(main.load_users(users_file, chunk_size=20))
+        # Loading again only finds duplicates
+        self.assertFalse(main.load_users(users_file))
+        status_file = os.path.join(self.directory, 'status.csv')
+        with open(status_file, 'w', encoding='UTF-8') as file:
+            file.write('STATUS_ID,USER_ID,STATUS_TEXT\n')
+            file.writelines(f'user{index}_1,user{index},Hello {index}\n' for index in range(50))
+        self.assertTrue(main.load_status_updates(status_file, chunk_size=20))
+        self.assertEqual(len(storage.memory_store().Status), 50)
+        self.assertEqual(len(socialnetwork_model.Users), 0)
+        path = os.path.join(self.directory, 'export.jsonl')
+        self.assertEqual(export.export_statuses(path, user_id='user7'), 1)
+        self.assertEqual(export.export_users(path), 50)
+
+    def test_memory_engine_leaves_database_alone(self):
+        """
+        test resumable loads and run_batch on the memory engine don't open the database file
+        """
+        original = dict(socialnetwork_model.DB_SETTINGS)
+        database_path = os.path.join(self.directory, 'untouched.db')
+        socialnetwork_model.configure(path=database_path)
+        try:
+            storage.configure('memory')
+            outcomes = socialnetwork_model.run_batch([
+                lambda: main.add_user('adark', 'adark@uw.edu', 'aarol', 'adark1'),
+                lambda: main.add_status('a_1', 'adark', 'Hello')], storage.write_transaction)
+            self.assertEqual(outcomes, [(True, True), (True, True)])
+            status_file = os.path.join(self.directory, 'status.csv')
+            with open(status_file, 'w', encoding='UTF-8') as file:
+                file.write('STATUS_ID,USER_ID,STATUS_TEXT\n')
+                file.writelines(f'a_{index},adark,Hello {index}\n' for index in range(2, 12))
+            self.assertTrue(main.load_status_updates(status_file, chunk_size=3, resume=True))
+            self.assertEqual(len(storage.memory_store().Status), 11)
+            self.assertFalse(os.path.exists(database_path))
+        finally:
+            storage.configure('sqlite')
+            socialnetwork_model.configure(**original)
+
+    def test_overwrite_keeps_created_at(self):
+        """
+        test created_at is stamped on insert only, on both engines and memory loads
+        """
+        for engine in ('sqlite', 'memory'):
+            storage.configure(engine)
+            main.clear_caches()
+            main.add_user('adark', 'adark@uw.edu', 'aarol', 'adark1')
+            main.add_status_batch([('a_1', 'adark', 'First')])
+            created_at = main.recent_statuses('adark')[0]['created_at']
+            self.assertEqual(main.add_status_batch([('a_1', 'adark', 'Again'),
+                                                    ('a_2', 'adark', 'New')],
+                                                   on_conflict='overwrite'), [True, True])
+            status = main.search_status('a_1')
+            self.assertEqual(status['status_text'], 'Again')
+            self.assertEqual(status['created_at'], created_at)
+        path = os.path.join(self.directory, 'old.db')
+        database = socialnetwork_model.make_database(path)
+        socialnetwork_model.ensure_schema(database)
+        database.execute_sql('INSERT INTO "Users" ("user_id", "email", "user_name", '
+                             '"user_last_name") VALUES (\'adark\', \'a\', \'a\', \'a\')')
+        database.execute_sql('INSERT INTO "Status" ("status_id", "user_id", "status_text") '
+                             'VALUES (\'a_1\', \'adark\', \'Old\')')
+        database.close()
+        storage.configure('memory', path)
+        self.assertIsNone(storage.memory_store().Status.find_one(status_id='a_1')['created_at'])
+
+    def test_memory_persistence(self):
+        """
+        test the memory store is saved to and loaded from an SQLite file
+        """
+        path = os.path.join(self.directory, 'hot.db')
+        storage.configure('memory', path)
+        main.add_user('adark', 'adark@uw.edu', 'aarol', 'adark1')
+        main.add_status('a_1', 'adark', 'Saved')
+        storage.close()
+        self.assertTrue(os.path.exists(path))
+        main.clear_caches()
+        self.assertEqual(main.search_status('a_1')['status_text'], 'Saved')
+        self.assertTrue(main.add_user('bdark', 'bdark@uw.edu', 'barol', 'bdark1'))
+        self.assertEqual(main.search_user('adark')['id'], 1)
+        self.assertEqual(main.search_user('bdark')['id'], 2)
+        storage.save()
+        database = socialnetwork_model.make_database(path)
+        self.assertEqual(database.execute_sql('SELECT COUNT(*) FROM "Users"').fetchone(), (2,))
+        database.close()
+
+    def test_compiled_table(self):
+        """
+        test compiled SQL returns what DataSet does, falling back to it
+        for calls the SQL does not cover
+        """
+        self.assertIsInstance(storage.backend(socialnetwork_model.Users), storage.CompiledTable)
+        storage.configure('sqlite', compiled=False)
+        self.assertNotIsInstance(storage.backend(socialnetwork_model.Users),
+                                 storage.CompiledTable)
+        database = socialnetwork_model.make_database(os.path.join(self.directory, 'c.db'))
+        socialnetwork_model.ensure_schema(database)
+        users_table = DataSet(database)['Users']
+        results = []
+        for table in (storage.SqliteTable(users_table), storage.CompiledTable(users_table)):
+            table.delete()
+            results.append([
+                table.insert(user_id='adark', email='a@uw.edu', user_name='aarol'),
+                table.find_one(user_id='adark'),
+                table.find_one(user_id='adark', email='b@uw.edu'),
+                table.find_one(user_last_name=None),
+                table.exists('user_id', 'adark'),
+                table.exists('user_id', 'bdark'),
+                table.update(columns=['user_id'], user_id='adark', user_last_name='dark'),
+                table.update(columns=['user_id'], user_id='nobody', email='x'),
+                table.find_one(user_id='adark'),
+                table.delete(user_id='nobody'),
+                table.delete(user_id='adark'),
+            ])
+            with self.assertRaises(IntegrityError):
+                table.insert(user_id='bdark')
+                table.insert(user_id='bdark')
+        self.assertEqual(results[0][1:], results[1][1:])
+        self.assertEqual(results[1][1]['user_name'], 'aarol')
+        self.assertEqual(results[1][8]['user_last_name'], 'dark')
+        self.assertEqual(results[1][9:], [0, 1])
+        # A column the table does not have yet is added, as by DataSet
+        compiled = storage.CompiledTable(users_table)
+        compiled.insert(user_id='cdark', nickname='cee')
+        self.assertEqual(storage.CompiledTable(DataSet(database)['Users'])
+                         .find_one(nickname='cee')['user_id'], 'cdark')
+        database.close()
@@ -79,3 +79,126 @@ class TestUserStatusFunctions(TestCase):
         status_search(**test_data)
         # Assert that insert method was called with correct arguments
         self.dataset_table.find_one.assert_called_once_with(**test_data)
+
+    # Testing add_statuses method
+    def test_add_statuses_table(self):
+        """
+        test for bulk add statuses table method
+        """
+        test_data = [
+            {'status_id': 'ben241253', 'user_id': 'ben24', 'status_text': 'yoooo'},
+            {'status_id': 'ben241253', 'user_id': 'ben24', 'status_text': 'yoooo'},
+        ]
+        # Call the function being tested
+        statuses_add = user_status.add_statuses_table(self.dataset_table)
+        self.assertEqual(statuses_add(test_data), [True, False])
+        self.assertEqual(statuses_add([]), [])
+        # Assert that only the new rows were inserted, in one statement
+        self.dataset_table.model_class.insert_many.assert_called_once_with(test_data[:1])
+
+    # Testing list_statuses method
+    def test_list_statuses_table(self):
+        """
+        test for list statuses method
+        """
+        test_data = [{'status_id': 'ben241253', 'user_id': 'ben24', 'status_text': 'yoooo'}]
+        model = self.dataset_table.model_class
+        query = model.select.return_value.where.return_value.order_by.return_value
+        query.limit.return_value.dicts.return_value = test_data
+        # Call the function being tested
+        statuses_list = user_status.list_statuses_table(self.dataset_table)
+        self.assertEqual(statuses_list('ben24', limit=5), test_data)
+        # Assert that one page was read with the limit given
+        query.limit.assert_called_once_with(5)
+
+    # Testing search_status_text method
+    def test_search_status_text_table(self):
+        """
+        test for search status text method
+        """
+        cursor = self.dataset_table.dataset.query.return_value
+        cursor.description = [('status_id',), ('user_id',), ('status_text',)]
+        cursor.__iter__.return_value = iter([('ben241253', 'ben24', 'yoooo')])
+        # Call the function being tested
+        text_search = user_status.search_status_text_table(self.dataset_table)
+        self.assertEqual(text_search('yoooo', limit=3, offset=1), [
+            {'status_id': 'ben241253', 'user_id': 'ben24', 'status_text': 'yoooo'}])
+        # Assert that the query, limit and offset were bound as parameters
+        self.assertEqual(self.dataset_table.dataset.query.call_args[0][1], ('yoooo', 3, 1))
+
+    # Testing search_statuses method
+    def test_search_statuses_table(self):
+        """
+        test for search statuses method
+        """
+        test_data = {'status_id': 'ben241253', 'user_id': 'ben24', 'status_text': 'yoooo'}
+        model = self.dataset_table.model_class
+        model.select.return_value.where.return_value.dicts.return_value = [test_data]
+        # Call the function being tested
+        statuses_search = user_status.search_statuses_table(self.dataset_table)
+        self.assertEqual(statuses_search(['ben241253', 'nope']), {'ben241253': test_data})
+        self.assertEqual(statuses_search([]), {})
+        # Assert that an empty list sends no query
+        model.select.assert_called_once()
+
+    # Testing delete_statuses method
+    def test_delete_statuses_table(self):
+        """
+        test for delete statuses method
+        """
+        model = self.dataset_table.model_class
+        model.delete.return_value.where.return_value.execute.return_value = 3
+        # Call the function being tested
+        statuses_delete = user_status.delete_statuses_table(self.dataset_table)
+        self.assertEqual(statuses_delete(['ben24'], column='user_id'), 3)
+        self.assertEqual(statuses_delete([]), 0)
+        # Assert that the ids went in one statement and an empty list sends none
+        model.delete.return_value.where.return_value.execute.assert_called_once()
+
+    # Testing upsert_statuses method
+    def test_upsert_statuses_table(self):
+        """
+        test for bulk upsert statuses table method
+        """
+        test_data = [
+            {'status_id': 'ben241253', 'user_id': 'ben24', 'status_text': 'yoooo'},
+            {'status_id': 'ben241253', 'user_id': 'ben24', 'status_text': 'again'},
+        ]
+        statuses_upsert = user_status.upsert_statuses_table(self.dataset_table)
+        self.assertEqual(statuses_upsert([]), [])
+        self.assertEqual(statuses_upsert(test_data), ['inserted', 'skipped'])
+        self.assertEqual(statuses_upsert(test_data, 'overwrite'), ['inserted', 'updated'])
+        # Assert that overwrite sent both rows with an ON CONFLICT update
+        insert_many = self.dataset_table.model_class.insert_many
+        insert_many.assert_called_with(test_data)
+        insert_many.return_value.on_conflict.assert_called_once()
+
+    # Testing status_summary method
+    def test_status_summary_table(self):
+        """
+        test for status summary method
+        """
+        fetchone = self.dataset_table.dataset.query.return_value.fetchone
+        fetchone.return_value = (2, '2026-10-18T00:00:00+00:00')
+        # Call the function being tested
+        summary = user_status.status_summary_table(self.dataset_table)
+        self.assertEqual(summary('ben24'), (2, '2026-10-18T00:00:00+00:00'))
+        fetchone.return_value = None
+        self.assertEqual(summary('nobody'), (0, None))
+        # Assert that the user was bound as a parameter
+        self.assertEqual(self.dataset_table.dataset.query.call_args[0][1], ('nobody',))
+
+    # Testing recent_statuses method
+    def test_recent_statuses_table(self):
+        """
+        test for recent statuses method
+        """
+        row = ('ben241253', 'ben24', 'yoooo', '2026-10-18T00:00:00+00:00')
+        cursor = self.dataset_table.dataset.query.return_value
+        cursor.__iter__.return_value = iter([row])
+        # Call the function being tested
+        recent = user_status.recent_statuses_table(self.dataset_table)
+        self.assertEqual(recent('ben24', limit=1), [
+            dict(zip(('status_id', 'user_id', 'status_text', 'created_at'), row))])
+        # Assert that the user and limit were bound as parameters
+        self.assertEqual(self.dataset_table.dataset.query.call_args[0][1], ('ben24', 1))
@@ -4,6 +4,7 @@ Module to test users.py
 
 from unittest import TestCase
 from unittest.mock import MagicMock
+from peewee import IntegrityError
 import users
 
 
@@ -79,3 +80,96 @@ class TestUsersFunctions(TestCase):
         user_search(**test_data)
         # Assert that insert method was called with correct arguments
         self.dataset_table.find_one.assert_called_once_with(**test_data)
+
+    # Testing add_users method
+    def test_add_users_table(self):
+        """
+        test for bulk add users table method
+        """
+        test_data = [
+            {'user_id': 'ben24', 'email': 'John@uw.edu'},
+            {'user_id': 'ben25', 'email': 'Jane@uw.edu'},
+            {'user_id': 'ben24', 'email': 'John@uw.edu'},
+        ]
+        # Call the function being tested
+        users_add = users.add_users_table(self.dataset_table)
+        self.assertEqual(users_add(test_data), [True, True, False])
+        self.assertEqual(users_add([]), [])
+        # Assert that only the new rows were inserted, in one statement
+        self.dataset_table.model_class.insert_many.assert_called_once_with(test_data[:2])
+
+    # Testing upsert_users method
+    def test_upsert_users_table(self):
+        """
+        test for bulk upsert users table method
+        """
+        test_data = [
+            {'user_id': 'ben24', 'email': 'John@uw.edu'},
+            {'user_id': 'ben24', 'email': 'Johnny@uw.edu'},
+        ]
+        users_upsert = users.upsert_users_table(self.dataset_table)
+        self.assertEqual(users_upsert([]), [])
+        self.assertEqual(users_upsert(test_data, 'skip'), ['inserted', 'skipped'])
+        self.assertEqual(users_upsert(test_data, 'overwrite'), ['inserted', 'updated'])
+        # Assert that overwrite sent both rows with an ON CONFLICT update
+        insert_many = self.dataset_table.model_class.insert_many
+        insert_many.assert_called_with(test_data)
+        insert_many.return_value.on_conflict.assert_called_once()
+        with self.assertRaises(IntegrityError):
+            users_upsert(test_data, 'fail')
+
+    # Testing exists_user method
+    def test_exists_user_table(self):
+        """
+        test for exists user method
+        """
+        model = self.dataset_table.model_class
+        model.select.return_value.where.return_value.exists.return_value = True
+        # Call the function being tested
+        user_exists = users.exists_user_table(self.dataset_table)
+        self.assertTrue(user_exists('ben24'))
+        # Assert that the check was a read and nothing was inserted
+        self.dataset_table.insert.assert_not_called()
+
+    # Testing existing_users method
+    def test_existing_users_table(self):
+        """
+        test for existing users method
+        """
+        model = self.dataset_table.model_class
+        model.select.return_value.where.return_value.tuples.return_value = [('ben24',)]
+        # Call the function being tested
+        users_existing = users.existing_users_table(self.dataset_table)
+        self.assertEqual(users_existing(['ben24', 'ben25']), {'ben24'})
+        # Assert that the check was one read and nothing was inserted
+        model.select.return_value.where.assert_called_once()
+        self.dataset_table.insert.assert_not_called()
+
+    # Testing search_users method
+    def test_search_users_table(self):
+        """
+        test for search users method
+        """
+        test_data = {'user_id': 'ben24', 'email': 'John@uw.edu'}
+        model = self.dataset_table.model_class
+        model.select.return_value.where.return_value.dicts.return_value = [test_data]
+        # Call the function being tested
+        users_search = users.search_users_table(self.dataset_table)
+        self.assertEqual(users_search(['ben24', 'ben25']), {'ben24': test_data})
+        self.assertEqual(users_search([]), {})
+        # Assert that an empty list sends no query
+        model.select.assert_called_once()
+
+    # Testing delete_users method
+    def test_delete_users_table(self):
+        """
+        test for delete users method
+        """
+        model = self.dataset_table.model_class
+        model.delete.return_value.where.return_value.execute.return_value = 2
+        # Call the function being tested
+        users_delete = users.delete_users_table(self.dataset_table)
+        self.assertEqual(users_delete(['ben24', 'ben25']), 2)
+        self.assertEqual(users_delete([]), 0)
+        # Assert that both ids went in one statement
+        model.delete.return_value.where.return_value.execute.assert_called_once()
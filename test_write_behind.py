@@ -0,0 +1,96 @@
+"""
+Module to test write_behind.py
+"""
+
+import threading
+from unittest import TestCase
+import main
+import socialnetwork_model
+import write_behind
+
+
+class TestWriteBehind(TestCase):
+    """
+    Unit test class called TestWriteBehind
+    """
+
+    def setUp(self):
+        """
+        Setup method to run before
+        """
+        main.add_user('adark', 'adark@uw.edu', 'aarol', 'adark1')
+
+    def tearDown(self):
+        """
+        Teardown method to run after
+        """
+        write_behind.stop()
+        socialnetwork_model.Users.delete()
+        socialnetwork_model.Status.delete()
+        main.clear_caches()
+
+    def test_group_commit(self):
+        """
+        test queued operations are committed in groups and resolve futures
+        """
+        write_behind.start(max_batch=10, max_delay_ms=1000)
+        self.assertTrue(write_behind.is_started())
+        futures = [write_behind.add_status(str(index), 'adark', 'Hello')
+                   for index in range(25)]
+        duplicate = write_behind.add_status('0', 'adark', 'Hello')
+        update = write_behind.update_status('1', 'adark', 'Updated')
+        delete = write_behind.delete_status('2')
+        write_behind.flush()
+        self.assertTrue(all(future.result() for future in futures))
+        self.assertFalse(duplicate.result())
+        self.assertTrue(update.result())
+        self.assertTrue(delete.result())
+        self.assertEqual(len(socialnetwork_model.Status), 24)
+        self.assertEqual(socialnetwork_model.Status.find_one(status_id='1')['status_text'],
+                         'Updated')
+        self.assertLess(write_behind.counters['groups'], 28)
+
+    def test_delay_triggers_commit(self):
+        """
+        test a group is committed after max_delay_ms without a flush
+        """
+        write_behind.start(max_batch=1000, max_delay_ms=10)
+        future = write_behind.add_status('1', 'adark', 'Hello')
+        self.assertTrue(future.result(timeout=5))
+
+    def test_errors(self):
+        """
+        test errors are set on the future and misuse raises RuntimeError
+        """
+        with self.assertRaises(RuntimeError):
+            write_behind.add_status('1', 'adark', 'Hello')
+        write_behind.flush()
+        write_behind.start()
+        with self.assertRaises(RuntimeError):
+            write_behind.start()
+        future = write_behind.submit(main.add_status, '1')
+        with self.assertRaises(TypeError):
+            future.result(timeout=5)
+
+    def test_mixed_with_direct_writes(self):
+        """
+        test queued and direct add_status calls from other threads don't deadlock
+        """
+        write_behind.start(max_batch=5, max_delay_ms=1)
+        futures = []
+
+        def direct(thread):
+            for index in range(50):
+                main.add_status(f'direct{thread}_{index}', 'adark', 'Direct')
+
+        threads = [threading.Thread(target=direct, args=(thread,), daemon=True)
+                   for thread in range(2)]
+        for thread in threads:
+            thread.start()
+        futures.extend(write_behind.add_status(f'queued_{index}', 'adark', 'Queued')
+                       for index in range(100))
+        for thread in threads:
+            thread.join(10)
+        self.assertFalse(any(thread.is_alive() for thread in threads))
+        self.assertTrue(all(future.result(timeout=10) for future in futures))
+        self.assertEqual(len(socialnetwork_model.Status), 200)
@@ -7,37 +7,151 @@ Modified to work with Database
 # pylint: disable=R0801
 # pylint: disable=C0116
 
-from socialnetwork_model import dataset
+import metrics
+import storage
 
 
 def add_status_table(db):
+    table = storage.backend(db)
+
     def add_status(**kwargs):
-        with dataset.transaction():
-            db.insert(**kwargs)
+        with metrics.transaction('add_status', table.write_transaction()):
+            table.insert(**kwargs)
+
+    return metrics.instrument('add_status', add_status)
+
+
+def add_statuses_table(db):
+    table = storage.backend(db)
+
+    def add_statuses(rows):
+        # Multi-row insert of a batch of status dicts in one transaction.
+        # Returns one bool per row: True if inserted, False if the
+        # status_id already existed (in the table or earlier in the batch).
+        if not rows:
+            return []
+        with metrics.transaction('add_statuses', table.write_transaction()):
+            outcomes = table.upsert('status_id', rows)
+        return [outcome == 'inserted' for outcome in outcomes]
+
+    return metrics.instrument('add_statuses', add_statuses)
+
+
+def upsert_statuses_table(db):
+    table = storage.backend(db)
+
+    def upsert_statuses(rows, on_conflict='skip'):
+        # Like add_statuses, with a policy for existing status_ids (skip,
+        # overwrite or fail, see socialnetwork_model.upsert_rows).
+        # Returns 'inserted', 'updated' or 'skipped' per row.
+        if not rows:
+            return []
+        with metrics.transaction('upsert_statuses', table.write_transaction()):
+            return table.upsert('status_id', rows, on_conflict)
 
-    return add_status
+    return metrics.instrument('upsert_statuses', upsert_statuses)
 
 
 def update_status_table(db):
+    table = storage.backend(db)
+
     def update_status(**kwargs):
-        with dataset.transaction():
-            db.update(**kwargs)
+        with metrics.transaction('update_status', table.write_transaction()):
+            table.update(**kwargs)
 
-    return update_status
+    return metrics.instrument('update_status', update_status)
 
 
 def delete_status_table(db):
+    table = storage.backend(db)
+
     def delete_status(**kwargs):
-        with dataset.transaction():
-            db.delete(**kwargs)
+        with metrics.transaction('delete_status', table.write_transaction()):
+            table.delete(**kwargs)
 
-    return delete_status
+    return metrics.instrument('delete_status', delete_status)
 
 
 def search_status_table(db):
+    table = storage.backend(db)
+
     def search_status(**kwargs):
-        with dataset.transaction():
-            return db.find_one(**kwargs)
+        with metrics.transaction('search_status', table.read_transaction()):
+            return table.find_one(**kwargs)
+
+    return metrics.instrument('search_status', search_status)
+
+
+def list_statuses_table(db):
+    table = storage.backend(db)
+
+    def list_statuses(user_id, after=None, limit=100):
+        # One page of a user's statuses in status_id order, starting after
+        # the status_id after, read from the (user_id, status_id) index
+        with metrics.transaction('list_statuses', table.read_transaction()):
+            return table.page(user_id, after, limit)
+
+    return metrics.instrument('list_statuses', list_statuses)
+
+
+def search_status_text_table(db):
+    table = storage.backend(db)
+
+    def search_status_text(query, limit=10, offset=0, ranked=False):
+        # Ranked full-text search over status_text; with the SQLite engine
+        # raises OperationalError if query is not valid FTS5 syntax.
+        # ranked adds each match's 'rank' (lower is better), for merging
+        # the results of several databases.
+        with metrics.transaction('search_status_text', table.read_transaction()):
+            return table.search_text(query, limit, offset, ranked)
+
+    return metrics.instrument('search_status_text', search_status_text)
+
+
+def search_statuses_table(db):
+    table = storage.backend(db)
+
+    def search_statuses(status_ids):
+        # Rows for the status_ids present in the table, keyed by status_id,
+        # read with chunked IN queries in one transaction
+        with metrics.transaction('search_statuses', table.read_transaction()):
+            return {row['status_id']: row for row in table.find_in('status_id', status_ids)}
+
+    return metrics.instrument('search_statuses', search_statuses)
+
+
+def delete_statuses_table(db):
+    table = storage.backend(db)
+
+    def delete_statuses(values, column='status_id'):
+        # Deletes the statuses whose column (status_id, or user_id for a
+        # cascade) is in values, with chunked IN queries in one
+        # transaction; returns the number of rows deleted
+        with metrics.transaction('delete_statuses', table.write_transaction()):
+            return table.delete_in(column, values)
+
+    return metrics.instrument('delete_statuses', delete_statuses)
+
+
+def status_summary_table(db):
+    table = storage.backend(db)
+
+    def status_summary(user_id):
+        # (status count, latest created_at) of a user's statuses, kept up
+        # to date as statuses are written, so no statuses are read
+        with metrics.transaction('status_summary', table.read_transaction()):
+            return table.summary(user_id)
+
+    return metrics.instrument('status_summary', status_summary)
+
+
+def recent_statuses_table(db):
+    table = storage.backend(db)
 
-    return search_status
+    def recent_statuses(user_id, limit=10):
+        # A user's latest statuses, newest first, read from the
+        # (user_id, created_at) index
+        with metrics.transaction('recent_statuses', table.read_transaction()):
+            return table.recent(user_id, limit)
 
+    return metrics.instrument('recent_statuses', recent_statuses)
@@ -7,36 +7,120 @@ Modified to work with Database
 # pylint: disable=R0801
 # pylint: disable=C0116
 
-from socialnetwork_model import dataset
+import metrics
+import storage
 
 
 def add_user_table(db):
+    table = storage.backend(db)
+
     def add_user(**kwargs):
-        with dataset.transaction():
-            db.insert(**kwargs)
+        with metrics.transaction('add_user', table.write_transaction()):
+            table.insert(**kwargs)
+
+    return metrics.instrument('add_user', add_user)
+
+
+def add_users_table(db):
+    table = storage.backend(db)
+
+    def add_users(rows):
+        # Multi-row insert of a batch of user dicts in one transaction.
+        # Returns one bool per row: True if inserted, False if the
+        # user_id already existed (in the table or earlier in the batch).
+        if not rows:
+            return []
+        with metrics.transaction('add_users', table.write_transaction()):
+            outcomes = table.upsert('user_id', rows)
+        return [outcome == 'inserted' for outcome in outcomes]
+
+    return metrics.instrument('add_users', add_users)
+
 
-    return add_user
+def upsert_users_table(db):
+    table = storage.backend(db)
+
+    def upsert_users(rows, on_conflict='skip'):
+        # Like add_users, with a policy for existing user_ids (skip,
+        # overwrite or fail, see socialnetwork_model.upsert_rows).
+        # Returns 'inserted', 'updated' or 'skipped' per row.
+        if not rows:
+            return []
+        with metrics.transaction('upsert_users', table.write_transaction()):
+            return table.upsert('user_id', rows, on_conflict)
+
+    return metrics.instrument('upsert_users', upsert_users)
 
 
 def update_user_table(db):
+    table = storage.backend(db)
+
     def update_user(**kwargs):
-        with dataset.transaction():
-            db.update(**kwargs)
+        with metrics.transaction('update_user', table.write_transaction()):
+            table.update(**kwargs)
 
-    return update_user
+    return metrics.instrument('update_user', update_user)
 
 
 def delete_user_table(db):
+    table = storage.backend(db)
+
     def delete_user(**kwargs):
-        with dataset.transaction():
-            db.delete(**kwargs)
+        with metrics.transaction('delete_user', table.write_transaction()):
+            table.delete(**kwargs)
+
+    return metrics.instrument('delete_user', delete_user)
+
+
+def exists_user_table(db):
+    table = storage.backend(db)
 
-    return delete_user
+    def exists_user(user_id):
+        # Read-only probe on the unique user_id index
+        return table.exists('user_id', user_id)
+
+    return metrics.instrument('exists_user', exists_user)
+
+
+def existing_users_table(db):
+    table = storage.backend(db)
+
+    def existing_users(user_ids):
+        # Returns the subset of user_ids present in the table
+        return table.existing('user_id', user_ids)
+
+    return metrics.instrument('existing_users', existing_users)
 
 
 def search_user_table(db):
+    table = storage.backend(db)
+
     def search_user(**kwargs):
-        with dataset.transaction():
-            return db.find_one(**kwargs)
+        with metrics.transaction('search_user', table.read_transaction()):
+            return table.find_one(**kwargs)
+
+    return metrics.instrument('search_user', search_user)
+
+
+def search_users_table(db):
+    table = storage.backend(db)
+
+    def search_users(user_ids):
+        # Rows for the user_ids present in the table, keyed by user_id,
+        # read with chunked IN queries in one transaction
+        with metrics.transaction('search_users', table.read_transaction()):
+            return {row['user_id']: row for row in table.find_in('user_id', user_ids)}
+
+    return metrics.instrument('search_users', search_users)
+
+
+def delete_users_table(db):
+    table = storage.backend(db)
+
+    def delete_users(user_ids):
+        # Deletes the users with chunked IN queries in one transaction;
+        # returns the number of rows deleted
+        with metrics.transaction('delete_users', table.write_transaction()):
+            return table.delete_in('user_id', user_ids)
 
-    return search_user
+    return metrics.instrument('delete_users', delete_users)
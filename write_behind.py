@@ -0,0 +1,150 @@
+"""
+Group-commit write-behind queue for status updates
+
+After start(), add_status, update_status and delete_status only queue
+the operation and return a concurrent.futures.Future right away. A
+background flusher thread commits queued operations in groups, one
+transaction per group, as soon as max_batch operations are waiting or
+max_delay_ms has passed since the first one. Each future resolves to
+what the matching main function returns. Call flush() (or stop()) before
+shutting down so that nothing queued is lost.
+"""
+# pylint: disable=W0718
+
+from concurrent.futures import Future
+import queue
+import threading
+import time
+
+import main
+import socialnetwork_model
+import storage
+
+_STOP = object()
+_state = {'queue': None, 'thread': None}
+counters = {'operations': 0, 'groups': 0}
+
+
+def _commit(group):
+    live = [(future, call) for future, call in group
+            if future.set_running_or_notify_cancel()]
+    if not live:
+        return
+    try:
+        outcomes = socialnetwork_model.run_batch([call for _, call in live],
+                                                 storage.write_transaction)
+    except Exception as error:
+        outcomes = [(False, error)] * len(live)
+    counters['groups'] += 1
+    counters['operations'] += len(live)
+    for (future, _), (succeeded, value) in zip(live, outcomes):
+        if succeeded:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+
+
+def _flusher(operations, max_batch, max_delay):
+    running = True
+    while running:
+        item = operations.get()
+        group = []
+        markers = []
+        deadline = time.monotonic() + max_delay
+        while True:
+            if item is _STOP:
+                running = False
+                break
+            if item[1] is None:
+                # flush() marker: commit what is queued so far right away
+                markers.append(item[0])
+                break
+            group.append(item)
+            remaining = deadline - time.monotonic()
+            if len(group) >= max_batch or remaining <= 0:
+                break
+            try:
+                item = operations.get(timeout=remaining)
+            except queue.Empty:
+                break
+        _commit(group)
+        for marker in markers:
+            marker.set_result(True)
+    socialnetwork_model.release_connection()
+
+
+def start(max_batch=100, max_delay_ms=20, max_queue=10000):
+    """
+    Starts the flusher thread. max_queue bounds the queue: when it is
+    full, callers block until the flusher catches up.
+    """
+    if _state['thread'] is not None:
+        raise RuntimeError('write-behind mode is already started')
+    operations = queue.Queue(max_queue)
+    thread = threading.Thread(target=_flusher, name='socialnetwork-write-behind',
+                              args=(operations, max_batch, max_delay_ms / 1000),
+                              daemon=True)
+    _state.update(queue=operations, thread=thread)
+    thread.start()
+
+
+def is_started():
+    """
+    Returns True if write-behind mode is on.
+    """
+    return _state['thread'] is not None
+
+
+def submit(func, *args):
+    """
+    Queues func(*args) and returns a Future for its result.
+    """
+    if _state['thread'] is None:
+        raise RuntimeError('write-behind mode is not started')
+    future = Future()
+    _state['queue'].put((future, lambda: func(*args)))
+    return future
+
+
+def add_status(status_id, user_id, status_text):
+    """
+    Queues main.add_status; returns a Future for its True/False result.
+    """
+    return submit(main.add_status, status_id, user_id, status_text)
+
+
+def update_status(status_id, user_id, status_text):
+    """
+    Queues main.update_status; returns a Future for its True/False result.
+    """
+    return submit(main.update_status, status_id, user_id, status_text)
+
+
+def delete_status(status_id):
+    """
+    Queues main.delete_status; returns a Future for its True/False result.
+    """
+    return submit(main.delete_status, status_id)
+
+
+def flush(timeout=None):
+    """
+    Blocks until every operation queued before the call is committed.
+    """
+    if _state['thread'] is None:
+        return
+    marker = Future()
+    _state['queue'].put((marker, None))
+    marker.result(timeout)
+
+
+def stop():
+    """
+    Flushes the queue and stops the flusher thread.
+    """
+    if _state['thread'] is None:
+        return
+    flush()
+    _state['queue'].put(_STOP)
+    _state['thread'].join()
+    _state.update(queue=None, thread=None)